@@ -1,13 +1,26 @@
 from discord.ext import commands
 import discord
+import asyncio
 import os
+import signal
+import time
 
 from components.view import (
     GatherView,
     FormatView,
     GameView,
-    ResumeView
+    ResumeView,
+    PlacementView
 )
+from components.stats import StatsStore
+from components.journal import JournalStore
+from components.metrics import Metrics
+from components.hooks import EventBus, WebhookSink, UnixSocketSink
+from components.names import NameDirectory
+from components.responses import ResponseCache
+from components.settings import SettingsStore, GuildSettings
+from components.utils import DATA_DIR
+from errors import ShuttingDown
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -16,34 +29,176 @@ intents.members = True
 extensions = [
     "cogs.admin",
     "cogs.gather",
+    "cogs.stats",
+    "cogs.settings",
+    "cogs.tournament",
 ]
 
+if os.environ.get("DASHBOARD_PORT"):
+    extensions.append("cogs.dashboard")
+if os.environ.get("RECORD_TRAFFIC"):
+    extensions.append("cogs.recorder")
+
+SHUTDOWN_TIMEOUT: float = 10 # Seconds to finish in-flight input on SIGTERM, within the stop_grace_period of docker-compose.yml
+
 class QueueBot(commands.Bot):
 
     def __init__(self, command_prefix="$") -> None:
         super().__init__(
-            command_prefix = commands.when_mentioned_or(command_prefix),
+            command_prefix = QueueBot._get_prefix,
             case_insensitive = True,
             intents = intents,
             help_command = None
         )
         self.LOG_CHANNEL: discord.TextChannel = None
-        self._qualified_prefix = command_prefix
+        self.started_at: float = time.perf_counter()
+        self._has_responded: bool = False
+        self.is_closing: bool = False
+        self._in_flight: set[asyncio.Task] = set()
+        self.settings: SettingsStore = SettingsStore(DATA_DIR / "settings.json", GuildSettings(prefix=command_prefix))
+        self.stats: StatsStore = StatsStore(DATA_DIR / "stats")
+        self.journals: JournalStore = JournalStore(DATA_DIR / "journal")
+        self.metrics: Metrics = Metrics()
+        self.names: NameDirectory = NameDirectory()
+        self.events: EventBus = EventBus(self.metrics)
+        self.responses: ResponseCache = ResponseCache()
 
-    async def on_ready(self):
+        if url := os.environ.get("HOOK_URL"):
+            self.events.subscribe(WebhookSink(url))
+        if path := os.environ.get("HOOK_SOCKET"):
+            self.events.subscribe(UnixSocketSink(path))
+
+        self.add_check(self._is_accepting)
+        self.before_invoke(self._track_command)
 
+    @staticmethod
+    def _get_prefix(bot: "QueueBot", message: discord.Message) -> list[str]:
+        settings = bot.settings.get(message.guild.id if message.guild else None)
+        return commands.when_mentioned_or(settings.prefix)(bot, message)
+
+    async def start(self, token: str, *, reconnect: bool = True) -> None:
+        # Registered once before connecting, rather than on every on_ready,
+        # which fires again after each reconnect.
         for view in (
             GatherView,
             FormatView,
             GameView,
-            ResumeView
+            ResumeView,
+            PlacementView
         ):
             self.add_view(view())
 
+        # Every extension is loaded by now.
+        self.responses.build(self.cogs.values(), self.settings.default.prefix)
+
+        # Replaces the handlers of Client.run, which stop the loop at once.
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._on_signal)
+            except NotImplementedError:
+                pass
+
+        await super().start(token, reconnect=reconnect)
+
+    def add_cog(self, cog: commands.Cog, *, override: bool = False) -> None:
+        super().add_cog(cog, override=override)
+        self.responses.clear()
+
+    def remove_cog(self, name: str):
+        cog = super().remove_cog(name)
+        self.responses.clear()
+        return cog
+
+    def _on_signal(self) -> None:
+        if self.is_closing:
+            # A second signal does not wait for the drain.
+            asyncio.get_running_loop().stop()
+        else:
+            asyncio.create_task(self.shutdown())
+
+    async def _is_accepting(self, ctx) -> bool:
+        if self.is_closing:
+            raise ShuttingDown
+        return True
+
+    async def _track_command(self, ctx) -> None:
+        self.track()
+
+    def track(self) -> None:
+        """Marks the current task as handling input, so that shutdown waits for it."""
+
+        if (task := asyncio.current_task()) is not None and task not in self._in_flight:
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def shutdown(self) -> None:
+        """Stops taking input, finishes what is in flight and closes the bot.
+
+        Commands, button presses and rank messages already being handled
+        are awaited first, then every cog with a ``drain`` coroutine
+        finishes its queued Discord writes, all within
+        :data:`SHUTDOWN_TIMEOUT`. Cogs with a ``flush`` method then save or
+        send what only lives in memory, awaited if it is a coroutine, and
+        the hooks deliver what is queued.
+        """
+
+        if self.is_closing:
+            return
+        self.is_closing = True
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+
+        # Without the task calling this, in case it is a command itself.
+        in_flight = self._in_flight - {asyncio.current_task()}
+
+        async def drain() -> None:
+            if in_flight:
+                await asyncio.wait(in_flight)
+            await asyncio.gather(
+                *(cog.drain() for cog in self.cogs.values() if hasattr(cog, "drain")),
+                return_exceptions=True
+            )
+
+        try:
+            await asyncio.wait_for(drain(), SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"Shutdown: {len(self._in_flight)} tasks still in flight after {SHUTDOWN_TIMEOUT} seconds")
+
+        flushes = [
+            result for cog in self.cogs.values()
+            if hasattr(cog, "flush") and asyncio.iscoroutine(result := cog.flush())
+        ]
+        if flushes:
+            try:
+                await asyncio.wait_for(asyncio.gather(*flushes, return_exceptions=True), max(deadline - time.monotonic(), 1.0))
+            except asyncio.TimeoutError:
+                print(f"Shutdown: flushing did not finish within {SHUTDOWN_TIMEOUT} seconds")
+
+        await self.events.close(max(deadline - time.monotonic(), 1.0))
+        self.stats.close()
+        await self.close()
+
+    async def on_ready(self):
         self.LOG_CHANNEL = self.get_channel(int(os.environ["LOG_CHANNEL_ID"]))
+
+        if "startup.ready" not in self.metrics.timings:
+            self.metrics.observe("startup.ready", time.perf_counter() - self.started_at)
         print("Bot is ready!")
 
-bot = QueueBot()
-bot.load_extensions(*extensions)
-bot.run(os.environ["BOT_TOKEN"])
+    def _observe_first_response(self) -> None:
+        if not self._has_responded:
+            self._has_responded = True
+            self.metrics.observe("startup.first_response", time.perf_counter() - self.started_at)
+
+    async def on_command_completion(self, ctx: commands.Context):
+        self._observe_first_response()
+
+    async def on_application_command_completion(self, ctx: discord.ApplicationContext):
+        self._observe_first_response()
+
+# Worker processes import this module again, and must not start another bot.
+if __name__ == "__main__":
+    bot = QueueBot()
+    bot.load_extensions(*extensions)
+    bot.run(os.environ["BOT_TOKEN"])
 
@@ -1,11 +1,9 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Optional
-from traceback import print_exception
 from io import StringIO
-import sys
-
-from discord.ext import commands
-from discord.utils import get
+import time
+from discord.ext import commands, tasks
+from discord.utils import get, find
 from discord import (
     File,
     Embed,
@@ -16,6 +14,9 @@ from discord import (
 )
 
 from errors import *
+from components.reporter import ErrorReporter
+from components.profiler import SamplingProfiler, MemoryTracer
+from components.utils import DATA_DIR
 
 DEBUG: bool = True # If you want to debug, set this to True
 
@@ -33,6 +34,31 @@ class Admin(commands.Cog, name="Admin", command_attrs=dict(hidden=True)):
             "ja": "管理者用コマンド",
             "en-US": "Admin commands"
         }
+        self.reporter: ErrorReporter = ErrorReporter(DATA_DIR / "logs" / "errors.log")
+        self.profiler: SamplingProfiler = SamplingProfiler()
+        self.tracer: MemoryTracer = MemoryTracer()
+        self.flush_errors.start()
+
+
+    def cog_unload(self) -> None:
+        self.flush_errors.cancel()
+        self.reporter.close()
+
+
+    @tasks.loop(seconds=60)
+    async def flush_errors(self) -> None:
+        await self.flush()
+
+
+    async def flush(self) -> None:
+        """Posts the errors reported since the last flush. Called on shutdown."""
+
+        await self.reporter.flush(self.bot.LOG_CHANNEL)
+
+
+    @flush_errors.before_loop
+    async def before_flush_errors(self) -> None:
+        await self.bot.wait_until_ready()
 
 
     async def send_command_error(self, ctx: commands.Context, error: commands.CommandError) -> None:
@@ -58,12 +84,7 @@ class Admin(commands.Cog, name="Admin", command_attrs=dict(hidden=True)):
             ]
         )
         e.set_author(name=str(ctx.author), icon_url=ctx.author.display_avatar.url)
-        buffer = StringIO()
-        t, _, tb = sys.exc_info()
-        print_exception(t, error, tb, file=buffer)
-        buffer.seek(0)
-        await self.bot.LOG_CHANNEL.send(embed=e, file=File(fp=buffer, filename='traceback.txt'))
-        buffer.close()
+        self.reporter.report(getattr(error, "original", error), e)
 
 
     async def send_app_error(self, ctx: ApplicationContext, error: ApplicationCommandError) -> None:
@@ -89,12 +110,7 @@ class Admin(commands.Cog, name="Admin", command_attrs=dict(hidden=True)):
             ]
         )
         e.set_author(name=str(ctx.user), icon_url=ctx.user.display_avatar.url)
-        buffer = StringIO()
-        t, _, tb = sys.exc_info()
-        print_exception(t, error, tb, file=buffer)
-        buffer.seek(0)
-        await self.bot.LOG_CHANNEL.send(embed=e, file=File(fp=buffer, filename='traceback.txt'))
-        buffer.close()
+        self.reporter.report(getattr(error, "original", error), e)
 
 
     @commands.command(
@@ -108,7 +124,10 @@ class Admin(commands.Cog, name="Admin", command_attrs=dict(hidden=True)):
     @commands.is_owner()
     async def user(self, ctx: commands.Context, user_id: Optional[int] = 0, name: Optional[str] = '') -> None:
 
-        if (user := get(self.bot.users, name=name) or get(self.bot.users, id=user_id)) is None:
+        if name and (found := self._find_user(ctx, name)) is not None:
+            user_id = found
+
+        if (user := self.bot.get_user(user_id)) is None:
             raise NotFoundError
 
         e = Embed(title=str(user), description='参加サーバー\n')
@@ -120,12 +139,88 @@ class Admin(commands.Cog, name="Admin", command_attrs=dict(hidden=True)):
         await self.bot.LOG_CHANNEL.send(embed=e)
 
 
+    def _find_user(self, ctx: commands.Context, name: str) -> Optional[int]:
+        """Returns the id of a user by name.
+
+        The name index only holds the members seen lately, so the members
+        of the guild and then every cached user are searched when it misses.
+        """
+
+        if ids := self.bot.names.find(name):
+            return ids[0]
+        if ctx.guild is not None and (member := ctx.guild.get_member_named(name)) is not None:
+            return member.id
+        if (user := find(lambda u: name in (u.name, u.display_name, str(u)), self.bot.users)) is not None:
+            return user.id
+        return None
+
+
+    async def _send_report(self, ctx: commands.Context, name: str, text: str) -> None:
+        path = DATA_DIR / "profiles" / f"{name}-{int(time.time())}.txt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        channel = self.bot.LOG_CHANNEL or ctx.channel
+        await channel.send(f"`{path.name}`", file=File(fp=StringIO(text), filename=path.name))
+
+
+    @commands.command(
+        name='metrics',
+        description='Show the metrics of the bot',
+        brief = 'メトリクスを表示',
+        usage = '!metrics',
+        hidden = True
+    )
+    @commands.is_owner()
+    async def metrics(self, ctx: commands.Context) -> None:
+        await ctx.send(f"```\n{self.bot.metrics.render()[:1990]}\n```")
+
+
+    @commands.command(
+        name='profile',
+        description='Sample the event loop and send collapsed stacks',
+        brief = 'イベントループをプロファイル',
+        usage = '!profile [seconds]',
+        hidden = True
+    )
+    @commands.is_owner()
+    async def profile(self, ctx: commands.Context, seconds: float = 30.0) -> None:
+
+        if self.profiler.is_running:
+            await ctx.send('Profiler is already running.')
+            return
+
+        await ctx.send(f'Profiling for {seconds:.0f}s...')
+        await self._send_report(ctx, 'profile', await self.profiler.run(min(seconds, 600.0)))
+
+
+    @commands.command(
+        name='memory',
+        aliases=['mem'],
+        description='Control tracemalloc (start, diff, stop)',
+        brief = 'メモリ割り当てを追跡',
+        usage = '!memory <start|diff|stop>',
+        hidden = True
+    )
+    @commands.is_owner()
+    async def memory(self, ctx: commands.Context, action: str = 'diff') -> None:
+
+        if action == 'start':
+            await self.tracer.start()
+            await ctx.send('tracemalloc started.')
+        elif not self.tracer.is_running:
+            await ctx.send('tracemalloc is not running.')
+        elif action == 'stop':
+            await self._send_report(ctx, 'memory', await self.tracer.stop())
+        else:
+            await self._send_report(ctx, 'memory', await self.tracer.diff())
+
+
     @commands.Cog.listener("on_command_error")
     async def command_error_handler(self, ctx: commands.Context, error: commands.CommandError) -> None:
         content: Optional[str] = None
 
         if isinstance(error, MyError):
-            content = error.localize()
+            content = error.localize(self.bot.settings.get(ctx.guild.id if ctx.guild else None).language)
         elif isinstance(error, commands.NoPrivateMessage):
             content = 'DMでこのコマンドは使えません。\nThis command is not available in DM channels.'
         elif isinstance(error, commands.CommandNotFound):
@@ -0,0 +1,70 @@
+from typing import TYPE_CHECKING
+import asyncio
+import os
+from discord.ext import commands
+from discord import slash_command, ApplicationContext
+
+from components.dashboard import Dashboard
+
+
+if TYPE_CHECKING:
+    from bot import QueueBot
+
+
+class Live(commands.Cog, name="Live"):
+
+    def __init__(self, bot: "QueueBot") -> None:
+        self.bot: QueueBot = bot
+        self.is_public: bool = True
+        self.description: str = "Live scoreboard"
+        self.description_localizations: dict[str, str] = {
+            "ja": "ライブスコアボード",
+            "en-US": "Live scoreboard"
+        }
+        self.dashboard = Dashboard(
+            bot.journals,
+            # Only reachable from this host unless DASHBOARD_HOST opts in to more.
+            os.environ.get("DASHBOARD_HOST", "127.0.0.1"),
+            int(os.environ["DASHBOARD_PORT"])
+        )
+        self.url: str = os.environ.get("DASHBOARD_URL", f"http://localhost:{self.dashboard.port}").rstrip("/")
+        self._started: bool = False
+        self.bot.journals.listeners.append(self.dashboard.on_event)
+
+
+    def cog_unload(self) -> None:
+        self.bot.journals.listeners.remove(self.dashboard.on_event)
+        asyncio.create_task(self.dashboard.stop())
+
+
+    @commands.Cog.listener("on_ready")
+    async def start_dashboard(self) -> None:
+        # on_ready fires again after reconnecting.
+        if not self._started:
+            self._started = True
+            await self.dashboard.start()
+
+
+    @commands.command(
+        name="live",
+        description="Show the link to the live scoreboard of this channel",
+        brief="このチャンネルのライブスコアボードのリンクを表示",
+        usage="live"
+    )
+    @commands.guild_only()
+    async def live(self, ctx: commands.Context) -> None:
+        await ctx.send(f"{self.url}/games/{ctx.channel.id}")
+
+
+    @slash_command(
+        name="live",
+        description="Show the link to the live scoreboard of this channel",
+        description_localizations={"ja": "このチャンネルのライブスコアボードのリンクを表示する"}
+    )
+    @commands.guild_only()
+    async def live_slash(self, ctx: ApplicationContext) -> None:
+        await ctx.respond(f"{self.url}/games/{ctx.channel.id}")
+
+
+def setup(bot: "QueueBot"):
+    bot.add_cog(Live(bot))
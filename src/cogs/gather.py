@@ -1,28 +1,61 @@
-from typing import TYPE_CHECKING
-from discord.ext import commands, pages
+from typing import TYPE_CHECKING, Optional, TypeVar, Union
+import asyncio
+import json
+import os
+import time
+from discord.ext import commands, pages, tasks
 from discord import (
     Embed,
+    HTTPException,
     Member,
     Option,
     DMChannel,
     OptionChoice,
-    SlashCommand,
     slash_command,
     SlashCommandGroup,
-    ApplicationContext
+    ApplicationContext,
+    AutocompleteContext
 )
 
 from errors import *
-from components.view import GatherView, FormatView, GameView, ResumeView
-from components.table import GatherTable, FormatTable, GameTable
-from components.utils import get_name
+from components.view import GatherView, FormatView, GameView, ResumeView, PlacementView
+from components.table import GatherTable, FormatTable, GameTable, PlacementTable
+from components.utils import DATA_DIR, get_name
+from components.pool import MatchmakingPool
+from components.projection import project
+from components.expiry import IdleTracker
+from components.throttle import Throttle
+from components.render import get_renderer
+from components.rules import ScoringRules, MAX_ROOM_SIZE, MAX_RACE_COUNT
+from components.screenshot import ScreenshotReader, is_screenshot
+from components.journal import AUDIT_EVENTS
+from components.hooks import GatherFilled, FormatChosen, RankAdded, GameFinished
 
 
 if TYPE_CHECKING:
-    from discord import Message
+    from discord import Message, Guild, Interaction, User
+    from discord.abc import Messageable
+    from components.journal import Event
     from bot import QueueBot
 
 
+CROSS_GUILD_POOL: bool = False # If you want to share the matchmaking pool among guilds, set this to True
+STRICT_PLACEMENT: bool = False # If you want to reject ranks already taken in the race, set this to True
+GATHER_IDLE: float = 30 * 60 # Seconds without activity before a gather is closed
+GAME_IDLE: float = 60 * 60 # Seconds without activity before a game is ended
+POOL_IDLE: float = 30 * 60 # Seconds without anyone joining the matchmaking pool from a channel before the players waiting from it are removed
+REMIND_BEFORE: Optional[float] = 5 * 60 # Seconds before closing to send a reminder, or None
+USER_BUCKET: tuple[float, float] = (5, 1.0) # Burst and tokens per second of each user's input
+CHANNEL_BUCKET: tuple[float, float] = (3, 0.5) # Burst and table renders or edits per second of each channel
+LIVE_TABLE_TTL: float = 5 * 60 # Seconds a gather or vote is held in memory after it was last touched
+RESTORE_CONCURRENCY: int = 8 # Channels restored at once on startup
+SCREENSHOT_RANKS: bool = False # If you want screenshots of race results to propose the ranks of the room, set this to True (requires Pillow, pytesseract and Tesseract)
+
+_POOLS_PATH = DATA_DIR / "pools.json"
+
+T = TypeVar("T", GatherTable, FormatTable)
+
+
 class Gather(commands.Cog, name="Gather"):
 
     def __init__(self, bot: "QueueBot") -> None:
@@ -33,11 +66,451 @@ class Gather(commands.Cog, name="Gather"):
             "ja": "ゲーム用コマンド",
             "en-US": "Game commands"
         }
+        self.pools: dict[tuple[int, int], MatchmakingPool] = {}
+        self._pooled: dict[str, int] = {}
+        self.user_throttle: Throttle = Throttle(*USER_BUCKET)
+        self.channel_throttle: Throttle = Throttle(*CHANNEL_BUCKET)
+        self._pending: dict[int, list[Message]] = {}
+        self._flushes: dict[int, asyncio.Task] = {}
+        self._tables: dict[int, Union[GatherTable, FormatTable, PlacementTable]] = {}
+        self._touched: dict[int, float] = {}
+        self._refreshes: dict[int, asyncio.Task] = {}
+        self._stale: set[int] = set()
+        self.idle: IdleTracker = IdleTracker({"gather": GATHER_IDLE, "game": GAME_IDLE, "pool": POOL_IDLE}, REMIND_BEFORE)
+        self._is_restored: bool = False
+        self.screenshots: Optional[ScreenshotReader] = None
+        if SCREENSHOT_RANKS:
+            try:
+                self.screenshots = ScreenshotReader()
+            except MissingDependency as error:
+                print(f"Screenshots are not read: {error.localize('en-US')}")
+        self._load_pools()
+        self.bot.journals.listeners.append(self._track_activity)
+        self.bot.journals.listeners.append(self._publish_hooks)
+        self.expire_tables.start()
+
+
+    def cog_unload(self) -> None:
+        self.expire_tables.cancel()
+        self.bot.journals.listeners.remove(self._track_activity)
+        self.bot.journals.listeners.remove(self._publish_hooks)
+        if self.screenshots is not None:
+            self.screenshots.close()
+
+
+    async def drain(self) -> None:
+        """Applies the rank messages and edits still held back by the channel throttle. Called on shutdown."""
+
+        await asyncio.gather(*self._flushes.values(), *self._refreshes.values(), return_exceptions=True)
+
+
+    def flush(self) -> None:
+        """Saves the players waiting in the matchmaking pools, the only state not in a store. Called on shutdown."""
+
+        data = [
+            {"key": list(key), "waiting": waiting, "members": {name: self._pooled.get(name) for name, _ in waiting}}
+            for key, pool in self.pools.items()
+            if (waiting := pool.waiting())
+        ]
+        tmp = _POOLS_PATH.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as fp:
+            json.dump(data, fp, ensure_ascii=False)
+        os.replace(tmp, _POOLS_PATH)
+
+
+    def _load_pools(self) -> None:
+        if not _POOLS_PATH.exists():
+            return
+
+        now = time.time()
+        with _POOLS_PATH.open(encoding="utf-8") as fp:
+            for entry in json.load(fp):
+                pool = self.pools[tuple(entry["key"])] = MatchmakingPool(entry["key"][1])
+                for name, channel_id in entry["waiting"]:
+                    pool.join(name, channel_id)
+                    self.idle.touch(channel_id, "pool", now)
+                self._pooled.update({k: v for k, v in entry.get("members", {}).items() if v is not None})
+
+        # Only valid right after the shutdown that wrote it.
+        _POOLS_PATH.unlink()
 
     game = SlashCommandGroup(name="game", description="Game related commands")
     race = game.create_subgroup(name="race")
 
 
+    def _track_activity(self, channel_id: int, event: "Event") -> None:
+        if event.type in AUDIT_EVENTS:
+            self.idle.touch(channel_id, "gather", event.timestamp)
+        elif event.type == "start":
+            self.idle.discard(channel_id, "gather")
+            self.idle.touch(channel_id, "game", event.timestamp)
+        elif event.type == "end":
+            self.idle.discard(channel_id, "game")
+        elif event.type != "message":
+            self.idle.touch(channel_id, "game", event.timestamp)
+
+
+    def _publish_hooks(self, channel_id: int, event: "Event") -> None:
+        """Turns the journal events of a game into the events of :attr:`QueueBot.events`."""
+
+        if event.type not in ("start", "add", "end") or event.data.get("restored"):
+            return
+
+        game = self.bot.journals[channel_id].game
+        guild_id = getattr(getattr(self.bot.get_channel(channel_id), "guild", None), "id", None)
+
+        if event.type == "start":
+            self.bot.events.publish(FormatChosen(guild_id, channel_id, game.format, list(game._players)))
+        elif event.type == "add":
+            race = event.data["race"] or len(game._players[event.data["name"]].placements)
+            self.bot.events.publish(RankAdded(guild_id, channel_id, event.data["name"], int(event.data["rank"]), race))
+            if game.is_done:
+                self.bot.events.publish(GameFinished(guild_id, channel_id, game))
+        elif not game.is_done:
+            # A game played to the end has been published by its last rank already.
+            self.bot.events.publish(GameFinished(guild_id, channel_id, game))
+
+
+    @commands.Cog.listener("on_ready")
+    async def restore_tables(self) -> None:
+        """Loads the journals of the channels active before a restart, and resumes their idle timers.
+
+        Journals are read concurrently, so that the first command in each
+        channel does not have to. A journal that cannot be read is
+        replaced by the table found in the history of its channel.
+        """
+
+        # on_ready fires again after reconnecting, with everything still in memory.
+        if self._is_restored:
+            return
+        self._is_restored = True
+
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(RESTORE_CONCURRENCY)
+        channel_ids = self.bot.journals.recent(time.time() - max(GATHER_IDLE, GAME_IDLE))
+        await asyncio.gather(*(self._restore(channel_id, semaphore) for channel_id in channel_ids))
+        self.bot.metrics.observe("startup.restore", time.perf_counter() - started)
+
+
+    async def _restore(self, channel_id: int, semaphore: asyncio.Semaphore) -> None:
+        if (channel := self.bot.get_channel(channel_id)) is None:
+            return
+
+        async with semaphore:
+            journal = await self.bot.journals.preload(channel_id)
+            if journal.events:
+                self.bot.metrics.incr("startup.journals")
+            else:
+                # Its file was unreadable and has been quarantined.
+                self.bot.metrics.incr("startup.scans")
+                try:
+                    await self._fetch_game(channel, allow_archived=True)
+                except (MyError, HTTPException):
+                    return
+                journal = self.bot.journals[channel_id]
+
+        for event in journal.events:
+            self._track_activity(channel_id, event)
+
+
+    @tasks.loop(seconds=30)
+    async def expire_tables(self) -> None:
+        self._release_tables(time.monotonic())
+
+        for channel_id, kind, is_reminder in self.idle.advance(time.time()):
+            try:
+                await self._expire(channel_id, kind, is_reminder)
+            except (MyError, HTTPException):
+                pass
+
+            if not is_reminder and kind != "pool":
+                self.bot.journals.evict(channel_id)
+
+
+    @expire_tables.before_loop
+    async def before_expire_tables(self) -> None:
+        await self.bot.wait_until_ready()
+
+
+    async def _expire(self, channel_id: int, kind: str, is_reminder: bool) -> None:
+        """Reminds or closes a table that has been idle, the same way ``end`` does."""
+
+        if (channel := self.bot.get_channel(channel_id)) is None:
+            return
+
+        if kind == "pool":
+            await self._expire_pool(channel, is_reminder)
+        elif is_reminder:
+            await channel.send(
+                f"操作がないため{REMIND_BEFORE/60:.0f}分後に{'募集' if kind == 'gather' else 'ゲーム'}を終了します。\n"
+                f"This {kind} will be closed in {REMIND_BEFORE/60:.0f} minutes without activity."
+            )
+        elif kind == "game":
+            table = await self._fetch_game(channel, max_age=None)
+            table.is_done = True
+            self.bot.journals[channel_id].set_done(None, True)
+            await table.message.edit(embed=table.embed, view=ResumeView())
+        else:
+            journal = self.bot.journals[channel_id]
+            gathers = [e for e in journal.events if e.type == "gather" and "message" in e.data]
+            if not gathers:
+                return
+            message_id = gathers[-1].data["message"]
+            table = self._tables.get(message_id) or self._hold(GatherTable.from_message(await channel.fetch_message(message_id)))
+            if not table.is_done:
+                table.is_done = True
+                await table.message.edit(embed=table.embed, view=None)
+
+
+    async def _expire_pool(self, channel: "Messageable", is_reminder: bool) -> None:
+        """Reminds, or removes, the players waiting in the matchmaking pool since they joined from ``channel``."""
+
+        pool = self._pool(channel.guild)
+        names = [name for name, channel_id in pool.waiting() if channel_id == channel.id]
+        if not names:
+            return
+
+        mentions = " ".join(self._mention(name) for name in names)
+        if is_reminder:
+            await channel.send(
+                f"{mentions}\n"
+                f"{REMIND_BEFORE/60:.0f}分後にマッチングプールから外れます。待ち続ける場合はもう一度参加してください。\n"
+                f"You will leave the matchmaking pool in {REMIND_BEFORE/60:.0f} minutes. Join again to keep waiting."
+            )
+            return
+
+        for name in names:
+            pool.leave(name)
+            self._pooled.pop(name, None)
+        await channel.send(f"{mentions}\nマッチングプールから外れました。\nYou have left the matchmaking pool.")
+
+
+    def _mention(self, name: str) -> str:
+        return name if (user_id := self._pooled.get(name)) is None else f"<@{user_id}>"
+
+
+    def _pool(self, guild: "Guild") -> MatchmakingPool:
+        size = self.bot.settings.get(guild.id).room_size
+        key = (0 if CROSS_GUILD_POOL else guild.id, size)
+
+        if (pool := self.pools.get(key)) is None:
+            pool = self.pools[key] = MatchmakingPool(size)
+        return pool
+
+
+    async def _join_pool(self, channel: "Messageable", members: list["Member"]) -> int:
+        """Adds members to the matchmaking pool and opens a room whenever it has enough waiting players.
+
+        Parameters
+        ----------
+        channel : Messageable
+            The channel the members joined from.
+        members : list[Member]
+            The members to add.
+
+        Returns
+        -------
+        int
+            The number of players still waiting.
+        """
+
+        pool = self._pool(channel.guild)
+
+        for m in members:
+            pool.join(get_name(m), channel.id)
+            self._pooled[get_name(m)] = m.id
+        self.idle.touch(channel.id, "pool", time.time())
+
+        while (room := pool.pop_room()) is not None:
+            # The room is opened where the longest waiting player joined from.
+            target = self.bot.get_channel(room[0][1]) or channel
+            formats = self.bot.settings.get(target.guild.id).formats
+            self.bot.events.publish(GatherFilled(target.guild.id, target.id, [name for name, _ in room]))
+            message = await target.send(
+                " ".join(self._mention(name) for name, _ in room),
+                embed=FormatTable({-1: {name for name, _ in room}}, formats=formats, size=len(room)).embed,
+                view=FormatView(formats)
+            )
+            await self._notify_room(room, target, message)
+
+        return len(pool)
+
+
+    async def _notify_room(self, room: list[tuple[str, int]], target: "Messageable", message: "Message") -> None:
+        """Sends the room to the players who joined the pool from another guild, as mentions reach them only in theirs."""
+
+        for name, channel_id in room:
+            user_id = self._pooled.pop(name, None)
+            if (
+                user_id is None
+                or (channel := self.bot.get_channel(channel_id)) is None
+                or channel.guild.id == target.guild.id
+                or (user := self.bot.get_user(user_id)) is None
+            ):
+                continue
+            try:
+                await user.send(f"マッチングの部屋が開きました。\nA room has opened for you: {message.jump_url}")
+            except HTTPException:
+                pass
+
+
+    def _leave_pool(self, guild: "Guild", members: list["Member"]) -> list["Member"]:
+        pool = self._pool(guild)
+        left = [m for m in members if pool.leave(get_name(m))]
+        for m in left:
+            self._pooled.pop(get_name(m), None)
+        return left
+
+
+    async def _member_autocomplete(self, ctx: AutocompleteContext) -> list[OptionChoice]:
+        started = time.perf_counter()
+        matches = self.bot.names[ctx.interaction.guild_id].search(ctx.value or "")
+        self.bot.metrics.observe("autocomplete.member", time.perf_counter() - started)
+        return [OptionChoice(name=name, value=name) for name, _ in matches]
+
+
+    def _resolve_member(self, guild: "Guild", value: Optional[str]) -> Optional[Member]:
+        """Returns the member chosen in an autocompleted option: a name from the index, a mention, an id or any name of a member.
+
+        Raises
+        ------
+        NotFoundError
+            If no member of the guild matches.
+        """
+
+        if value is None:
+            return None
+
+        if (member_id := self.bot.names[guild.id].get(value)) is None:
+            digits = value.strip("<@!>")
+            member_id = int(digits) if digits.isdigit() else None
+
+        if member_id is not None and (member := guild.get_member(member_id)) is not None:
+            return member
+        # A member the index has not seen yet.
+        if (member := guild.get_member_named(value)) is None:
+            raise NotFoundError
+        return member
+
+
+    @commands.Cog.listener("on_interaction")
+    async def _index_interaction(self, interaction: "Interaction") -> None:
+        if isinstance(interaction.user, Member):
+            self.bot.names.touch(interaction.user)
+
+
+    @commands.Cog.listener("on_command")
+    async def _index_command(self, ctx: commands.Context) -> None:
+        self.bot.names.touch(ctx.author)
+
+
+    @commands.Cog.listener("on_member_update")
+    async def _index_member_update(self, before: Member, after: Member) -> None:
+        if get_name(before) != get_name(after) and after.id in self.bot.names[after.guild.id]:
+            self.bot.names[after.guild.id].add(after.id, get_name(after))
+
+
+    @commands.Cog.listener("on_user_update")
+    async def _index_user_update(self, before: "User", after: "User") -> None:
+        if before.name != after.name:
+            self.bot.names.rename(after.id, get_name(after))
+
+
+    @commands.Cog.listener("on_member_remove")
+    async def _index_member_remove(self, member: Member) -> None:
+        self.bot.names[member.guild.id].remove(member.id)
+
+
+    async def _fetch_game(
+        self,
+        channel: "Messageable",
+        allow_archived: bool = False,
+        max_age: Optional[float] = 60 * 60
+    ) -> GameTable:
+        """Returns the game table of a channel.
+
+        The journal of the channel is used when it holds a game updated
+        within ``max_age`` seconds, so that the message history is only
+        scanned after a restart or for games that predate the journal.
+        """
+
+        journal = self.bot.journals[channel.id]
+
+        if (
+            journal.game is not None
+            and journal.message_id is not None
+            and (max_age is None or time.time() - journal.updated_at < max_age)
+        ):
+            if journal.is_done and not allow_archived:
+                raise ArchivedTable
+            table = GameTable(journal.game, channel.get_partial_message(journal.message_id), journal.is_done)
+        else:
+            table = await GameTable.fetch(channel, allow_archived=allow_archived, rules=self._rules(channel))
+            table._game = self.bot.journals.restore(channel.id, table).game
+
+        table._game.strict = STRICT_PLACEMENT
+        return table
+
+
+    def _rules(self, channel: "Messageable") -> ScoringRules:
+        """Returns the rules to read the game table of a channel with.
+
+        Those of the game in the journal, which may have started before
+        the settings of the guild changed, or else the current ones.
+        """
+
+        if (game := self.bot.journals[channel.id].game) is not None:
+            return game.rules
+        return self.bot.settings.get(channel.guild.id).rules
+
+
+    def _mutate(self, channel: "Messageable", table: GameTable, type: str, actor: "Member", **data) -> None:
+        table._game = self.bot.journals[channel.id].apply(type, actor.id, **data)
+        self._on_game_update(channel, table)
+
+
+    def _set_message(self, channel: "Messageable", message: "Message") -> None:
+        journal = self.bot.journals[channel.id]
+        journal.set_message(message.id)
+        if journal.game is not None:
+            get_renderer(journal.game).publish()
+
+
+    async def _edit_table(self, table: GameTable) -> None:
+        """Edits the message of a game table, unless its content would not change."""
+
+        embed = table.embed
+        if table.renderer.is_published:
+            self.bot.metrics.incr("render.skipped")
+            return
+
+        await table.message.edit(embed=embed)
+        table.renderer.publish()
+
+
+    def _on_game_update(self, channel: "Messageable", table: GameTable) -> None:
+        """Called after every change to the game table of a channel.
+
+        Parameters
+        ----------
+        channel : Messageable
+            The channel the game is played in.
+        table : GameTable
+            The updated table.
+        """
+
+        if table._game.is_done and getattr(channel, "guild", None) is not None:
+            # A copy, since the game keeps changing on the loop while the store writes it.
+            self.bot.stats.submit(
+                self.bot.stats.record,
+                channel.guild.id,
+                channel.id,
+                table._game.copy(),
+                time.time(),
+                self.bot.journals[channel.id].started_at
+            )
+
+
     @commands.command(
         name="start",
         description="Call for participants in the game",
@@ -46,10 +519,11 @@ class Gather(commands.Cog, name="Gather"):
     )
     @commands.guild_only()
     async def start(self, ctx: commands.Context) -> None:
-        await ctx.send(
-            embed=GatherTable({get_name(ctx.author)}).embed,
+        message = await ctx.send(
+            embed=GatherTable({get_name(ctx.author)}, size=self.bot.settings.get(ctx.guild.id).room_size).embed,
             view=GatherView()
         )
+        self.bot.journals[ctx.channel.id].record("gather", ctx.author.id, message=message.id)
 
 
     @game.command(
@@ -60,11 +534,12 @@ class Gather(commands.Cog, name="Gather"):
     @commands.guild_only()
     async def game_start(self, ctx: ApplicationContext) -> None:
         await ctx.response.defer()
-        await ctx.respond(
+        message = await ctx.respond(
             content = "参加者の募集を開始します。" if ctx.locale=="ja" else "Starting to gather participants.",
-            embed=GatherTable({get_name(ctx.user)}).embed,
+            embed=GatherTable({get_name(ctx.user)}, size=self.bot.settings.get(ctx.guild.id).room_size).embed,
             view=GatherView()
         )
+        self.bot.journals[ctx.channel.id].record("gather", ctx.user.id, message=message.id)
 
 
     @commands.command(
@@ -76,22 +551,43 @@ class Gather(commands.Cog, name="Gather"):
     )
     @commands.guild_only()
     async def can(self, ctx: commands.Context, members: commands.Greedy[Member] = []) -> None:
-        table = await GatherTable.fetch(ctx.channel)
         _members = members or [ctx.author]
+        for m in members:
+            self.bot.names.touch(m)
 
-        if len(_members) + len(table.names) > 12:
-            raise InvalidPlayerNum
+        try:
+            table = self._hold(await GatherTable.fetch(ctx.channel))
+        except ArchivedTable:
+            table = None
 
-        for m in _members:
-            table.add_name(m)
+        joined: list[Member] = []
+        overflow: list[Member] = []
 
-        await ctx.send(f"{', '.join(m.mention for m in _members)} has joined the game. (@{12-len(table.names)})")
+        for m in _members:
+            if table is not None and get_name(m) in table.names:
+                continue
+            if table is None or table.is_done:
+                overflow.append(m)
+            else:
+                table.add_name(m)
+                joined.append(m)
+
+        if joined:
+            self._leave_pool(ctx.guild, joined)
+            self.bot.journals[ctx.channel.id].record("join", ctx.author.id, names=[get_name(m) for m in joined])
+            await ctx.send(f"{', '.join(m.mention for m in joined)} has joined the game. (@{table.size-len(table.names)})")
+
+            if table.is_done:
+                self.bot.events.publish(GatherFilled(ctx.guild.id, ctx.channel.id, list(table.names)))
+                formats = self.bot.settings.get(ctx.guild.id).formats
+                await ctx.send(embed=FormatTable({-1:table.names}, formats=formats, size=table.size).embed, view=FormatView(formats))
+                await table.message.edit(embed=table.embed, view=None)
+            else:
+                self._refresh_later(table)
 
-        if table.is_done:
-            await ctx.send(embed=FormatTable({-1:table.names}).embed, view=FormatView())
-            await table.message.edit(embed=table.embed, view=None)
-        else:
-            await table.message.edit(embed=table.embed)
+        if overflow:
+            waiting = await self._join_pool(ctx.channel, overflow)
+            await ctx.send(f"{', '.join(m.mention for m in overflow)} has joined the matchmaking pool. ({waiting} waiting)")
 
 
     @game.command(
@@ -104,29 +600,49 @@ class Gather(commands.Cog, name="Gather"):
         self,
         ctx: ApplicationContext,
         member: Option(
-            Member,
+            str,
             name="member",
             name_localizations={"ja": "メンバー"},
             description="The member to join the game",
             description_localizations={"ja": "ゲームに参加するメンバー"},
+            autocomplete=_member_autocomplete,
             default=None,
             required=False
         )
     ) -> None:
         await ctx.response.defer()
-        _member: Member = member or ctx.user
-        table = await GatherTable.fetch(ctx.channel)
+        _member: Member = self._resolve_member(ctx.guild, member) or ctx.user
+
+        try:
+            table = self._hold(await GatherTable.fetch(ctx.channel))
+        except ArchivedTable:
+            table = None
+
+        if table is None or (table.is_done and get_name(_member) not in table.names):
+            waiting = await self._join_pool(ctx.channel, [_member])
+            await ctx.respond(
+                f"{_member.name}さんがマッチングプールに参加しました。(待機中: {waiting}人)" if ctx.locale=="ja"
+                else f"{_member.name} has joined the matchmaking pool. ({waiting} waiting)"
+            )
+            return
+
+        # Only the join that fills the table opens the vote.
+        was_done = table.is_done
         table.add_name(_member)
+        self._leave_pool(ctx.guild, [_member])
+        self.bot.journals[ctx.channel.id].record("join", ctx.user.id, names=[get_name(_member)])
 
         await ctx.respond(
             f"{_member.name}さんがゲームに参加しました。" if ctx.locale=="ja" else f"{_member.name} has joined the game.",
         )
 
-        if table.is_done:
-            await ctx.respond(embed=FormatTable({-1:table.names}).embed, view=FormatView())
+        if table.is_done and not was_done:
+            self.bot.events.publish(GatherFilled(ctx.guild.id, ctx.channel.id, list(table.names)))
+            formats = self.bot.settings.get(ctx.guild.id).formats
+            await ctx.respond(embed=FormatTable({-1:table.names}, formats=formats, size=table.size).embed, view=FormatView(formats))
             await table.message.edit(embed=table.embed, view=None)
-        else:
-            await table.message.edit(embed=table.embed)
+        elif not table.is_done:
+            self._refresh_later(table)
 
 
     @commands.command(
@@ -138,14 +654,27 @@ class Gather(commands.Cog, name="Gather"):
     )
     @commands.guild_only()
     async def drop(self, ctx: commands.Context, members: commands.Greedy[Member] = []) -> None:
-        table = await GatherTable.fetch(ctx.channel)
         _members = members or [ctx.author]
+        left = self._leave_pool(ctx.guild, _members)
+
+        try:
+            table = self._hold(await GatherTable.fetch(ctx.channel))
+            # The message may not show yet that the table has been filled.
+            if table.is_done:
+                raise ArchivedTable
+        except (TableNotFound, ArchivedTable):
+            if not left:
+                raise
+            await ctx.send(f"{', '.join(m.mention for m in left)} has left the matchmaking pool.")
+            return
 
         for m in _members:
             table.remove_name(m)
 
-        await table.message.edit(embed=table.embed)
-        await ctx.send(f"{', '.join(m.mention for m in _members)} has dropped the game. (@{12-len(table.names)})")
+        self.bot.journals[ctx.channel.id].record("leave", ctx.author.id, names=[get_name(m) for m in _members])
+
+        self._refresh_later(table)
+        await ctx.send(f"{', '.join(m.mention for m in _members)} has dropped the game. (@{table.size-len(table.names)})")
 
 
     @game.command(
@@ -158,20 +687,37 @@ class Gather(commands.Cog, name="Gather"):
         self,
         ctx: ApplicationContext,
         member: Option(
-            Member,
+            str,
             name="member",
             name_localizations={"ja": "メンバー"},
             description="The member to drop the game",
             description_localizations={"ja": "ゲームから抜けるメンバー"},
+            autocomplete=_member_autocomplete,
             default=None,
             required=False
         )
     ) -> None:
         await ctx.response.defer()
-        _member: Member = member or ctx.user
-        table = await GatherTable.fetch(ctx.channel)
+        _member: Member = self._resolve_member(ctx.guild, member) or ctx.user
+        left = self._leave_pool(ctx.guild, [_member])
+
+        try:
+            table = self._hold(await GatherTable.fetch(ctx.channel))
+            # The message may not show yet that the table has been filled.
+            if table.is_done:
+                raise ArchivedTable
+        except (TableNotFound, ArchivedTable):
+            if not left:
+                raise
+            await ctx.respond(
+                f"{_member.name}さんがマッチングプールから抜けました。" if ctx.locale=="ja"
+                else f"{_member.name} has left the matchmaking pool."
+            )
+            return
+
         table.remove_name(_member)
-        await table.message.edit(embed=table.embed)
+        self.bot.journals[ctx.channel.id].record("leave", ctx.user.id, names=[get_name(_member)])
+        self._refresh_later(table)
         await ctx.respond(
             f"{_member.name}さんがゲームから抜けました。" if ctx.locale=="ja" else f"{_member.name} has dropped the game.",
         )
@@ -189,11 +735,11 @@ class Gather(commands.Cog, name="Gather"):
         self,
         ctx: commands.Context,
         rank: int,
-        number: int = 12,
+        number: int = 0,
     ) -> None:
-        table = await GameTable.fetch(ctx.channel)
-        table._game.get_player(get_name(ctx.author)).add_rank(rank, number)
-        await ctx.send(embed=table.embed, view=GameView())
+        table = await self._fetch_game(ctx.channel)
+        self._mutate(ctx.channel, table, "add", ctx.author, name=get_name(ctx.author), rank=rank, race=number or None)
+        self._set_message(ctx.channel, await ctx.send(embed=table.embed, view=GameView()))
         await table.message.delete()
 
 
@@ -214,7 +760,7 @@ class Gather(commands.Cog, name="Gather"):
             description_localizations={"ja": "登録する順位"},
             required=True,
             min_value=1,
-            max_value=12
+            max_value=MAX_ROOM_SIZE
         ),
         number: Option(
             int,
@@ -224,14 +770,14 @@ class Gather(commands.Cog, name="Gather"):
             description_localizations={"ja": "設定しないと最後のレースになります"},
             required=False,
             min_value=1,
-            max_value=12,
-            default=12
+            max_value=MAX_RACE_COUNT,
+            default=0
         )
     ) -> None:
         await ctx.response.defer()
-        table = await GameTable.fetch(ctx.channel)
-        table._game.get_player(get_name(ctx.user)).add_rank(rank, number)
-        await ctx.respond(embed=table.embed, view=GameView())
+        table = await self._fetch_game(ctx.channel)
+        self._mutate(ctx.channel, table, "add", ctx.user, name=get_name(ctx.user), rank=rank, race=number or None)
+        self._set_message(ctx.channel, await ctx.respond(embed=table.embed, view=GameView()))
         await table.message.delete()
 
 
@@ -244,9 +790,9 @@ class Gather(commands.Cog, name="Gather"):
     )
     @commands.guild_only()
     async def back(self, ctx: commands.Context) -> None:
-        table = await GameTable.fetch(ctx.channel)
-        table._game.get_player(get_name(ctx.author)).remove_rank()
-        await ctx.send(embed=table.embed, view=GameView())
+        table = await self._fetch_game(ctx.channel)
+        self._mutate(ctx.channel, table, "back", ctx.author, name=get_name(ctx.author), index=-1)
+        self._set_message(ctx.channel, await ctx.send(embed=table.embed, view=GameView()))
         await table.message.delete()
 
 
@@ -267,14 +813,14 @@ class Gather(commands.Cog, name="Gather"):
             description_localizations={"ja": "設定しないと最後のレースになります"},
             required=False,
             min_value=1,
-            max_value=12,
+            max_value=MAX_RACE_COUNT,
             default=0
         )
     ) -> None:
         await ctx.response.defer()
-        table = await GameTable.fetch(ctx.channel)
-        table._game.get_player(get_name(ctx.author)).remove_rank(number-1)
-        await ctx.respond(embed=table.embed, view=GameView())
+        table = await self._fetch_game(ctx.channel)
+        self._mutate(ctx.channel, table, "back", ctx.author, name=get_name(ctx.author), index=number-1)
+        self._set_message(ctx.channel, await ctx.respond(embed=table.embed, view=GameView()))
         await table.message.delete()
 
 
@@ -291,9 +837,9 @@ class Gather(commands.Cog, name="Gather"):
         rank: int,
         _index: int = 0,
     ) -> None:
-        table = await GameTable.fetch(ctx.channel)
-        table._game.get_player(get_name(ctx.author)).edit_rank(rank, _index-1)
-        await table.message.edit(embed=table.embed)
+        table = await self._fetch_game(ctx.channel)
+        self._mutate(ctx.channel, table, "edit", ctx.author, name=get_name(ctx.author), rank=rank, index=_index-1)
+        await self._edit_table(table)
         await ctx.send("Edit complete.")
 
 
@@ -314,7 +860,7 @@ class Gather(commands.Cog, name="Gather"):
             description_localizations={"ja": "登録する順位"},
             required=True,
             min_value=1,
-            max_value=12
+            max_value=MAX_ROOM_SIZE
         ),
         number: Option(
             int,
@@ -324,17 +870,185 @@ class Gather(commands.Cog, name="Gather"):
             description_localizations={"ja": "設定しないと最後のレースになります"},
             required=False,
             min_value=1,
-            max_value=12,
+            max_value=MAX_RACE_COUNT,
             default=0
         )
     ) -> None:
         await ctx.response.defer()
-        table = await GameTable.fetch(ctx.channel)
-        table._game.get_player(get_name(ctx.author)).edit_rank(rank, number-1)
-        await table.message.edit(embed=table.embed)
+        table = await self._fetch_game(ctx.channel)
+        self._mutate(ctx.channel, table, "edit", ctx.author, name=get_name(ctx.author), rank=rank, index=number-1)
+        await self._edit_table(table)
         await ctx.respond("レースを編集しました。" if ctx.locale == "ja" else "Edit complete.")
 
 
+    async def _undo(self, channel: "Messageable", actor: "Member", redo: bool = False) -> GameTable:
+        table = await self._fetch_game(channel)
+        table._game.get_player(get_name(actor))
+        journal = self.bot.journals[channel.id]
+
+        # Only the actor of a mutation, or an admin, may revert or reapply it.
+        event = journal.redoable if redo else journal.undoable
+        if event is not None and event.actor != actor.id and not actor.guild_permissions.manage_guild:
+            raise NotYourChange
+
+        table._game = journal.redo(actor.id) if redo else journal.undo(actor.id)
+        table._game.strict = STRICT_PLACEMENT
+        self._on_game_update(channel, table)
+        return table
+
+
+    def _history_embed(self, channel: "Messageable", limit: int = 20) -> Embed:
+        events = self.bot.journals[channel.id].events[-limit:]
+
+        if not events:
+            raise NotFoundError
+
+        e = Embed(title="History", description="")
+        for event in events:
+            actor = f"<@{event.actor}>" if event.actor else "-"
+            data = " ".join(f"{k}={v}" for k, v in event.data.items() if k not in ("game", "rules") and v is not None)
+            e.description += f"<t:{int(event.timestamp)}:T> {actor} **{event.type}** {data}\n"
+        return e
+
+
+    @commands.command(
+        name="undo",
+        description="Undo the last change of the game",
+        brief="直前の変更を取り消す",
+        usage="undo"
+    )
+    @commands.guild_only()
+    async def undo(self, ctx: commands.Context) -> None:
+        table = await self._undo(ctx.channel, ctx.author)
+        self._set_message(ctx.channel, await ctx.send(embed=table.embed, view=GameView()))
+        await table.message.delete()
+
+
+    @game.command(
+        name="undo",
+        description="Undo the last change of the game",
+        description_localizations={"ja": "直前の変更を取り消す"}
+    )
+    @commands.guild_only()
+    async def game_undo(self, ctx: ApplicationContext) -> None:
+        await ctx.response.defer()
+        table = await self._undo(ctx.channel, ctx.user)
+        self._set_message(ctx.channel, await ctx.respond(embed=table.embed, view=GameView()))
+        await table.message.delete()
+
+
+    @commands.command(
+        name="redo",
+        description="Redo the last undone change of the game",
+        brief="取り消した変更をやり直す",
+        usage="redo"
+    )
+    @commands.guild_only()
+    async def redo(self, ctx: commands.Context) -> None:
+        table = await self._undo(ctx.channel, ctx.author, redo=True)
+        self._set_message(ctx.channel, await ctx.send(embed=table.embed, view=GameView()))
+        await table.message.delete()
+
+
+    @game.command(
+        name="redo",
+        description="Redo the last undone change of the game",
+        description_localizations={"ja": "取り消した変更をやり直す"}
+    )
+    @commands.guild_only()
+    async def game_redo(self, ctx: ApplicationContext) -> None:
+        await ctx.response.defer()
+        table = await self._undo(ctx.channel, ctx.user, redo=True)
+        self._set_message(ctx.channel, await ctx.respond(embed=table.embed, view=GameView()))
+        await table.message.delete()
+
+
+    @commands.command(
+        name="history",
+        description="Show who changed the game",
+        brief="ゲームの変更履歴を表示",
+        usage="history"
+    )
+    @commands.guild_only()
+    async def history(self, ctx: commands.Context) -> None:
+        await ctx.send(embed=self._history_embed(ctx.channel))
+
+
+    @game.command(
+        name="history",
+        description="Show who changed the game",
+        description_localizations={"ja": "ゲームの変更履歴を表示する"}
+    )
+    @commands.guild_only()
+    async def game_history(self, ctx: ApplicationContext) -> None:
+        await ctx.response.defer(ephemeral=True)
+        await ctx.respond(embed=self._history_embed(ctx.channel), ephemeral=True)
+
+
+    async def _projection_embed(self, table: GameTable, guild_id: int, simulations: int, weighted: bool) -> Embed:
+        histograms = None
+
+        if weighted:
+            histograms = {name: self.bot.stats.histogram(guild_id, name) for name in table._game._players}
+
+        # Simulated on a copy, as the game may change while the thread runs.
+        results = await asyncio.to_thread(project, table._game.copy(), simulations, histograms)
+        e = Embed(title=f"Projection ({simulations:,} simulations)")
+        e.description = "\n".join(
+            f"`{i+1}.` **{label}**  {probability:.1%} ({points:.1f}pt)"
+            for i, (label, probability, points) in enumerate(results)
+        )
+        return e
+
+
+    @commands.command(
+        aliases=['proj'],
+        name="projection",
+        description="Simulate the remaining races",
+        brief="残りのレースをシミュレーション",
+        usage="projection"
+    )
+    @commands.guild_only()
+    async def projection(self, ctx: commands.Context) -> None:
+        table = await self._fetch_game(ctx.channel)
+        await ctx.send(embed=await self._projection_embed(table, ctx.guild.id, 100_000, False))
+
+
+    @game.command(
+        name="projection",
+        description="Simulate the remaining races",
+        description_localizations={"ja": "残りのレースをシミュレーションする"}
+    )
+    @commands.guild_only()
+    async def game_projection(
+        self,
+        ctx: ApplicationContext,
+        simulations: Option(
+            int,
+            name="simulations",
+            name_localizations={"ja": "試行回数"},
+            description="The number of simulations",
+            description_localizations={"ja": "シミュレーションの試行回数"},
+            min_value=1000,
+            max_value=200_000,
+            default=100_000,
+            required=False
+        ),
+        weighted: Option(
+            bool,
+            name="weighted",
+            name_localizations={"ja": "戦績を反映"},
+            description="Weight placements by each player's history",
+            description_localizations={"ja": "各プレイヤーの過去の順位分布を反映します"},
+            default=False,
+            required=False
+        )
+    ) -> None:
+        await ctx.response.defer()
+        table = await self._fetch_game(ctx.channel)
+        await ctx.respond(embed=await self._projection_embed(table, ctx.guild.id, simulations, weighted))
+
+
     @commands.command(
         name="end",
         description="End the game",
@@ -343,8 +1057,9 @@ class Gather(commands.Cog, name="Gather"):
     )
     @commands.guild_only()
     async def end(self, ctx: commands.Context) -> None:
-        table = await GameTable.fetch(ctx.channel)
+        table = await self._fetch_game(ctx.channel)
         table.is_done = True
+        self.bot.journals[ctx.channel.id].set_done(ctx.author.id, True)
         await table.message.edit(embed=table.embed, view=ResumeView())
         await ctx.send("Finished the game.")
 
@@ -357,8 +1072,9 @@ class Gather(commands.Cog, name="Gather"):
     @commands.guild_only()
     async def game_end(self, ctx: ApplicationContext) -> None:
         await ctx.response.defer()
-        table = await GameTable.fetch(ctx.channel)
+        table = await self._fetch_game(ctx.channel)
         table.is_done = True
+        self.bot.journals[ctx.channel.id].set_done(ctx.author.id, True)
         await table.message.edit(embed=table.embed, view=ResumeView())
         await ctx.respond("ゲームを終了しました。" if ctx.locale == "ja" else "Finished the game.")
 
@@ -371,8 +1087,9 @@ class Gather(commands.Cog, name="Gather"):
     )
     @commands.guild_only()
     async def resume(self, ctx: commands.Context) -> None:
-        table = await GameTable.fetch(ctx.channel, allow_archived=True)
+        table = await self._fetch_game(ctx.channel, allow_archived=True)
         table.is_done = False
+        self.bot.journals[ctx.channel.id].set_done(ctx.author.id, False)
         await table.message.edit(embed=table.embed, view=GameView())
         await ctx.send("Resumed the game.")
 
@@ -385,8 +1102,9 @@ class Gather(commands.Cog, name="Gather"):
     @commands.guild_only()
     async def game_resume(self, ctx: ApplicationContext) -> None:
         await ctx.response.defer()
-        table = await GameTable.fetch(ctx.channel, allow_archived=True)
+        table = await self._fetch_game(ctx.channel, allow_archived=True)
         table.is_done = False
+        self.bot.journals[ctx.channel.id].set_done(ctx.author.id, False)
         await table.message.edit(embed=table.embed, view=GameView())
         await ctx.respond("ゲームを再開しました。" if ctx.locale == "ja" else "Resumed the game.")
 
@@ -407,25 +1125,249 @@ class Gather(commands.Cog, name="Gather"):
         ):
             return
         if not (
-            message.content in map(str, range(1, 13))
+            self.bot.settings.get(message.guild.id).rules.is_rank(message.content)
             or message.content in ("back", "b")
         ):
             return
+        if self.bot.is_closing:
+            return
+
+        self.bot.track()
+        self.bot.names.touch(message.author)
 
+        if not self.user_throttle.consume(message.author.id):
+            self.bot.metrics.incr("throttle.user.dropped")
+            return
+
+        if (pending := self._pending.get(message.channel.id)) is not None:
+            pending.append(message)
+            self.bot.metrics.incr("throttle.channel.collapsed")
+            return
+
+        if not self.channel_throttle.consume(message.channel.id):
+            # Queue the input and apply everything that arrives meanwhile with a single render.
+            self._pending[message.channel.id] = [message]
+            self.bot.metrics.incr("throttle.channel.collapsed")
+            self._flushes[message.channel.id] = asyncio.create_task(
+                self._flush_shorthand(message.channel, self.channel_throttle.retry_after(message.channel.id))
+            )
+            return
+
+        await self._apply_shorthand(message.channel, [message])
+
+
+    async def _flush_shorthand(self, channel: "Messageable", delay: float) -> None:
+        await asyncio.sleep(delay)
+        self.channel_throttle.consume(channel.id)
+        self._flushes.pop(channel.id, None)
+        await self._apply_shorthand(channel, self._pending.pop(channel.id, []))
+
+
+    async def _apply_shorthand(self, channel: "Messageable", messages: list["Message"]) -> None:
         try:
-            table = await GameTable.fetch(message.channel)
+            table = await self._fetch_game(channel)
+        except MyError:
+            return
 
-            if message.content in ("back", "b"):
-                table._game.get_player(get_name(message.author)).remove_rank()
-            else:
-                table._game.get_player(get_name(message.author)).add_rank(int(message.content))
+        changed = False
+
+        for message in messages:
+            try:
+                if message.content in ("back", "b"):
+                    self._mutate(channel, table, "back", message.author, name=get_name(message.author), index=-1)
+                else:
+                    self._mutate(channel, table, "add", message.author, name=get_name(message.author), rank=int(message.content), race=None)
+                changed = True
+            except MyError:
+                continue
+
+        if changed:
+            await self._repost_table(channel, table)
+
+
+    async def _repost_table(self, channel: "Messageable", table: GameTable) -> None:
+        """Sends the game table again at the bottom of the channel, unless its content would not change."""
 
-            await message.channel.send(embed=table.embed, view=GameView())
-            await table.message.delete()
+        embed = table.embed
+        if table.renderer.is_published:
+            self.bot.metrics.incr("render.skipped")
+            return
+
+        self._set_message(channel, await channel.send(embed=embed, view=GameView()))
+        await table.message.delete()
+
+
+    @commands.Cog.listener("on_message")
+    async def _screenshot_command(self, message: "Message") -> None:
+        """Proposes the ranks of the whole room from a screenshot of a race result.
+
+        Parameters
+        ----------
+        message : Message
+            The message to be processed.
+        """
+
+        if (
+            self.screenshots is None
+            or message.author.bot
+            or isinstance(message.channel, DMChannel)
+        ):
+            return
+        if (attachment := next((a for a in message.attachments if is_screenshot(a)), None)) is None:
+            return
+        # Images posted where no game is being played are not downloaded.
+        if self.bot.journals[message.channel.id].game is None or self.bot.is_closing:
+            return
 
+        self.bot.track()
+
+        if not self.user_throttle.consume(message.author.id):
+            self.bot.metrics.incr("throttle.user.dropped")
+            return
+
+        try:
+            table = await self._fetch_game(message.channel)
         except MyError:
             return
 
+        players = table._game._players
+        race = min(len(p.points) for p in players.values()) + 1
+        if race > table._game.rules.race_count:
+            return
+
+        started = time.perf_counter()
+        try:
+            placements = await self.screenshots.read(await attachment.read(), list(players), table._game.rules.room_size)
+        except Exception:
+            # Not an image Pillow can open, or Tesseract failed on it.
+            self.bot.metrics.incr("screenshot.failed")
+            return
+        self.bot.metrics.observe("screenshot.read", time.perf_counter() - started)
+
+        # Anything but a result screen rarely resembles more than a few names.
+        if len(placements) < max(2, len(players) // 2):
+            self.bot.metrics.incr("screenshot.unmatched")
+            return
+
+        self.bot.metrics.incr("screenshot.proposed")
+        proposal = PlacementTable(race, placements, [name for name in players if name not in placements])
+        await message.reply(embed=proposal.embed, view=PlacementView(), mention_author=False)
+
+
+    async def _apply_placements(self, channel: "Messageable", actor: "Member", race: int, placements: dict[str, int]) -> int:
+        """Adds the ranks of a race confirmed from a screenshot.
+
+        Players who have registered that race in the meantime, or who have
+        not registered the races before it, are left as they are.
+
+        Returns
+        -------
+        int
+            The number of ranks added.
+        """
+
+        table = await self._fetch_game(channel)
+        added = 0
+
+        for name, rank in sorted(placements.items(), key=lambda p: p[1]):
+            if (player := table._game._players.get(name)) is None or len(player.points) != race - 1:
+                continue
+            try:
+                self._mutate(channel, table, "add", actor, name=name, rank=rank, race=None)
+            except MyError:
+                continue
+            added += 1
+
+        if added:
+            await self._repost_table(channel, table)
+        return added
+
+
+    def _allow(self, user_id: int, channel_id: Optional[int] = None) -> None:
+        """Takes a token of the user, and of the channel if given.
+
+        Joins and votes only take a token of the user, since their edits
+        are paced by :meth:`_refresh_later` instead.
+
+        Raises
+        ------
+        TooManyRequests
+            If either of them has run out of tokens.
+        """
+
+        if not self.user_throttle.consume(user_id):
+            self.bot.metrics.incr("throttle.user.rejected")
+            raise TooManyRequests
+        if channel_id is not None and not self.channel_throttle.consume(channel_id):
+            self.bot.metrics.incr("throttle.channel.rejected")
+            raise TooManyRequests
+
+
+    def _hold(self, table: T) -> T:
+        """Returns the table held in memory for the message of ``table``, holding ``table`` if there is none."""
+
+        key = table.message.id
+        self._touched[key] = time.monotonic()
+        return self._tables.setdefault(key, table)
+
+
+    def _live_table(self, cls: type[T], message: "Message") -> T:
+        """Returns the gather, vote or proposed placements of a message as held in memory, parsing the message only the first time.
+
+        Joins and votes change the table in memory at once, while its
+        message is only edited by :meth:`_refresh_later`, so the embed of
+        the message may lag behind.
+        """
+
+        if (table := self._tables.get(message.id)) is None:
+            return self._hold(cls.from_message(message))
+        self._touched[message.id] = time.monotonic()
+        return table
+
+
+    def _release_tables(self, now: float) -> None:
+        """Forgets the tables left alone for :data:`LIVE_TABLE_TTL`, whose messages are up to date by then."""
+
+        for key, touched in list(self._touched.items()):
+            if now - touched > LIVE_TABLE_TTL and key not in self._refreshes:
+                del self._touched[key]
+                self._tables.pop(key, None)
+
+
+    def _refresh_later(self, table: Union[GatherTable, FormatTable]) -> None:
+        """Edits the message of a gather or vote to match the table in memory.
+
+        The edit is made as soon as the channel has a token, and every
+        change made until then is shown by that single edit. Changes made
+        while it is being sent are shown by one more edit.
+        """
+
+        key = table.message.id
+        if key in self._refreshes:
+            self._stale.add(key)
+            self.bot.metrics.incr("throttle.channel.collapsed")
+            return
+        self._refreshes[key] = asyncio.create_task(self._refresh(table))
+
+
+    async def _refresh(self, table: Union[GatherTable, FormatTable]) -> None:
+        key = table.message.id
+        channel_id = table.message.channel.id
+
+        try:
+            while True:
+                while not self.channel_throttle.consume(channel_id):
+                    await asyncio.sleep(self.channel_throttle.retry_after(channel_id))
+                self._stale.discard(key)
+                # The final transition has edited the message itself.
+                if table.is_done:
+                    return
+                await table.message.edit(embed=table.embed)
+                if key not in self._stale:
+                    return
+        finally:
+            self._refreshes.pop(key, None)
+
 
     @slash_command(
         name="help",
@@ -449,46 +1391,16 @@ class Gather(commands.Cog, name="Gather"):
     ) -> None:
         """Create a help message automatically."""
 
-        await ctx.response.defer(ephemeral=True)
-        locale = language or ctx.locale
-        is_ja = locale == "ja"
-        embeds: list[Embed] = []
-        prefix = self.bot._qualified_prefix
-
-        for cog in self.bot.cogs.values():
-
-            if not cog.is_public:
-                continue
-
-            e = Embed(title=cog.description_localizations.get(locale, cog.description))
-            e.set_footer(text = '<必須> [任意]' if is_ja else '<Required> [Optional]')
-
-            for command in cog.walk_commands():
-
-                if isinstance(command, SlashCommand):
-                    usage = command.description_localizations
-                    if usage is not None:
-                        usage = usage.get(locale, command.description)
-                    e.add_field(
-                        name = f'/{command.qualified_name}',
-                        value = f'> '+ usage or command.description,
-                        inline = False
-                    )
-
-                elif isinstance(command, commands.Command):
-                    if command.hidden:
-                        continue
-                    e.add_field(
-                        name = prefix+command.usage,
-                        value = '> ' + (command.brief if is_ja else command.description),
-                        inline = False
-                    )
-
-            embeds.append(e)
+        # Built once per locale and prefix, and rebuilt only when cogs change.
+        embeds = self.bot.responses.help(
+            self.bot.cogs.values(),
+            language or ctx.locale,
+            self.bot.settings.get(ctx.guild_id).prefix
+        )
         is_compact = len(embeds) == 1
 
         await pages.Paginator(
-            pages=embeds,
+            pages=list(embeds),
             author_check=False,
             show_disabled= not is_compact,
             show_indicator= not is_compact
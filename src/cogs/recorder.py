@@ -0,0 +1,90 @@
+from typing import TYPE_CHECKING
+from pathlib import Path
+import os
+from discord.ext import commands
+from discord import (
+    DMChannel,
+    ApplicationContext,
+    InteractionType,
+    SlashCommandOptionType
+)
+
+from components.recorder import TrafficRecorder
+
+
+if TYPE_CHECKING:
+    from discord import Message, Interaction
+    from bot import QueueBot
+
+
+class Recorder(commands.Cog, name="Recorder"):
+
+    def __init__(self, bot: "QueueBot") -> None:
+        self.bot: QueueBot = bot
+        self.is_public: bool = False
+        self.recorder: TrafficRecorder = TrafficRecorder(Path(os.environ["RECORD_TRAFFIC"]))
+
+
+    def cog_unload(self) -> None:
+        self.recorder.close()
+
+
+    @commands.Cog.listener("on_command")
+    async def record_command(self, ctx: commands.Context) -> None:
+        if ctx.guild is None:
+            return
+        text = ctx.message.content[len(ctx.prefix):]
+        self.recorder.write("command", ctx.guild.id, ctx.channel.id, ctx.author.id, text=self.recorder.text(ctx.guild, text))
+
+
+    @commands.Cog.listener("on_application_command")
+    async def record_slash(self, ctx: ApplicationContext) -> None:
+        if ctx.guild is None:
+            return
+
+        selected = ctx.selected_options or []
+        # The options of a subcommand are nested in the subcommand and its group.
+        while selected and selected[0].get("type") in (SlashCommandOptionType.sub_command.value, SlashCommandOptionType.sub_command_group.value):
+            selected = selected[0].get("options", [])
+
+        options = {}
+        for option in selected:
+            value = option.get("value")
+            if option.get("type") in (SlashCommandOptionType.user.value, SlashCommandOptionType.mentionable.value):
+                value = str(self.recorder.user(int(value)))
+            elif isinstance(value, str):
+                value = self.recorder.text(ctx.guild, value)
+            options[option["name"]] = value
+
+        self.recorder.write("slash", ctx.guild.id, ctx.channel_id, ctx.user.id, name=ctx.command.qualified_name, options=options)
+
+
+    @commands.Cog.listener("on_interaction")
+    async def record_component(self, interaction: "Interaction") -> None:
+        if interaction.type != InteractionType.component or interaction.guild_id is None:
+            return
+        self.recorder.write(
+            "component",
+            interaction.guild_id,
+            interaction.channel_id,
+            interaction.user.id,
+            id=interaction.data["custom_id"],
+            values=interaction.data.get("values", [])
+        )
+
+
+    @commands.Cog.listener("on_message")
+    async def record_shorthand(self, message: "Message") -> None:
+        if message.author.bot or isinstance(message.channel, DMChannel):
+            return
+        # The same filter as the shorthand of Gather, so that nothing else people say is recorded.
+        if not (
+            self.bot.settings.get(message.guild.id).rules.is_rank(message.content)
+            or message.content in ("back", "b")
+        ):
+            return
+        self.recorder.write("message", message.guild.id, message.channel.id, message.author.id, text=message.content)
+
+
+def setup(bot: "QueueBot"):
+    bot.add_cog(Recorder(bot))
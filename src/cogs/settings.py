@@ -0,0 +1,151 @@
+from typing import TYPE_CHECKING, Optional
+from discord.ext import commands
+from discord import (
+    Embed,
+    Option,
+    OptionChoice,
+    SlashCommandGroup,
+    ApplicationContext
+)
+
+from errors import *
+from components.settings import GuildSettings
+from components.utils import format_name
+
+
+if TYPE_CHECKING:
+    from bot import QueueBot
+
+
+_KEYS: dict[str, tuple[str, str]] = {
+    "prefix": ("Prefix", "プレフィックス"),
+    "room_size": ("Room size", "部屋の人数"),
+    "race_count": ("Races", "レース数"),
+    "points": ("Points", "得点表"),
+    "formats": ("Formats", "形式"),
+    "language": ("Language", "言語"),
+}
+
+_KEY_CHOICES = [OptionChoice(name=en, value=key, name_localizations={"ja": ja}) for key, (en, ja) in _KEYS.items()]
+
+
+class Settings(commands.Cog, name="Settings"):
+
+    def __init__(self, bot: "QueueBot") -> None:
+        self.bot: QueueBot = bot
+        self.is_public: bool = True
+        self.description: str = "Server settings"
+        self.description_localizations: dict[str, str] = {
+            "ja": "サーバー設定用コマンド",
+            "en-US": "Server settings"
+        }
+
+    settings = SlashCommandGroup(name="settings", description="Server settings related commands")
+
+
+    @staticmethod
+    def _settings_embed(settings: GuildSettings, is_ja: bool) -> Embed:
+        values = {
+            "prefix": f"`{settings.prefix}`",
+            "room_size": str(settings.room_size),
+            "race_count": str(settings.race_count),
+            "points": "-".join(map(str, settings.points)),
+            "formats": ", ".join(map(format_name, settings.formats)),
+            "language": settings.language or ("すべて" if is_ja else "All"),
+        }
+
+        e = Embed(title="設定" if is_ja else "Settings")
+        for key, (en, ja) in _KEYS.items():
+            e.add_field(name=f"{ja if is_ja else en} (`{key}`)", value=f"> {values[key]}", inline=False)
+        return e
+
+
+    def _update(self, guild_id: int, key: str, value: Optional[str]) -> GuildSettings:
+        if key not in _KEYS:
+            raise InvalidSetting(key)
+        if value is None:
+            return self.bot.settings.reset(guild_id, key)
+        return self.bot.settings.update(guild_id, **{key: GuildSettings.parse(key, value)})
+
+
+    @commands.command(
+        name="settings",
+        description="Show or change the settings of the server",
+        brief="サーバーの設定を表示・変更",
+        usage="settings [key] [value|reset]"
+    )
+    @commands.guild_only()
+    async def settings_command(
+        self,
+        ctx: commands.Context,
+        key: Optional[str] = None,
+        *,
+        value: Optional[str] = None
+    ) -> None:
+        is_ja = self.bot.settings.get(ctx.guild.id).language == "ja"
+
+        if key is not None:
+            if not ctx.author.guild_permissions.manage_guild:
+                raise ManageGuildRequired
+            self._update(ctx.guild.id, key, None if value in (None, "reset") else value)
+
+        await ctx.send(embed=self._settings_embed(self.bot.settings.get(ctx.guild.id), is_ja))
+
+
+    @settings.command(
+        name="show",
+        description="Show the settings of the server",
+        description_localizations={"ja": "サーバーの設定を表示する"}
+    )
+    @commands.guild_only()
+    async def settings_show(self, ctx: ApplicationContext) -> None:
+        await ctx.respond(embed=self._settings_embed(self.bot.settings.get(ctx.guild.id), ctx.locale == "ja"))
+
+
+    @settings.command(
+        name="set",
+        description="Change a setting of the server",
+        description_localizations={"ja": "サーバーの設定を変更する"}
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def settings_set(
+        self,
+        ctx: ApplicationContext,
+        key: Option(
+            str,
+            name="key",
+            name_localizations={"ja": "項目"},
+            description="The setting to change",
+            description_localizations={"ja": "変更する項目"},
+            choices=_KEY_CHOICES,
+            required=True
+        ),
+        value: Option(
+            str,
+            name="value",
+            name_localizations={"ja": "値"},
+            description="e.g. 8 / 15,12,10,... / FFA,2v2 / ja. If no input, then the default.",
+            description_localizations={"ja": "例: 8 / 15,12,10,... / FFA,2v2 / ja 設定しないと初期値に戻ります"},
+            default=None,
+            required=False
+        )
+    ) -> None:
+        settings = self._update(ctx.guild.id, key, value)
+        await ctx.respond(embed=self._settings_embed(settings, ctx.locale == "ja"))
+
+
+    @settings.command(
+        name="reset",
+        description="Restore the default settings of the server",
+        description_localizations={"ja": "サーバーの設定を初期値に戻す"}
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def settings_reset(self, ctx: ApplicationContext) -> None:
+        settings = self.bot.settings.reset(ctx.guild.id)
+        await ctx.respond(embed=self._settings_embed(settings, ctx.locale == "ja"))
+
+
+def setup(bot: "QueueBot"):
+    bot.add_cog(Settings(bot))
@@ -0,0 +1,367 @@
+from typing import TYPE_CHECKING, Optional
+import asyncio
+import tempfile
+from discord.ext import commands
+from discord import (
+    File,
+    Embed,
+    Member,
+    Option,
+    OptionChoice,
+    TextChannel,
+    SlashCommandGroup,
+    ApplicationContext
+)
+
+from errors import *
+from components.backfill import Backfill, Checkpoint
+from components.export import FORMATS, export, gzip_file, parse_date
+from components.utils import DATA_DIR, get_name, get_integers
+
+
+if TYPE_CHECKING:
+    from typing import BinaryIO
+    from discord import Guild
+    from bot import QueueBot
+    from components.stats import PlayerSummary
+
+
+EXPORT_COMPRESS_OVER: int = 1 << 20 # Bytes above which an export is sent gzipped
+EXPORT_SPOOL_SIZE: int = 8 << 20 # Bytes of an export kept in memory before it spills to a temporary file
+
+
+_SORT_KEYS = {
+    "placement": (lambda s: s.average_placement, False),
+    "points": (lambda s: s.points_per_race, True),
+    "win_rate": (lambda s: s.win_rate, True),
+}
+
+
+class Stats(commands.Cog, name="Stats"):
+
+    def __init__(self, bot: "QueueBot") -> None:
+        self.bot: QueueBot = bot
+        self.is_public: bool = True
+        self.description: str = "Statistics commands"
+        self.description_localizations: dict[str, str] = {
+            "ja": "戦績用コマンド",
+            "en-US": "Statistics commands"
+        }
+        self.checkpoint: Checkpoint = Checkpoint(DATA_DIR / "backfill.json")
+        self._backfills: dict[int, asyncio.Task] = {}
+
+
+    def cog_unload(self) -> None:
+        # The checkpoint is saved after every page, so a backfill resumes after a reload.
+        for task in self._backfills.values():
+            task.cancel()
+
+
+    stats = SlashCommandGroup(name="stats", description="Statistics related commands")
+
+
+    @staticmethod
+    def _summary_embed(name: str, summary: "PlayerSummary", last: Optional[int], is_ja: bool) -> Embed:
+        e = Embed(title=name)
+        e.description = (
+            (f"直近{summary.games}試合" if is_ja else f"Last {summary.games} games")
+            if last else
+            (f"全{summary.games}試合" if is_ja else f"All {summary.games} games")
+        )
+        e.add_field(name="平均順位" if is_ja else "Average placement", value=f"> {summary.average_placement:.2f}")
+        e.add_field(name="平均得点" if is_ja else "Points per race", value=f"> {summary.points_per_race:.2f}")
+        e.add_field(name="勝率" if is_ja else "Win rate", value=f"> {summary.win_rate:.1%}")
+        return e
+
+
+    def _write_export(self, guild_id: int, format: str, since: Optional[float], until: Optional[float]) -> tuple[int, "BinaryIO", bool]:
+        fp = tempfile.SpooledTemporaryFile(EXPORT_SPOOL_SIZE)
+        games = export(self.bot.stats.games(guild_id, since, until), fp, format)
+
+        is_compressed = format != "parquet" and fp.tell() > EXPORT_COMPRESS_OVER
+        if is_compressed:
+            compressed = tempfile.SpooledTemporaryFile(EXPORT_SPOOL_SIZE)
+            gzip_file(fp, compressed)
+            fp.close()
+            fp = compressed
+
+        fp.seek(0)
+        return games, fp, is_compressed
+
+
+    async def _export(self, guild: "Guild", format: str, since: Optional[str], until: Optional[str]) -> File:
+        if format not in FORMATS:
+            raise InvalidSetting("format")
+        try:
+            _since = parse_date(since)
+        except ValueError:
+            raise InvalidDate(since)
+        try:
+            _until = parse_date(until, end=True)
+        except ValueError:
+            raise InvalidDate(until)
+
+        # Games are read and written in chunks off the event loop, so that a large export blocks nothing.
+        games, fp, is_compressed = await asyncio.to_thread(self._write_export, guild.id, format, _since, _until)
+
+        size = fp.seek(0, 2)
+        fp.seek(0)
+        if games == 0 or size > guild.filesize_limit:
+            fp.close()
+            raise NotFoundError if games == 0 else ExportTooLarge
+
+        filename = f"games-{guild.id}-{since or 'all'}-{until or 'now'}.{format}" + (".gz" if is_compressed else "")
+        return File(fp, filename=filename)
+
+
+    def _start_backfill(self, guild: "Guild", channels: list[TextChannel], reply: TextChannel) -> None:
+        if guild.id in self._backfills:
+            raise BackfillInProgress
+        self._backfills[guild.id] = asyncio.create_task(self._backfill(guild, channels, reply))
+
+
+    async def _backfill(self, guild: "Guild", channels: list[TextChannel], reply: TextChannel) -> None:
+        """Records the archived games in the history of channels, then reports to ``reply``.
+
+        Reading years of history takes long after the interaction has expired,
+        so the result is sent as a message of its own.
+        """
+
+        backfill = Backfill(self.bot.stats, self.checkpoint, metrics=self.bot.metrics)
+        rules = self.bot.settings.get(guild.id).rules
+        lines = []
+
+        try:
+            for channel in channels:
+                entry = await backfill.run(guild.id, channel, rules)
+                lines.append(f"{channel.mention}: {entry['games']} games / {entry['tables']} tables / {entry['messages']} messages")
+        except Exception as e:
+            lines.append(f"{channel.mention}: {e}")
+        finally:
+            self._backfills.pop(guild.id, None)
+            # Older games were appended after newer ones.
+            await self.bot.stats.submit(self.bot.stats.reindex)
+
+        await reply.send(embed=Embed(title="Backfill", description="\n".join(lines)))
+
+
+    @commands.command(
+        name="stats",
+        description="Show the statistics of a player",
+        brief="プレイヤーの戦績を表示",
+        usage="stats [@member] [last_n_games]"
+    )
+    @commands.guild_only()
+    async def stats_command(
+        self,
+        ctx: commands.Context,
+        member: Optional[Member] = None,
+        last: Optional[int] = None
+    ) -> None:
+        name = get_name(member or ctx.author)
+
+        if (summary := self.bot.stats.summary(ctx.guild.id, name, last)) is None:
+            raise NotFoundError
+
+        await ctx.send(embed=self._summary_embed(name, summary, last, False))
+
+
+    @stats.command(
+        name="player",
+        description="Show the statistics of a player",
+        description_localizations={"ja": "プレイヤーの戦績を表示する"}
+    )
+    @commands.guild_only()
+    async def stats_player(
+        self,
+        ctx: ApplicationContext,
+        member: Option(
+            Member,
+            name="member",
+            name_localizations={"ja": "メンバー"},
+            description="The member to show",
+            description_localizations={"ja": "戦績を表示するメンバー"},
+            default=None,
+            required=False
+        ),
+        last: Option(
+            int,
+            name="last",
+            name_localizations={"ja": "試合数"},
+            description="Only the last N games. If no input, then all games.",
+            description_localizations={"ja": "直近N試合のみ集計します"},
+            min_value=1,
+            default=None,
+            required=False
+        )
+    ) -> None:
+        await ctx.response.defer()
+        name = get_name(member or ctx.user)
+
+        if (summary := self.bot.stats.summary(ctx.guild.id, name, last)) is None:
+            raise NotFoundError
+
+        await ctx.respond(embed=self._summary_embed(name, summary, last, ctx.locale == "ja"))
+
+
+    @stats.command(
+        name="ranking",
+        description="Show the ranking of the players",
+        description_localizations={"ja": "プレイヤーのランキングを表示する"}
+    )
+    @commands.guild_only()
+    async def stats_ranking(
+        self,
+        ctx: ApplicationContext,
+        sort: Option(
+            str,
+            name="sort",
+            name_localizations={"ja": "並び順"},
+            description="The statistic to sort by",
+            description_localizations={"ja": "並び替える項目"},
+            choices=[
+                OptionChoice(name="Average placement", value="placement", name_localizations={"ja": "平均順位"}),
+                OptionChoice(name="Points per race", value="points", name_localizations={"ja": "平均得点"}),
+                OptionChoice(name="Win rate", value="win_rate", name_localizations={"ja": "勝率"}),
+            ],
+            default="points",
+            required=False
+        ),
+        last: Option(
+            int,
+            name="last",
+            name_localizations={"ja": "試合数"},
+            description="Only the last N games of each player. If no input, then all games.",
+            description_localizations={"ja": "各プレイヤーの直近N試合のみ集計します"},
+            min_value=1,
+            default=None,
+            required=False
+        )
+    ) -> None:
+        await ctx.response.defer()
+        key, reverse = _SORT_KEYS[sort]
+        board = sorted(
+            self.bot.stats.leaderboard(ctx.guild.id, last),
+            key=lambda item: key(item[1]),
+            reverse=reverse
+        )[:10]
+
+        if not board:
+            raise NotFoundError
+
+        e = Embed(title="Ranking" if ctx.locale != "ja" else "ランキング", description="")
+        for i, (name, summary) in enumerate(board):
+            e.description += (
+                f"`{i+1}.` **{name}**  {summary.average_placement:.2f} / "
+                f"{summary.points_per_race:.2f}pt / {summary.win_rate:.1%} ({summary.games})\n"
+            )
+        e.set_footer(text="平均順位 / 平均得点 / 勝率 (試合数)" if ctx.locale == "ja" else "Placement / Points per race / Win rate (games)")
+        await ctx.respond(embed=e)
+
+
+    @commands.command(
+        name="export",
+        description="Export the results of the games in this server",
+        brief="サーバー内の試合結果を出力",
+        usage="export [csv|jsonl|parquet] [since YYYY-MM-DD] [until YYYY-MM-DD]"
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def export_command(
+        self,
+        ctx: commands.Context,
+        format: str = "csv",
+        since: Optional[str] = None,
+        until: Optional[str] = None
+    ) -> None:
+        async with ctx.typing():
+            file = await self._export(ctx.guild, format.lower(), since, until)
+        await ctx.send(file=file)
+
+
+    @stats.command(
+        name="export",
+        description="Export the results of the games in this server",
+        description_localizations={"ja": "サーバー内の試合結果を出力する"}
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def stats_export(
+        self,
+        ctx: ApplicationContext,
+        format: Option(
+            str,
+            name="format",
+            name_localizations={"ja": "形式"},
+            description="The file format",
+            description_localizations={"ja": "ファイル形式"},
+            choices=[OptionChoice(name=name, value=name) for name in FORMATS],
+            default="csv",
+            required=False
+        ),
+        since: Option(
+            str,
+            name="since",
+            name_localizations={"ja": "開始日"},
+            description="Only the games on or after this date (YYYY-MM-DD, UTC)",
+            description_localizations={"ja": "この日以降の試合のみ (YYYY-MM-DD, UTC)"},
+            default=None,
+            required=False
+        ),
+        until: Option(
+            str,
+            name="until",
+            name_localizations={"ja": "終了日"},
+            description="Only the games on or before this date (YYYY-MM-DD, UTC)",
+            description_localizations={"ja": "この日までの試合のみ (YYYY-MM-DD, UTC)"},
+            default=None,
+            required=False
+        )
+    ) -> None:
+        await ctx.response.defer()
+        await ctx.respond(file=await self._export(ctx.guild, format, since, until))
+
+
+    @commands.command(
+        name="backfill",
+        description="Record the games of the tables archived in the history of channels",
+        brief="チャンネルの履歴にある過去の集計表を戦績に取り込む",
+        usage="backfill [#channel...]"
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def backfill_command(self, ctx: commands.Context, channels: commands.Greedy[TextChannel] = []) -> None:
+        self._start_backfill(ctx.guild, channels or [ctx.channel], ctx.channel)
+        await ctx.send(f"Backfilling {len(channels) or 1} channels. The result will be sent here.")
+
+
+    @stats.command(
+        name="backfill",
+        description="Record the games of the tables archived in the history of channels",
+        description_localizations={"ja": "チャンネルの履歴にある過去の集計表を戦績に取り込む"}
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def stats_backfill(
+        self,
+        ctx: ApplicationContext,
+        channels: Option(
+            str,
+            name="channels",
+            name_localizations={"ja": "チャンネル"},
+            description="The channels, e.g. #room-1 #room-2. If no input, then this channel.",
+            description_localizations={"ja": "チャンネル 例: #room-1 #room-2 設定しないとこのチャンネル"},
+            default="",
+            required=False
+        )
+    ) -> None:
+        _channels = [c for i in get_integers(channels) if isinstance(c := ctx.guild.get_channel(i), TextChannel)]
+        self._start_backfill(ctx.guild, _channels or [ctx.channel], ctx.channel)
+        await ctx.respond(
+            f"{len(_channels) or 1}チャンネルの取り込みを開始しました。結果はこのチャンネルに送信されます。" if ctx.locale == "ja"
+            else f"Backfilling {len(_channels) or 1} channels. The result will be sent here."
+        )
+
+
+def setup(bot: "QueueBot"):
+    bot.add_cog(Stats(bot))
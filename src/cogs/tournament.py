@@ -0,0 +1,373 @@
+from typing import TYPE_CHECKING, Optional
+import asyncio
+from discord.ext import commands
+from discord import (
+    Option,
+    OptionChoice,
+    TextChannel,
+    HTTPException,
+    SlashCommandGroup,
+    ApplicationContext
+)
+
+from errors import *
+from components.view import GameView
+from components.table import GameTable
+from components.throttle import Throttle
+from components.tournament import Tournament, TournamentStore
+from components.utils import DATA_DIR, get_name, get_integers, format_value
+
+
+if TYPE_CHECKING:
+    from discord import Guild
+    from discord.abc import Messageable
+    from components.game import Game
+    from components.journal import Event
+    from bot import QueueBot
+
+
+PUBLISH_BUCKET: tuple[float, float] = (1, 0.2) # Burst and standings edits per second of each tournament
+
+# Events that can change the points of a room or whether it has ended.
+_COUNTED: frozenset[str] = frozenset({"start", "add", "back", "edit", "undo", "redo", "end", "resume"})
+
+_FORMAT_CHOICES = [OptionChoice(name=name, value=name) for name in ("FFA", "2v2", "3v3", "4v4", "6v6")]
+
+
+class Tournaments(commands.Cog, name="Tournament"):
+
+    def __init__(self, bot: "QueueBot") -> None:
+        self.bot: QueueBot = bot
+        self.is_public: bool = True
+        self.description: str = "Tournament commands"
+        self.description_localizations: dict[str, str] = {
+            "ja": "大会用コマンド",
+            "en-US": "Tournament commands"
+        }
+        self.tournaments: TournamentStore = TournamentStore(DATA_DIR / "tournaments.json")
+        self.publish_throttle: Throttle = Throttle(*PUBLISH_BUCKET)
+        self._publishes: dict[int, asyncio.Task] = {}
+        self.bot.journals.listeners.append(self._count_event)
+
+        # Rooms may have changed while the bot was down, so count them once from their journals.
+        for tournament in self.tournaments:
+            for channel_id in tournament.rooms:
+                if channel_id in self.bot.journals:
+                    journal = self.bot.journals[channel_id]
+                    tournament.update(channel_id, journal.game, journal.is_done)
+
+
+    def cog_unload(self) -> None:
+        self.bot.journals.listeners.remove(self._count_event)
+        for task in self._publishes.values():
+            task.cancel()
+
+
+    async def drain(self) -> None:
+        """Publishes the standings still held back by the throttle. Called on shutdown."""
+
+        await asyncio.gather(*self._publishes.values(), return_exceptions=True)
+
+    tournament_group = SlashCommandGroup(name="tournament", description="Tournament related commands")
+
+
+    def _count_event(self, channel_id: int, event: "Event") -> None:
+        if event.type not in _COUNTED or (tournament := self.tournaments.of_room(channel_id)) is None:
+            return
+
+        journal = self.bot.journals[channel_id]
+        if tournament.update(channel_id, journal.game, journal.is_done, event.data.get("name")):
+            self._schedule_publish(tournament)
+
+
+    def _schedule_publish(self, tournament: Tournament) -> None:
+        """Edits the standings of a tournament soon, at most at the rate of :data:`PUBLISH_BUCKET`.
+
+        Changes made while an edit is scheduled are shown by that edit.
+        """
+
+        if tournament.guild_id in self._publishes:
+            self.bot.metrics.incr("tournament.publish.collapsed")
+            return
+
+        delay = 0.0 if self.publish_throttle.consume(tournament.guild_id) else self.publish_throttle.retry_after(tournament.guild_id)
+        self._publishes[tournament.guild_id] = asyncio.create_task(self._publish(tournament, delay))
+
+
+    async def _publish(self, tournament: Tournament, delay: float) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+            self.publish_throttle.consume(tournament.guild_id)
+        self._publishes.pop(tournament.guild_id, None)
+
+        self.tournaments.save()
+        if tournament.message_id is None or (channel := self.bot.get_channel(tournament.channel_id)) is None:
+            return
+        try:
+            await channel.get_partial_message(tournament.message_id).edit(embed=tournament.embed())
+        except HTTPException:
+            pass
+
+
+    def _seeds(self, guild: "Guild", tournament: Tournament) -> dict[str, float]:
+        """Returns the points per race of every entered player, which is what entrants are seeded by."""
+
+        return {
+            member: summary.points_per_race
+            for entrant in tournament.entrants.values()
+            for member in entrant.members
+            if (summary := self.bot.stats.summary(guild.id, member)) is not None
+        }
+
+
+    async def _open_room(self, channel: "Messageable", game: "Game", actor_id: int) -> None:
+        message = await channel.send(embed=GameTable(game).embed, view=GameView())
+        self.bot.journals[channel.id].start(actor_id, game, message.id)
+
+
+    async def _start_round(self, guild: "Guild", actor_id: int, channel_ids: list[int]) -> Tournament:
+        """Seeds the next round into rooms and opens all of them at once.
+
+        Parameters
+        ----------
+        guild : Guild
+            The guild of the tournament.
+        actor_id : int
+            The id of the organiser.
+        channel_ids : list[int]
+            The channels to play in. If empty, the rooms of the last round.
+        """
+
+        tournament = self.tournaments.get(guild.id)
+        channels = [c for i in channel_ids or list(tournament.rooms) if (c := guild.get_channel(i)) is not None]
+        games = tournament.start_round([c.id for c in channels], self._seeds(guild, tournament))
+        self.tournaments.save(tournament)
+
+        await asyncio.gather(*(self._open_room(guild.get_channel(channel_id), game, actor_id) for channel_id, game in games.items()))
+        self._schedule_publish(tournament)
+        return tournament
+
+
+    async def _create(self, channel: "Messageable", format: int, advance: int) -> Tournament:
+        tournament = Tournament(channel.guild.id, channel.id, format, advance, self.bot.settings.get(channel.guild.id).rules)
+        if not 0 < advance < tournament.room_entrants:
+            raise InvalidSetting("advance")
+
+        self.tournaments.create(tournament)
+        message = await channel.send(embed=tournament.embed())
+        tournament.message_id = message.id
+        self.tournaments.save()
+        return tournament
+
+
+    @commands.group(
+        aliases=["tn"],
+        name="tournament",
+        description="Show the standings of the tournament",
+        brief="大会の順位表を表示",
+        usage="tournament [create|join|leave|start|end]",
+        invoke_without_command=True
+    )
+    @commands.guild_only()
+    async def tournament(self, ctx: commands.Context) -> None:
+        await ctx.send(embed=self.tournaments.get(ctx.guild.id).embed())
+
+
+    @tournament.command(
+        name="create",
+        description="Hold a tournament in this server",
+        brief="大会を作成",
+        usage="tournament create <format> <advance>"
+    )
+    @commands.has_guild_permissions(manage_guild=True)
+    async def tournament_create(self, ctx: commands.Context, format: str, advance: int) -> None:
+        try:
+            _format = format_value(format)
+        except ValueError:
+            raise InvalidSetting("format")
+        await self._create(ctx.channel, _format, advance)
+
+
+    @tournament.command(
+        name="join",
+        description="Enter the tournament",
+        brief="大会にエントリー",
+        usage="tournament join [team]"
+    )
+    async def tournament_join(self, ctx: commands.Context, *, team: Optional[str] = None) -> None:
+        tournament = self.tournaments.get(ctx.guild.id)
+        entrant = tournament.register(get_name(ctx.author), team)
+        self.tournaments.save()
+        self._schedule_publish(tournament)
+        await ctx.send(f"{ctx.author.mention} has entered the tournament as {entrant.name}. ({len(entrant.members)}/{tournament.format})")
+
+
+    @tournament.command(
+        name="leave",
+        description="Withdraw from the tournament",
+        brief="大会のエントリーを取り消す",
+        usage="tournament leave"
+    )
+    async def tournament_leave(self, ctx: commands.Context) -> None:
+        tournament = self.tournaments.get(ctx.guild.id)
+        tournament.unregister(get_name(ctx.author))
+        self.tournaments.save()
+        self._schedule_publish(tournament)
+        await ctx.send(f"{ctx.author.mention} has withdrawn from the tournament.")
+
+
+    @tournament.command(
+        aliases=["next"],
+        name="start",
+        description="Start the next round, advancing the top entrants of every room",
+        brief="次のラウンドを開始 2回戦以降は各部屋の上位が勝ち抜け",
+        usage="tournament start [#channel...]"
+    )
+    @commands.has_guild_permissions(manage_guild=True)
+    async def tournament_start(self, ctx: commands.Context, channels: commands.Greedy[TextChannel] = []) -> None:
+        tournament = await self._start_round(ctx.guild, ctx.author.id, [c.id for c in channels])
+        await ctx.send(f"Round {tournament.round} has started in {len(tournament.rooms)} rooms.")
+
+
+    @tournament.command(
+        name="end",
+        description="Close the tournament",
+        brief="大会を終了",
+        usage="tournament end"
+    )
+    @commands.has_guild_permissions(manage_guild=True)
+    async def tournament_end(self, ctx: commands.Context) -> None:
+        tournament = self.tournaments.remove(ctx.guild.id)
+        await ctx.send(embed=tournament.embed())
+
+
+    @tournament_group.command(
+        name="create",
+        description="Hold a tournament in this server",
+        description_localizations={"ja": "このサーバーで大会を開く"}
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def slash_create(
+        self,
+        ctx: ApplicationContext,
+        format: Option(
+            str,
+            name="format",
+            name_localizations={"ja": "形式"},
+            description="The format of the games",
+            description_localizations={"ja": "試合の形式"},
+            choices=_FORMAT_CHOICES,
+            required=True
+        ),
+        advance: Option(
+            int,
+            name="advance",
+            name_localizations={"ja": "勝ち抜け数"},
+            description="The number of teams of each room that advance to the next round",
+            description_localizations={"ja": "各部屋から次のラウンドに進むチーム数"},
+            required=True,
+            min_value=1,
+            max_value=23
+        )
+    ) -> None:
+        await ctx.response.defer(ephemeral=True)
+        await self._create(ctx.channel, format_value(format), advance)
+        await ctx.respond("大会を作成しました。" if ctx.locale == "ja" else "The tournament has been created.", ephemeral=True)
+
+
+    @tournament_group.command(
+        name="join",
+        description="Enter the tournament",
+        description_localizations={"ja": "大会にエントリーする"}
+    )
+    @commands.guild_only()
+    async def slash_join(
+        self,
+        ctx: ApplicationContext,
+        team: Option(
+            str,
+            name="team",
+            name_localizations={"ja": "チーム"},
+            description="The team to join. Not used in FFA.",
+            description_localizations={"ja": "参加するチーム名 FFAでは使われません"},
+            default=None,
+            required=False
+        )
+    ) -> None:
+        tournament = self.tournaments.get(ctx.guild.id)
+        entrant = tournament.register(get_name(ctx.user), team)
+        self.tournaments.save()
+        self._schedule_publish(tournament)
+        await ctx.respond(
+            f"{entrant.name}としてエントリーしました。({len(entrant.members)}/{tournament.format})" if ctx.locale == "ja"
+            else f"You have entered the tournament as {entrant.name}. ({len(entrant.members)}/{tournament.format})"
+        )
+
+
+    @tournament_group.command(
+        name="leave",
+        description="Withdraw from the tournament",
+        description_localizations={"ja": "大会のエントリーを取り消す"}
+    )
+    @commands.guild_only()
+    async def slash_leave(self, ctx: ApplicationContext) -> None:
+        tournament = self.tournaments.get(ctx.guild.id)
+        tournament.unregister(get_name(ctx.user))
+        self.tournaments.save()
+        self._schedule_publish(tournament)
+        await ctx.respond("エントリーを取り消しました。" if ctx.locale == "ja" else "You have withdrawn from the tournament.")
+
+
+    @tournament_group.command(
+        name="start",
+        description="Start the next round, advancing the top entrants of every room",
+        description_localizations={"ja": "次のラウンドを開始する 2回戦以降は各部屋の上位が勝ち抜けます"}
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def slash_start(
+        self,
+        ctx: ApplicationContext,
+        channels: Option(
+            str,
+            name="channels",
+            name_localizations={"ja": "チャンネル"},
+            description="The room channels, e.g. #room-1 #room-2. If no input, then the rooms of the last round.",
+            description_localizations={"ja": "部屋のチャンネル 例: #room-1 #room-2 設定しないと前のラウンドの部屋を使います"},
+            default="",
+            required=False
+        )
+    ) -> None:
+        await ctx.response.defer()
+        tournament = await self._start_round(ctx.guild, ctx.user.id, get_integers(channels))
+        await ctx.respond(
+            f"{len(tournament.rooms)}部屋で{tournament.round}回戦を開始しました。" if ctx.locale == "ja"
+            else f"Round {tournament.round} has started in {len(tournament.rooms)} rooms."
+        )
+
+
+    @tournament_group.command(
+        name="standings",
+        description="Show the standings of the tournament",
+        description_localizations={"ja": "大会の順位表を表示する"}
+    )
+    @commands.guild_only()
+    async def slash_standings(self, ctx: ApplicationContext) -> None:
+        await ctx.respond(embed=self.tournaments.get(ctx.guild.id).embed())
+
+
+    @tournament_group.command(
+        name="end",
+        description="Close the tournament",
+        description_localizations={"ja": "大会を終了する"}
+    )
+    @commands.guild_only()
+    @commands.has_guild_permissions(manage_guild=True)
+    async def slash_end(self, ctx: ApplicationContext) -> None:
+        tournament = self.tournaments.remove(ctx.guild.id)
+        await ctx.respond(embed=tournament.embed())
+
+
+def setup(bot: "QueueBot"):
+    bot.add_cog(Tournaments(bot))
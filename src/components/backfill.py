@@ -0,0 +1,222 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import asyncio
+import json
+import multiprocessing
+import os
+
+from discord import Embed, Object
+
+from .table import GameTable, DONE_COLOR
+from .rules import ScoringRules
+from .throttle import TokenBucket
+
+if TYPE_CHECKING:
+    from discord import Message
+    from discord.abc import Messageable
+    from .game import Game
+    from .metrics import Metrics
+    from .stats import StatsStore
+
+
+PAGE_SIZE: int = 100 # Messages per request, the maximum of the API
+PAGE_BUCKET: tuple[float, float] = (5, 2) # Burst and history pages per second, leaving room for the requests of the bot
+BACKFILL_WORKERS: int = max(1, min(4, (os.cpu_count() or 1) - 1)) # Processes parsing archived tables
+
+
+class _Archived:
+    """Just enough of a message for :meth:`GameTable.from_message`."""
+
+    __slots__ = ("embeds",)
+
+    def __init__(self, embed: Embed) -> None:
+        self.embeds = [embed]
+
+
+def _is_archived(message: Message) -> bool:
+    if not message.author.bot or not message.embeds:
+        return False
+    e = message.embeds[0]
+    return isinstance(e.title, str) and e.title.startswith("Format") and e.color == DONE_COLOR
+
+
+def _parse(payloads: list[tuple[float, dict[str, Any]]], rules: dict[str, Any]) -> list[tuple[Game, float]]:
+    """Parses archived tables in a worker process. Tables of unfinished games, or of other rules, are skipped."""
+
+    _rules = ScoringRules.from_dict(rules)
+    games = []
+
+    for finished_at, data in payloads:
+        try:
+            game = GameTable.from_message(_Archived(Embed.from_dict(data)), _rules)._game
+        except Exception:
+            continue
+        if game.is_done:
+            games.append((game, finished_at))
+
+    return games
+
+
+class Checkpoint:
+    """The progress of backfilling every channel, so that a backfill resumes where it stopped.
+
+    Parameters
+    ----------
+    path : Path
+        The JSON file to store the progress in.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._channels: dict[int, dict[str, Any]] = {}
+
+        if path.exists():
+            with path.open(encoding="utf-8") as fp:
+                self._channels = {int(k): v for k, v in json.load(fp).items()}
+
+
+    def get(self, channel_id: int) -> dict[str, Any]:
+        """Returns the progress of a channel.
+
+        ``before`` is the oldest message read so far, ``done`` whether the
+        beginning of the channel has been reached, and ``messages``,
+        ``tables`` and ``games`` the numbers of messages read, archived
+        tables found and games recorded.
+        """
+
+        if (entry := self._channels.get(channel_id)) is None:
+            entry = self._channels[channel_id] = {"before": None, "done": False, "messages": 0, "tables": 0, "games": 0}
+        return entry
+
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as fp:
+            json.dump({str(k): v for k, v in self._channels.items()}, fp)
+        os.replace(tmp, self.path)
+
+
+class Backfill:
+    """Records the games of archived tables in the history of channels.
+
+    History is read newest first, one page per request, paced by a token
+    bucket. Every page is handed to a pool of processes to parse while the
+    next page is fetched, and the games of a page are inserted with one
+    write before the checkpoint moves past it. An interrupted backfill
+    resumes after the last page recorded, and the store skips any game
+    it already has.
+
+    Parameters
+    ----------
+    store : StatsStore
+        The store to record the games in.
+    checkpoint : Checkpoint
+        The progress of the channels.
+    workers : int, optional
+        The number of processes parsing tables, by default :data:`BACKFILL_WORKERS`.
+    metrics : Optional[Metrics], optional
+        Where to count pages and games.
+    """
+
+    def __init__(
+        self,
+        store: StatsStore,
+        checkpoint: Checkpoint,
+        workers: int = BACKFILL_WORKERS,
+        metrics: Optional[Metrics] = None
+    ) -> None:
+        self.store = store
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.metrics = metrics
+        self.bucket = TokenBucket(*PAGE_BUCKET)
+
+
+    async def _page(self, channel: Messageable, before: Optional[int]) -> list[Message]:
+        while not self.bucket.consume():
+            await asyncio.sleep(self.bucket.retry_after())
+        if self.metrics is not None:
+            self.metrics.incr("backfill.pages")
+        return [m async for m in channel.history(limit=PAGE_SIZE, before=before and Object(before), oldest_first=False)]
+
+
+    async def run(self, guild_id: int, channel: Messageable, rules: ScoringRules) -> dict[str, Any]:
+        """Backfills a channel to its first message.
+
+        Returns
+        -------
+        dict[str, Any]
+            The progress of the channel, as in :meth:`Checkpoint.get`.
+        """
+
+        entry = self.checkpoint.get(channel.id)
+        if entry["done"]:
+            return entry
+
+        loop = asyncio.get_running_loop()
+        # Forking the threads of the bot could copy locks held by them, so workers fork from a server process instead.
+        with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("forkserver")) as pool:
+            # Pages being parsed, with what the checkpoint becomes once their games are recorded.
+            pending: deque[tuple[asyncio.Future, int, int, int, bool]] = deque()
+            before = entry["before"]
+            is_last = False
+
+            while not is_last:
+                page = await self._page(channel, before)
+                # A table is archived by its last edit, which is when a live game was recorded.
+                payloads = [((m.edited_at or m.created_at).timestamp(), m.embeds[0].to_dict()) for m in page if _is_archived(m)]
+                is_last = len(page) < PAGE_SIZE
+                before = page[-1].id if page else before
+
+                parsing = loop.run_in_executor(pool, _parse, payloads, rules.to_dict())
+                pending.append((parsing, before, len(page), len(payloads), is_last))
+
+                while len(pending) > self.workers or (is_last and pending):
+                    await self._commit(guild_id, channel.id, entry, *pending.popleft())
+
+        return entry
+
+
+    async def _commit(
+        self,
+        guild_id: int,
+        channel_id: int,
+        entry: dict[str, Any],
+        parsing: asyncio.Future,
+        before: int,
+        messages: int,
+        tables: int,
+        is_last: bool
+    ) -> None:
+        writing = self.store.submit(self.store.record_many, guild_id, channel_id, await parsing)
+        try:
+            recorded = await asyncio.shield(writing)
+        except asyncio.CancelledError:
+            # The write goes on regardless, so the checkpoint must still move past its games.
+            self._advance(entry, before, messages, tables, is_last, await writing)
+            raise
+        self._advance(entry, before, messages, tables, is_last, recorded)
+
+
+    def _advance(
+        self,
+        entry: dict[str, Any],
+        before: int,
+        messages: int,
+        tables: int,
+        is_last: bool,
+        recorded: int
+    ) -> None:
+        entry["before"] = before
+        entry["done"] = is_last
+        entry["messages"] += messages
+        entry["tables"] += tables
+        entry["games"] += recorded
+        self.checkpoint.save()
+
+        if self.metrics is not None:
+            self.metrics.incr("backfill.games", recorded)
@@ -0,0 +1,229 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Optional
+import asyncio
+import json
+
+from aiohttp import ClientConnectionError, web
+
+from .journal import AUDIT_EVENTS
+
+if TYPE_CHECKING:
+    from .game import Game
+    from .journal import Event, GameJournal, JournalStore
+
+
+# Events that do not change what the scoreboard shows.
+_IGNORED: frozenset[str] = AUDIT_EVENTS | {"message"}
+_HEARTBEAT: float = 15.0
+
+
+def snapshot(journal: GameJournal) -> dict[str, Any]:
+    """Returns the scoreboard of a journal as JSON serializable data."""
+
+    game: Optional[Game] = journal.game
+    if game is None:
+        return {"game": None}
+
+    return {
+        "game": {
+            "format": game.format,
+            "races": game.rules.race_count,
+            "done": journal.is_done or game.is_done,
+            "teams": [
+                {"tag": t.tag, "points": t.total_point, "races": game.race_scores(t)}
+                for t in game.teams
+            ],
+            "players": [
+                {"name": p.name, "tag": p.tag, "points": p.total_point, "left": p.left_race_num, "placements": p.placements}
+                for p in game.ranking
+            ],
+            "diffs": game.running_diffs(),
+            "conflicts": game.conflicts,
+        },
+        "updated_at": journal.updated_at,
+    }
+
+
+class _Feed:
+    """The latest frame of a channel, shared by all of its viewers."""
+
+    __slots__ = ("frame", "version", "changed", "viewers")
+
+    if TYPE_CHECKING:
+        frame: Optional[bytes]
+        version: int
+        changed: asyncio.Event
+        viewers: int
+
+    def __init__(self) -> None:
+        self.frame = None
+        self.version = 0
+        self.changed = asyncio.Event()
+        self.viewers = 0
+
+
+class Dashboard:
+    """A live scoreboard served over HTTP with server-sent events.
+
+    Every change to a game serializes one snapshot, which is written as is
+    to every viewer of the channel. A viewer that is slower than the game
+    skips to the latest snapshot instead of queueing the ones in between,
+    so the number of viewers never affects the bot or the Discord API.
+
+    Parameters
+    ----------
+    journals : JournalStore
+        The journals to watch.
+    host : str, optional
+        The address to listen on, by default ``"127.0.0.1"``
+    port : int, optional
+        The port to listen on, by default 8080
+    max_viewers : int, optional
+        The maximum number of viewers per channel, by default 500
+    """
+
+    def __init__(self, journals: JournalStore, host: str = "127.0.0.1", port: int = 8080, max_viewers: int = 500) -> None:
+        self.journals = journals
+        self.host = host
+        self.port = port
+        self.max_viewers = max_viewers
+        self._feeds: dict[int, _Feed] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/games/{channel_id:\\d+}", self._page),
+            web.get("/games/{channel_id:\\d+}/snapshot", self._snapshot),
+            web.get("/games/{channel_id:\\d+}/events", self._events),
+        ])
+
+
+    def on_event(self, channel_id: int, event: Event) -> None:
+        """A listener of :attr:`JournalStore.listeners`."""
+
+        if event.type in _IGNORED or (feed := self._feeds.get(channel_id)) is None:
+            return
+        self._publish(channel_id, feed)
+
+
+    def _publish(self, channel_id: int, feed: _Feed) -> None:
+        data = json.dumps(snapshot(self.journals[channel_id]), ensure_ascii=False, separators=(",", ":"))
+        feed.version += 1
+        feed.frame = f"id: {feed.version}\nevent: game\ndata: {data}\n\n".encode()
+        changed, feed.changed = feed.changed, asyncio.Event()
+        changed.set()
+
+
+    def _channel(self, request: web.Request) -> int:
+        channel_id = int(request.match_info["channel_id"])
+        if channel_id not in self.journals:
+            raise web.HTTPNotFound
+        return channel_id
+
+
+    async def _snapshot(self, request: web.Request) -> web.Response:
+        return web.json_response(snapshot(self.journals[self._channel(request)]))
+
+
+    async def _events(self, request: web.Request) -> web.StreamResponse:
+        channel_id = self._channel(request)
+
+        if (feed := self._feeds.get(channel_id)) is not None and feed.viewers >= self.max_viewers:
+            raise web.HTTPServiceUnavailable
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+
+        # Registered once prepared, as a viewer gone during prepare never reaches the finally below.
+        if (feed := self._feeds.get(channel_id)) is None:
+            feed = self._feeds[channel_id] = _Feed()
+        if feed.frame is None:
+            self._publish(channel_id, feed)
+        feed.viewers += 1
+
+        try:
+            sent = 0
+            while True:
+                # Taken before writing, so that a change made meanwhile is not missed.
+                changed = feed.changed
+                if sent != feed.version:
+                    sent = feed.version
+                    await response.write(feed.frame)
+                try:
+                    await asyncio.wait_for(changed.wait(), _HEARTBEAT)
+                except asyncio.TimeoutError:
+                    await response.write(b": ping\n\n")
+        # aiohttp raises either when the viewer has gone, depending on when it notices.
+        except (ConnectionResetError, ClientConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            feed.viewers -= 1
+            if not feed.viewers:
+                # Nobody is watching, so stop serializing snapshots for this channel.
+                del self._feeds[channel_id]
+
+        return response
+
+
+    async def _page(self, request: web.Request) -> web.Response:
+        self._channel(request)
+        return web.Response(text=_PAGE, content_type="text/html")
+
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+_PAGE: str = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Scoreboard</title>
+<style>
+body { font-family: sans-serif; background: #2b2d31; color: #f2f3f5; margin: 2em; }
+table { border-collapse: collapse; margin-bottom: 1.5em; }
+th, td { padding: .3em .8em; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+tr:nth-child(even) { background: #313338; }
+.done { color: #57f287; }
+</style>
+</head>
+<body>
+<h1 id="title">Waiting for the game...</h1>
+<table id="teams"></table>
+<table id="players"></table>
+<script>
+const row = (cells, tag = "td") => "<tr>" + cells.map(c => `<${tag}>${c}</${tag}>`).join("") + "</tr>";
+const esc = s => String(s).replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})[c]);
+const source = new EventSource(location.pathname + "/events");
+source.addEventListener("game", e => {
+  const game = JSON.parse(e.data).game;
+  if (!game) return;
+  const format = game.format === 1 ? "FFA" : `${game.format}v${game.format}`;
+  const title = document.getElementById("title");
+  title.textContent = `${format}` + (game.done ? " (finished)" : "");
+  title.className = game.done ? "done" : "";
+  document.getElementById("teams").innerHTML = game.format === 1 ? "" :
+    row(["Team", "Points", ...game.diffs.map((_, i) => i + 1)], "th") +
+    game.teams.map(t => row([esc(t.tag), t.points, ...t.races])).join("");
+  document.getElementById("players").innerHTML =
+    row(["Player", "Points", "Left", "Placements"], "th") +
+    game.players.map(p => row([esc(p.name) + (p.tag ? ` (${esc(p.tag)})` : ""), p.points, p.left, p.placements.join("-")])).join("");
+});
+</script>
+</body>
+</html>
+"""
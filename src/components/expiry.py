@@ -0,0 +1,163 @@
+from __future__ import annotations
+from typing import Generic, Hashable, Optional, TypeVar
+import math
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TimerWheel(Generic[K]):
+    """A hashed timer wheel with lazy rescheduling.
+
+    Every key sits in the bucket of the tick it was scheduled for. Pushing
+    a deadline back only overwrites the deadline, and the key is moved when
+    its old bucket comes around, so rescheduling on every activity is O(1).
+
+    Parameters
+    ----------
+    tick : float
+        The resolution of the wheel in seconds.
+    slots : int, optional
+        The number of buckets, by default 512
+    """
+
+    def __init__(self, tick: float, slots: int = 512) -> None:
+        self.tick = tick
+        self._buckets: list[set[K]] = [set() for _ in range(slots)]
+        self._deadlines: dict[K, float] = {}
+        self._current: Optional[int] = None
+        # The earliest tick filed before the first advance, which sweeps from there.
+        self._first: Optional[int] = None
+
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._deadlines
+
+
+    def _bucket(self, deadline: float) -> set[K]:
+        at = math.ceil(deadline / self.tick)
+        if self._current is not None:
+            # Never file a key behind the hand, or it would wait a whole turn.
+            at = max(at, self._current + 1)
+        elif self._first is None or at < self._first:
+            self._first = at
+        return self._buckets[at % len(self._buckets)]
+
+
+    def schedule(self, key: K, deadline: float) -> None:
+        """Schedules ``key`` to expire at ``deadline`` (UNIX time)."""
+
+        previous = self._deadlines.get(key)
+        self._deadlines[key] = deadline
+
+        if previous is None or deadline < previous:
+            self._bucket(deadline).add(key)
+
+
+    def cancel(self, key: K) -> None:
+        self._deadlines.pop(key, None)
+
+
+    def advance(self, now: float) -> list[K]:
+        """Moves the hand to ``now``.
+
+        Returns
+        -------
+        list[K]
+            The keys whose deadline has passed, which are no longer scheduled.
+        """
+
+        target = math.floor(now / self.tick)
+        if self._current is None:
+            # Keys scheduled with deadlines already past, such as tables
+            # restored from old journals, are due on the first advance.
+            start = target if self._first is None else min(self._first, target)
+        else:
+            start = self._current + 1
+        # A long pause must not sweep the wheel more than once.
+        start = max(start, target - len(self._buckets) + 1)
+        due: list[K] = []
+
+        for at in range(start, target + 1):
+            self._current = at
+            bucket = self._buckets[at % len(self._buckets)]
+            keys = list(bucket)
+            bucket.clear()
+
+            for key in keys:
+                if (deadline := self._deadlines.get(key)) is None:
+                    continue
+                if deadline <= now:
+                    del self._deadlines[key]
+                    due.append(key)
+                else:
+                    self._bucket(deadline).add(key)
+
+        self._current = target
+        return due
+
+
+class IdleTracker:
+    """Reminds and expires tables after a period without activity.
+
+    Parameters
+    ----------
+    idle : dict[str, float]
+        The seconds of inactivity before a table of each kind expires.
+    remind_before : Optional[float], optional
+        The seconds before expiry to send a reminder, by default no reminder.
+    tick : float, optional
+        The resolution of the underlying wheel in seconds, by default 30
+    """
+
+    def __init__(self, idle: dict[str, float], remind_before: Optional[float] = None, tick: float = 30.0) -> None:
+        self.idle = idle
+        self.remind_before = remind_before
+        self._wheel: TimerWheel[tuple[int, str]] = TimerWheel(tick)
+        self._last: dict[tuple[int, str], float] = {}
+        self._reminded: set[tuple[int, str]] = set()
+
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+
+    def touch(self, channel_id: int, kind: str, now: float) -> None:
+        """Records activity on the table of ``kind`` in a channel."""
+
+        key = (channel_id, kind)
+        self._last[key] = now
+        self._reminded.discard(key)
+        lead = self.remind_before or 0.0
+        self._wheel.schedule(key, now + max(self.idle[kind] - lead, 0.0))
+
+
+    def discard(self, channel_id: int, kind: str) -> None:
+        """Stops tracking the table of ``kind`` in a channel."""
+
+        key = (channel_id, kind)
+        self._last.pop(key, None)
+        self._reminded.discard(key)
+        self._wheel.cancel(key)
+
+
+    def advance(self, now: float) -> list[tuple[int, str, bool]]:
+        """Returns ``(channel_id, kind, is_reminder)`` for every table due at ``now``."""
+
+        due: list[tuple[int, str, bool]] = []
+
+        for key in self._wheel.advance(now):
+            if self.remind_before and key not in self._reminded:
+                self._reminded.add(key)
+                # An overdue table still gets the notice the reminder announces.
+                self._wheel.schedule(key, max(self._last[key] + self.idle[key[1]], now + self.remind_before))
+                due.append((*key, True))
+            else:
+                self._last.pop(key, None)
+                self._reminded.discard(key)
+                due.append((*key, False))
+
+        return due
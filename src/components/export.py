@@ -0,0 +1,221 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, Optional
+from datetime import datetime, timezone
+import csv
+import gzip
+import io
+import itertools
+import json
+import shutil
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from errors import MissingDependency
+
+if TYPE_CHECKING:
+    from .stats import GameRecord
+
+
+FORMATS: tuple[str, ...] = ("csv", "jsonl", "parquet")
+
+# The games held in memory at once. Each chunk becomes one row group of a
+# Parquet file, so the memory used does not depend on the size of the export.
+CHUNK_SIZE: int = 500
+
+COLUMNS: tuple[str, ...] = (
+    "game_id",
+    "finished_at",
+    "channel_id",
+    "format",
+    "player",
+    "tag",
+    "won",
+    "total",
+    "placements",
+    "points"
+)
+
+
+def _timestamp(finished_at: float) -> str:
+    return datetime.fromtimestamp(finished_at, timezone.utc).isoformat(timespec="seconds")
+
+
+def _rows(record: GameRecord) -> Iterator[tuple]:
+    for name, tag, won, placements, points in record.rows:
+        yield (
+            record.game_id,
+            _timestamp(record.finished_at),
+            record.channel_id,
+            record.format,
+            name,
+            tag,
+            won,
+            sum(points),
+            placements,
+            points
+        )
+
+
+def _chunks(records: Iterable[GameRecord], size: int) -> Iterator[list[GameRecord]]:
+    it = iter(records)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+def write_csv(records: Iterable[GameRecord], fp: BinaryIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """Writes one line per player of every game. Placements and points of the races are joined with ``-``."""
+
+    text = io.TextIOWrapper(fp, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(COLUMNS)
+    games = 0
+
+    for chunk in _chunks(records, chunk_size):
+        for record in chunk:
+            writer.writerows(
+                (*row[:8], "-".join(map(str, row[8])), "-".join(map(str, row[9])))
+                for row in _rows(record)
+            )
+        text.flush()
+        games += len(chunk)
+
+    # Leaves ``fp`` open for the caller.
+    text.detach()
+    return games
+
+
+def write_jsonl(records: Iterable[GameRecord], fp: BinaryIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """Writes one line per game, with its players nested in it."""
+
+    games = 0
+
+    for chunk in _chunks(records, chunk_size):
+        lines = []
+        for record in chunk:
+            line = {
+                "game_id": record.game_id,
+                "finished_at": _timestamp(record.finished_at),
+                "channel_id": record.channel_id,
+                "format": record.format,
+                "players": [
+                    {"name": row[4], "tag": row[5], "won": row[6], "total": row[7], "placements": row[8], "points": row[9]}
+                    for row in _rows(record)
+                ]
+            }
+            lines.append(json.dumps(line, ensure_ascii=False))
+        fp.write(("\n".join(lines) + "\n").encode())
+        games += len(chunk)
+
+    return games
+
+
+def write_parquet(records: Iterable[GameRecord], fp: BinaryIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """Writes one row per player of every game, one row group per chunk.
+
+    Raises
+    ------
+    MissingDependency
+        If PyArrow is not installed.
+    """
+
+    if pa is None:
+        raise MissingDependency("pyarrow")
+
+    schema = pa.schema([
+        ("game_id", pa.int64()),
+        ("finished_at", pa.timestamp("s", tz="UTC")),
+        ("channel_id", pa.uint64()),
+        ("format", pa.uint8()),
+        ("player", pa.string()),
+        ("tag", pa.string()),
+        ("won", pa.bool_()),
+        ("total", pa.int32()),
+        ("placements", pa.list_(pa.uint8())),
+        ("points", pa.list_(pa.uint16()))
+    ])
+    games = 0
+
+    with pq.ParquetWriter(fp, schema, compression="zstd") as writer:
+        for chunk in _chunks(records, chunk_size):
+            if not (columns := list(zip(*(row for record in chunk for row in _rows(record))))):
+                continue
+            # Timestamps are kept as numbers, not as the strings of the other formats.
+            columns[1] = [int(record.finished_at) for record in chunk for _ in record.rows]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            games += len(chunk)
+
+    return games
+
+
+_WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "parquet": write_parquet
+}
+
+
+def export(
+    records: Iterable[GameRecord],
+    fp: BinaryIO,
+    format: str,
+    chunk_size: int = CHUNK_SIZE,
+    compress: bool = False
+) -> int:
+    """Streams games to a binary file.
+
+    Parameters
+    ----------
+    records : Iterable[GameRecord]
+        The games to export, usually :meth:`StatsStore.games`.
+    fp : BinaryIO
+        The file to write to. It is not closed.
+    format : str
+        One of :data:`FORMATS`.
+    chunk_size : int, optional
+        The number of games written at once, by default :data:`CHUNK_SIZE`.
+    compress : bool, optional
+        Whether to gzip the output. Parquet is always compressed by itself and ignores this.
+
+    Returns
+    -------
+    int
+        The number of games exported.
+    """
+
+    write = _WRITERS[format]
+
+    if not compress or format == "parquet":
+        return write(records, fp, chunk_size)
+
+    with gzip.GzipFile(fileobj=fp, mode="wb") as gz:
+        return write(records, gz, chunk_size)
+
+
+def gzip_file(src: BinaryIO, dst: BinaryIO) -> None:
+    """Gzips the whole of ``src`` into ``dst`` a block at a time."""
+
+    src.seek(0)
+    with gzip.GzipFile(fileobj=dst, mode="wb") as gz:
+        shutil.copyfileobj(src, gz)
+
+
+def parse_date(text: Optional[str], end: bool = False) -> Optional[float]:
+    """Returns the UNIX time of the start of a ``YYYY-MM-DD`` date in UTC, or of the next day if ``end``.
+
+    Raises
+    ------
+    ValueError
+        If the text is not a date.
+    """
+
+    if text is None:
+        return None
+    date = datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return date.timestamp() + (86400 if end else 0)
@@ -3,6 +3,7 @@ from typing import TYPE_CHECKING, Optional, TypeVar, Type, Union
 from urllib.parse import quote
 
 from errors import *
+from .rules import ScoringRules, DEFAULT_RULES
 
 T = TypeVar('T')
 
@@ -17,12 +18,16 @@ class Player:
         The tag of the player.
     points : list[int]
         The points of the player.
+    rules : ScoringRules
+        The rules of the game.
     """
 
     __slots__ = (
         "name",
         "tag",
-        "points"
+        "points",
+        "rules",
+        "_placements"
     )
 
     if TYPE_CHECKING:
@@ -30,29 +35,54 @@ class Player:
         id: int
         tag: Optional[str]
         points: list[int]
+        rules: ScoringRules
+        _placements: list[int]
 
     def __init__(self, **kwargs):
         self.name = kwargs["name"]
         self.tag = kwargs.get("tag")
         self.points = kwargs.get("points", [])
+        self.bind(kwargs.get("rules", DEFAULT_RULES), kwargs.get("placements"))
+
+    def bind(self, rules: ScoringRules, placements: Optional[list[int]] = None) -> None:
+        """Sets the rules of the player.
+
+        Parameters
+        ----------
+        rules : ScoringRules
+            The rules of the game.
+        placements : Optional[list[int]], optional
+            The placements of the player, by default inferred from the points.
+        """
+
+        self.rules = rules
+        if placements is None:
+            self._placements = [rules.rank_of(point) for point in self.points]
+        else:
+            self._placements = list(placements)
+            self.points[:] = [rules.points[rank] for rank in placements]
 
     @property
     def left_race_num(self) -> int:
-        return 12-len(self.points)
+        return self.rules.race_count-len(self.points)
 
     @property
     def is_finished(self) -> bool:
-        return len(self.points) == 12
+        return len(self.points) == self.rules.race_count
 
 
     @property
     def total_point(self) -> int:
         return sum(self.points)
 
+    @property
+    def placements(self) -> list[int]:
+        return self._placements
+
     def add_rank(
         self,
         rank: Union[str, int],
-        _race_num: int = 12
+        _race_num: Optional[int] = None
     ) -> None:
         """Add a rank to the player.
 
@@ -60,19 +90,18 @@ class Player:
         ----------
         rank : Union[str, int]
             The rank to add.
-        _race_num : int, optional
-            The race number to add the rank.
+        _race_num : Optional[int], optional
+            The race number to add the rank, by default after the last race.
         """
 
-        points = {1:15, 2:12, 3:10, 4:9, 5:8, 6:7, 7:6, 8:5, 9:4, 10:3, 11:2, 12:1}
+        rank = self.rules.rank(rank)
 
-        if str(rank) not in ["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12"]:
-            raise InvalidRank
+        if len(self.points) >= self.rules.race_count:
+            raise AlreadyFinished(self.rules.race_count)
 
-        if len(self.points) == 12:
-            raise AlreadyFinished
-
-        self.points.insert(_race_num-1, points[int(rank)])
+        index = len(self.points) if _race_num is None else _race_num-1
+        self.points.insert(index, self.rules.points[rank])
+        self._placements.insert(index, rank)
 
 
     def remove_rank(self, _index: int=-1) -> None:
@@ -88,6 +117,7 @@ class Player:
             self.points.pop(_index)
         except IndexError:
             raise InvalidRaceNumber
+        self._placements.pop(_index)
 
 
     def edit_rank(self, rank: Union[str, int], _index: int=-1) -> None:
@@ -101,15 +131,13 @@ class Player:
             The index of the rank to edit.
         """
 
-        points = {1:15, 2:12, 3:10, 4:9, 5:8, 6:7, 7:6, 8:5, 9:4, 10:3, 11:2, 12:1}
-
-        if str(rank) not in ["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12"]:
-            raise InvalidRank
+        rank = self.rules.rank(rank)
 
         try:
-            self.points[_index] = points[int(rank)]
+            self.points[_index] = self.rules.points[rank]
         except IndexError:
             raise InvalidRaceNumber
+        self._placements[_index] = rank
 
 
 
@@ -172,21 +200,91 @@ class Team:
 
 
 class Game:
+    """A game.
+
+    Besides the teams, the game keeps an occupancy index of which ranks are
+    already taken in each race, as one bitmask per race. Placements that
+    collide with an existing one are rejected in strict mode and kept as
+    conflicts otherwise. The points of each team in each race are kept up
+    to date in the same pass.
+
+    Attributes
+    ----------
+    rules : ScoringRules
+        The rules of the game, shared by all of its players.
+    strict : bool
+        Whether to reject placements that are already taken.
+    """
 
     __slots__ = (
         "_teams",
+        "_players",
+        "_team_index",
+        "_race_sums",
+        "_occupancy",
+        "_conflicts",
+        "_dirty",
+        "rules",
+        "strict",
+        "__weakref__"
     )
 
     if TYPE_CHECKING:
         _teams: list[Team]
-
-    def __init__(self, teams: list[Team]) -> None:
+        _players: dict[str, Player]
+        _team_index: dict[str, int]
+        _race_sums: list[list[int]]
+        _occupancy: list[int]
+        _conflicts: dict[tuple[int, int], int]
+        _dirty: set[str]
+        rules: ScoringRules
+        strict: bool
+
+    def __init__(self, teams: list[Team], strict: bool = False, rules: ScoringRules = DEFAULT_RULES) -> None:
         self._teams = teams
+        self._players = {p.name: p for t in teams for p in t._players}
+        self._team_index = {p.name: i for i, t in enumerate(teams) for p in t._players}
+        self._race_sums = [[0] * rules.race_count for _ in teams]
+        self._occupancy = [0] * rules.race_count
+        self._conflicts = {}
+        self._dirty = set()
+        self.rules = rules
+        self.strict = strict
+
+        for p in self._players.values():
+            if p.rules is not rules:
+                p.bind(rules)
+            for index, placement in enumerate(p.placements):
+                self._occupy(index, placement, self._team_index[p.name])
 
     @property
     def teams(self) -> list[Team]:
         return sorted(self._teams, key = lambda t: t.total_point, reverse = True)
 
+    def to_dict(self) -> list:
+        """Return a JSON serializable snapshot of the game."""
+
+        return [[t.tag, [[p.name, p.points.copy(), p.placements.copy()] for p in t._players]] for t in self._teams]
+
+    @classmethod
+    def from_dict(cls: Type[T], data: list, strict: bool = False, rules: ScoringRules = DEFAULT_RULES) -> T:
+        """Restore a game from :meth:`to_dict`. Snapshots without placements infer them from the points."""
+
+        return cls(
+            [
+                Team([Player(name=name, tag=tag, points=points.copy(), rules=rules, placements=rest[0] if rest else None)
+                      for name, points, *rest in ps], tag)
+                for tag, ps in data
+            ],
+            strict,
+            rules
+        )
+
+    def copy(self: T) -> T:
+        """Return an independent copy of the game, e.g. to read it outside the event loop."""
+
+        return type(self).from_dict(self.to_dict(), self.strict, self.rules)
+
     @property
     def format(self) -> int:
         return len(self._teams[0].players)
@@ -229,11 +327,188 @@ class Game:
             The player with the given name.
         """
 
-        for t in self._teams:
-            for p in t.players:
-                if p.name == name:
-                    return p
-        raise NotParticipant(name)
+        try:
+            return self._players[name]
+        except KeyError:
+            raise NotParticipant(name)
+
+
+    @property
+    def conflicts(self) -> list[tuple[int, int]]:
+        """Return the placements claimed by more than one player.
+
+        Returns
+        -------
+        list[tuple[int, int]]
+            ``(race number, rank)`` of each conflicting placement.
+        """
+
+        return sorted((index+1, rank) for index, rank in self._conflicts)
+
+
+    def _occupy(self, index: int, rank: int, team: int) -> bool:
+        self._race_sums[team][index] += self.rules.points[rank]
+        bit = 1 << (rank-1)
+
+        if self._occupancy[index] & bit:
+            self._conflicts[(index, rank)] = self._conflicts.get((index, rank), 0) + 1
+            return False
+
+        self._occupancy[index] |= bit
+        return True
+
+
+    def _vacate(self, index: int, rank: int, team: int) -> None:
+        self._race_sums[team][index] -= self.rules.points[rank]
+
+        if (count := self._conflicts.get((index, rank))) is not None:
+            if count == 1:
+                del self._conflicts[(index, rank)]
+            else:
+                self._conflicts[(index, rank)] = count - 1
+            return
+
+        self._occupancy[index] &= ~(1 << (rank-1))
+
+
+    def _reindex(self, player: Player, start: int, old: list[int], stop: Optional[int] = None) -> bool:
+        # The races of the player from ``start`` on have shifted or changed.
+        team = self._team_index[player.name]
+
+        for offset, rank in enumerate(old):
+            self._vacate(start+offset, rank, team)
+
+        ok = True
+        for offset, rank in enumerate(player.placements[start:stop]):
+            ok = self._occupy(start+offset, rank, team) and ok
+        return ok
+
+
+    @property
+    def race_count(self) -> int:
+        """Return the number of races registered by at least one player."""
+
+        return max(len(p.points) for p in self._players.values())
+
+
+    def race_scores(self, team: Team) -> list[int]:
+        """Return the points of a team in each race.
+
+        Parameters
+        ----------
+        team : Team
+            The team to get the points of.
+
+        Returns
+        -------
+        list[int]
+            The points of the team in each registered race.
+        """
+
+        return self._race_sums[self._teams.index(team)][:self.race_count]
+
+
+    def running_diffs(self) -> list[int]:
+        """Return the running point difference between the top two teams after each race.
+
+        Returns
+        -------
+        list[int]
+            The differences, positive if the current leader was ahead.
+        """
+
+        if len(self._teams) < 2:
+            return []
+
+        first, second = self.teams[:2]
+        diffs: list[int] = []
+        total = 0
+
+        for a, b in zip(self.race_scores(first), self.race_scores(second)):
+            total += a - b
+            diffs.append(total)
+        return diffs
+
+
+    def add_rank(self, name: str, rank: Union[str, int], _race_num: Optional[int] = None) -> None:
+        """Add a rank to a player.
+
+        Parameters
+        ----------
+        name : str
+            The name of the player.
+        rank : Union[str, int]
+            The rank to add.
+        _race_num : Optional[int], optional
+            The race number to add the rank, by default after the last race.
+
+        Raises
+        ------
+        RankConflict
+            If the game is strict and the rank is already taken in the race.
+        """
+
+        player = self.get_player(name)
+        self._dirty.add(name)
+        start = len(player.points) if _race_num is None else min(max(_race_num-1, 0), len(player.points))
+        old = player.placements[start:]
+        player.add_rank(rank, _race_num)
+
+        if not self._reindex(player, start, old) and self.strict:
+            new = player.placements[start:]
+            player.remove_rank(start)
+            self._reindex(player, start, new)
+            raise RankConflict(start+1, int(rank))
+
+
+    def remove_rank(self, name: str, _index: int = -1) -> None:
+        """Remove a rank from a player.
+
+        Parameters
+        ----------
+        name : str
+            The name of the player.
+        _index : int
+            The index of the rank to remove.
+        """
+
+        player = self.get_player(name)
+        self._dirty.add(name)
+        start = _index if _index >= 0 else len(player.points) + _index
+        old = player.placements[start:]
+        player.remove_rank(_index)
+        self._reindex(player, start, old)
+
+
+    def edit_rank(self, name: str, rank: Union[str, int], _index: int = -1) -> None:
+        """Edit a rank of a player.
+
+        Parameters
+        ----------
+        name : str
+            The name of the player.
+        rank : Union[str, int]
+            The rank to edit.
+        _index : int
+            The index of the rank to edit.
+
+        Raises
+        ------
+        RankConflict
+            If the game is strict and the rank is already taken in the race.
+        """
+
+        player = self.get_player(name)
+        self._dirty.add(name)
+        start = _index if _index >= 0 else len(player.points) + _index
+        old = player.placements[start:start+1]
+        player.edit_rank(rank, _index)
+
+        if not self._reindex(player, start, old, start+1) and self.strict:
+            new = player.placements[start:start+1]
+            player.edit_rank(old[0], start)
+            self._reindex(player, start, new, start+1)
+            raise RankConflict(start+1, int(rank))
 
 
     @property
@@ -245,12 +520,13 @@ class Game:
         if size == 1:
             table_text += "FFA\nFFA - Free for All #4A82D0\n"
             for player in self.ranking:
-                table_text += f"{player.name} [] {player.total_point}\n"
+                table_text += f"{player.name} [] {'+'.join(map(str, player.points)) or 0}\n"
         else:
-            table_text += f"{size}v{size}\n"
-            for index, team in enumerate(sorted(self._teams, key = lambda t: t.total_point, reverse = True)):
+            diffs = self.running_diffs()
+            table_text += f"{size}v{size}" + (f" ({diffs[-1]:+d})" if diffs else "") + "\n"
+            for index, team in enumerate(self.teams):
                 color = "#1D6ADE" if index % 2 == 0 else "#4A82D0"
                 table_text += f"{index+1} {color}\n"
                 for p in team.players:
-                    table_text += f"{p.name} [] {p.total_point}\n"
+                    table_text += f"{p.name} [] {'+'.join(map(str, p.points)) or 0}\n"
         return base + quote(table_text)
@@ -0,0 +1,303 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, ClassVar, Optional
+import asyncio
+import json
+import time
+
+from aiohttp import ClientSession, ClientTimeout
+
+if TYPE_CHECKING:
+    from .game import Game
+    from .metrics import Metrics
+
+
+class HookEvent:
+    """Something that happened in the life of a game, for integrations.
+
+    Attributes
+    ----------
+    guild_id : Optional[int]
+        The id of the guild.
+    channel_id : int
+        The id of the channel.
+    timestamp : float
+        The UNIX time of the event.
+    """
+
+    __slots__ = ("guild_id", "channel_id", "timestamp")
+
+    type: ClassVar[str]
+
+    if TYPE_CHECKING:
+        guild_id: Optional[int]
+        channel_id: int
+        timestamp: float
+
+    def __init__(self, guild_id: Optional[int], channel_id: int) -> None:
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.timestamp = time.time()
+
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {"type": self.type}
+        for cls in reversed(type(self).__mro__[:-1]):
+            data.update({slot: getattr(self, slot) for slot in cls.__slots__})
+        return data
+
+
+class GatherFilled(HookEvent):
+    """A gather has as many players as the room holds."""
+
+    __slots__ = ("names",)
+
+    type = "gather.filled"
+
+    if TYPE_CHECKING:
+        names: list[str]
+
+    def __init__(self, guild_id: Optional[int], channel_id: int, names: list[str]) -> None:
+        super().__init__(guild_id, channel_id)
+        self.names = names
+
+
+class FormatChosen(HookEvent):
+    """The vote has ended and the game has started."""
+
+    __slots__ = ("format", "names")
+
+    type = "format.chosen"
+
+    if TYPE_CHECKING:
+        format: int
+        names: list[str]
+
+    def __init__(self, guild_id: Optional[int], channel_id: int, format: int, names: list[str]) -> None:
+        super().__init__(guild_id, channel_id)
+        self.format = format
+        self.names = names
+
+
+class RankAdded(HookEvent):
+    """A player has registered their rank of a race."""
+
+    __slots__ = ("name", "rank", "race")
+
+    type = "rank.added"
+
+    if TYPE_CHECKING:
+        name: str
+        rank: int
+        race: int
+
+    def __init__(self, guild_id: Optional[int], channel_id: int, name: str, rank: int, race: int) -> None:
+        super().__init__(guild_id, channel_id)
+        self.name = name
+        self.rank = rank
+        self.race = race
+
+
+class GameFinished(HookEvent):
+    """A game has been played to the end, or ended with the End button."""
+
+    __slots__ = ("format", "teams")
+
+    type = "game.finished"
+
+    if TYPE_CHECKING:
+        format: int
+        teams: list[dict[str, Any]]
+
+    def __init__(self, guild_id: Optional[int], channel_id: int, game: Game) -> None:
+        super().__init__(guild_id, channel_id)
+        self.format = game.format
+        self.teams = [
+            {
+                "tag": team.tag,
+                "points": team.total_point,
+                "players": [{"name": p.name, "points": p.total_point, "placements": p.placements.copy()} for p in team.players]
+            }
+            for team in game.teams
+        ]
+
+
+Handler = Callable[[HookEvent], Awaitable[None]]
+
+
+class Subscription:
+    """A subscriber of the bus with its own bounded queue.
+
+    Attributes
+    ----------
+    handler : Handler
+        Called with every event, one at a time.
+    types : tuple[type[HookEvent], ...]
+        The events to receive. Empty for all of them.
+    dropped : int
+        The number of events dropped because the queue was full.
+    """
+
+    def __init__(self, handler: Handler, types: tuple[type[HookEvent], ...], maxsize: int) -> None:
+        self.handler = handler
+        self.types = types
+        self.dropped: int = 0
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue[HookEvent]] = None
+        self._task: Optional[asyncio.Task] = None
+
+
+    def wants(self, event: HookEvent) -> bool:
+        return not self.types or isinstance(event, self.types)
+
+
+class EventBus:
+    """An in-process bus delivering :class:`HookEvent` to subscribers in the background.
+
+    Publishing never waits. Every subscriber has a bounded queue drained
+    by its own task, so a slow subscriber only falls behind itself: once
+    its queue is full, its oldest event is dropped to make room.
+
+    Parameters
+    ----------
+    metrics : Optional[Metrics], optional
+        Where to count deliveries, drops and failures.
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None) -> None:
+        self.metrics = metrics
+        self.subscriptions: list[Subscription] = []
+
+
+    def subscribe(self, handler: Handler, *types: type[HookEvent], maxsize: int = 256) -> Subscription:
+        """Subscribes a coroutine function to some events, or to all events if no type is given."""
+
+        subscription = Subscription(handler, types, maxsize)
+        self.subscriptions.append(subscription)
+        return subscription
+
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.remove(subscription)
+        if subscription._task is not None:
+            subscription._task.cancel()
+
+
+    def publish(self, event: HookEvent) -> None:
+        """Queues an event for every interested subscriber. Must be called from the event loop."""
+
+        for subscription in self.subscriptions:
+            if not subscription.wants(event):
+                continue
+
+            if subscription._task is None:
+                # Started lazily, as subscribers are usually added before the loop runs.
+                subscription._queue = asyncio.Queue(subscription.maxsize)
+                subscription._task = asyncio.create_task(self._drain(subscription))
+
+            queue = subscription._queue
+            if queue.full():
+                queue.get_nowait()
+                queue.task_done()
+                subscription.dropped += 1
+                self._incr("hooks.dropped")
+            queue.put_nowait(event)
+
+
+    async def _drain(self, subscription: Subscription) -> None:
+        queue = subscription._queue
+        while True:
+            event = await queue.get()
+            started = time.perf_counter()
+            try:
+                await subscription.handler(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._incr("hooks.failed")
+            finally:
+                queue.task_done()
+            if self.metrics is not None:
+                self.metrics.observe(f"hooks.{event.type}", time.perf_counter() - started)
+
+
+    def _incr(self, name: str) -> None:
+        if self.metrics is not None:
+            self.metrics.incr(name)
+
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Delivers the queued events for up to ``timeout`` seconds, then stops every subscriber."""
+
+        queues = [s._queue.join() for s in self.subscriptions if s._queue is not None]
+        try:
+            await asyncio.wait_for(asyncio.gather(*queues), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        for subscription in self.subscriptions:
+            if subscription._task is not None:
+                subscription._task.cancel()
+            if (close := getattr(subscription.handler, "close", None)) is not None:
+                await close()
+
+
+class WebhookSink:
+    """Posts every event as JSON to a local HTTP endpoint.
+
+    Parameters
+    ----------
+    url : str
+        The URL to post to.
+    timeout : float, optional
+        The seconds to wait for the endpoint, by default 5.
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0) -> None:
+        self.url = url
+        self.timeout = timeout
+        self._session: Optional[ClientSession] = None
+
+
+    async def __call__(self, event: HookEvent) -> None:
+        if self._session is None:
+            self._session = ClientSession(timeout=ClientTimeout(total=self.timeout))
+        async with self._session.post(self.url, json=event.to_dict()) as response:
+            response.raise_for_status()
+
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class UnixSocketSink:
+    """Writes every event as a line of JSON to a Unix socket, reconnecting after errors.
+
+    Parameters
+    ----------
+    path : str
+        The path of the socket.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+
+    async def __call__(self, event: HookEvent) -> None:
+        if self._writer is None or self._writer.is_closing():
+            _, self._writer = await asyncio.open_unix_connection(self.path)
+        try:
+            self._writer.write(json.dumps(event.to_dict(), ensure_ascii=False).encode() + b"\n")
+            await self._writer.drain()
+        except (ConnectionError, OSError):
+            self._writer.close()
+            self._writer = None
+            raise
+
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,473 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Optional
+from pathlib import Path
+import asyncio
+import json
+import os
+import time
+
+from errors import *
+from .game import Game
+from .rules import ScoringRules
+
+if TYPE_CHECKING:
+    from .table import GameTable
+
+
+SNAPSHOT_INTERVAL: int = 16
+AUDIT_EVENTS: frozenset[str] = frozenset({"gather", "join", "leave", "vote"})
+
+# Mutations of the game. Everything else is only kept for the audit trail.
+_MUTATIONS = {
+    "add": lambda game, name, rank, race: game.add_rank(name, rank, race),
+    "back": lambda game, name, index: game.remove_rank(name, index),
+    "edit": lambda game, name, rank, index: game.edit_rank(name, rank, index),
+}
+
+
+class Event:
+    """An entry of a journal.
+
+    Attributes
+    ----------
+    type : str
+        The kind of the event.
+    actor : Optional[int]
+        The id of the user who caused the event.
+    timestamp : float
+        The UNIX time of the event.
+    data : dict[str, Any]
+        The payload of the event.
+    """
+
+    __slots__ = ("type", "actor", "timestamp", "data")
+
+    if TYPE_CHECKING:
+        type: str
+        actor: Optional[int]
+        timestamp: float
+        data: dict[str, Any]
+
+    def __init__(self, type: str, actor: Optional[int], timestamp: float, data: dict[str, Any]) -> None:
+        self.type = type
+        self.actor = actor
+        self.timestamp = timestamp
+        self.data = data
+
+    def to_json(self) -> str:
+        return json.dumps({"t": self.type, "a": self.actor, "ts": round(self.timestamp, 3), **self.data}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> Event:
+        data = json.loads(line)
+        return cls(data.pop("t"), data.pop("a"), data.pop("ts"), data)
+
+
+class GameJournal:
+    """An append-only journal of the game played in a channel.
+
+    The journal file holds the audit events of the gather and the vote, the
+    start of the game with its initial state, every rank mutation, undo and
+    redo, and a snapshot of the game every :data:`SNAPSHOT_INTERVAL`
+    mutations. Undoing rebuilds the game from the closest snapshot, so no
+    operation replays more than :data:`SNAPSHOT_INTERVAL` mutations.
+
+    Parameters
+    ----------
+    path : Path
+        The file of the journal.
+    on_event : Optional[Callable[[Event], None]], optional
+        Called with every new event, but not with events replayed from disk.
+    """
+
+    def __init__(self, path: Path, on_event: Optional[Callable[[Event], None]] = None) -> None:
+        self.path = path
+        self.on_event = on_event
+        self.events: list[Event] = []
+        self.message_id: Optional[int] = None
+        self.is_done: bool = False
+        self.updated_at: float = 0.0
+        self.started_at: Optional[float] = None
+        self._timeline: list[Event] = []
+        self._cursor: int = 0
+        self._snapshots: dict[int, list] = {}
+        self._game: Optional[Game] = None
+
+        if path.exists():
+            with path.open(encoding="utf-8") as fp:
+                for line in fp:
+                    if line.strip():
+                        self._replay(Event.from_json(line))
+
+
+    @property
+    def game(self) -> Optional[Game]:
+        return self._game
+
+    @property
+    def can_undo(self) -> bool:
+        return self._cursor > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self._cursor < len(self._timeline)
+
+    @property
+    def undoable(self) -> Optional[Event]:
+        """The mutation :meth:`undo` would revert."""
+
+        return self._timeline[self._cursor-1] if self.can_undo else None
+
+    @property
+    def redoable(self) -> Optional[Event]:
+        """The mutation :meth:`redo` would reapply."""
+
+        return self._timeline[self._cursor] if self.can_redo else None
+
+
+    def _write(self, event: Event) -> None:
+        with self.path.open("a", encoding="utf-8") as fp:
+            fp.write(event.to_json() + "\n")
+
+
+    def _replay(self, event: Event) -> None:
+        if event.type == "snapshot":
+            self._snapshots[event.data["at"]] = event.data["game"]
+            return
+
+        self.updated_at = event.timestamp
+
+        if event.type == "message":
+            self.message_id = event.data["id"]
+            return
+
+        self.events.append(event)
+
+        if event.type == "start":
+            self.started_at = event.timestamp
+            self._game = Game.from_dict(event.data["game"], rules=ScoringRules.from_dict(event.data.get("rules")))
+            self._snapshots = {0: event.data["game"]}
+            self._timeline = []
+            self._cursor = 0
+            self.is_done = False
+        elif event.type in ("end", "resume"):
+            self.is_done = event.type == "end"
+        elif event.type == "undo":
+            self._cursor -= 1
+            self._rebuild()
+        elif event.type == "redo":
+            self._apply(self._timeline[self._cursor])
+            self._cursor += 1
+        elif event.type in _MUTATIONS:
+            self._apply(event)
+            self._push(event)
+
+
+    def _push(self, event: Event) -> None:
+        # A new mutation discards everything that was undone.
+        del self._timeline[self._cursor:]
+        self._snapshots = {k: v for k, v in self._snapshots.items() if k <= self._cursor}
+        self._timeline.append(event)
+        self._cursor += 1
+
+
+    def _apply(self, event: Event) -> None:
+        _MUTATIONS[event.type](self._game, **event.data)
+
+
+    def _rebuild(self) -> None:
+        at = max(k for k in self._snapshots if k <= self._cursor)
+        strict = self._game.strict
+        self._game = Game.from_dict(self._snapshots[at], rules=self._game.rules)
+
+        for event in self._timeline[at:self._cursor]:
+            self._apply(event)
+
+        self._game.strict = strict
+
+
+    def _append(self, type: str, actor: Optional[int], **data) -> Event:
+        # Rounded as written, so that the start of a game identifies it the same after a reload.
+        event = Event(type, actor, round(time.time(), 3), data)
+        self._write(event)
+        self._replay(event)
+        if self.on_event is not None:
+            self.on_event(event)
+        return event
+
+
+    def record(self, type: str, actor: Optional[int], **data) -> None:
+        """Records an event for the audit trail only.
+
+        A new gather compacts the journal, which drops the audit events of
+        the gathers before it.
+
+        Parameters
+        ----------
+        type : str
+            The kind of the event, e.g. ``"join"`` or ``"vote"``.
+        actor : Optional[int]
+            The id of the user who caused the event.
+        """
+
+        self._append(type, actor, **data)
+        if type == "gather":
+            self.compact()
+
+
+    def start(self, actor: Optional[int], game: Game, message_id: Optional[int] = None, restored: bool = False) -> None:
+        """Starts a new game, archiving the journal of the previous one.
+
+        Parameters
+        ----------
+        actor : Optional[int]
+            The id of the user who started the game.
+        game : Game
+            The initial state of the game.
+        message_id : Optional[int], optional
+            The id of the message showing the game.
+        restored : bool, optional
+            Whether the game was already started before, and is only read back from its message.
+        """
+
+        if self._game is not None and self.path.exists():
+            _archive(self.path, f"{self.path.stem}-{int(self.updated_at)}")
+
+            # The gather and the vote that led to this game belong to its journal.
+            pending = len(self.events)
+            while pending and self.events[pending-1].type in AUDIT_EVENTS:
+                pending -= 1
+            self.events = self.events[pending:]
+            for event in self.events:
+                self._write(event)
+
+        strict = game.strict
+        self._append("start", actor, game=game.to_dict(), rules=game.rules.to_dict(), **({"restored": True} if restored else {}))
+        self._game.strict = strict
+
+        if message_id is not None:
+            self.set_message(message_id)
+
+
+    def apply(self, type: str, actor: Optional[int], **data) -> Game:
+        """Applies a rank mutation to the game and records it.
+
+        Parameters
+        ----------
+        type : str
+            ``"add"``, ``"back"`` or ``"edit"``.
+        actor : Optional[int]
+            The id of the user who caused the mutation.
+
+        Returns
+        -------
+        Game
+            The updated game.
+
+        Raises
+        ------
+        TableNotFound
+            If no game has been started.
+        """
+
+        if self._game is None:
+            raise TableNotFound
+
+        # Validate against the live game first so that rejected mutations are not recorded.
+        _MUTATIONS[type](self._game, **data)
+        event = Event(type, actor, time.time(), data)
+        self._write(event)
+        self.events.append(event)
+        self.updated_at = event.timestamp
+        self._push(event)
+
+        if self.on_event is not None:
+            self.on_event(event)
+
+        if self._cursor % SNAPSHOT_INTERVAL == 0:
+            self._snapshots[self._cursor] = self._game.to_dict()
+            self.compact()
+
+        return self._game
+
+
+    def compact(self) -> None:
+        """Rewrites the journal with only what its state and the audit trail of its game need.
+
+        Undo and redo events, mutations discarded by them and the audit
+        events of earlier gathers are dropped. The current timeline is
+        written with its snapshots, followed by the undos that bring back
+        its cursor, so the journal reads back to the same state.
+        """
+
+        start = next((i for i in range(len(self.events) - 1, -1, -1) if self.events[i].type == "start"), None)
+        anchor = len(self.events) if start is None else start
+        # The gather that led to the game, or the latest one if no game has started.
+        first = max((i for i in range(anchor) if self.events[i].type == "gather"), default=0)
+        timeline = {id(event) for event in self._timeline}
+        end = next((e for e in reversed(self.events) if e.type == "end"), None) if self.is_done else None
+
+        events = [
+            event for i, event in enumerate(self.events)
+            if (event.type in AUDIT_EVENTS and i >= first) or i == start or id(event) in timeline or event is end
+        ]
+        extra = [
+            Event("snapshot", None, self.updated_at, {"at": at, "game": game})
+            for at, game in sorted(self._snapshots.items()) if at
+        ]
+        if self.message_id is not None:
+            extra.append(Event("message", None, self.updated_at, {"id": self.message_id}))
+        extra += [Event("undo", None, self.updated_at, {}) for _ in range(len(self._timeline) - self._cursor)]
+
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as fp:
+            fp.writelines(event.to_json() + "\n" for event in (*events, *extra))
+        os.replace(tmp, self.path)
+
+        # The state in memory is what the journal reads back to, so only the events change.
+        self.events = events + [event for event in extra if event.type == "undo"]
+
+
+    def undo(self, actor: Optional[int]) -> Game:
+        """Reverts the last mutation.
+
+        Raises
+        ------
+        NothingToUndo
+            If there is no mutation to revert.
+        """
+
+        if self._game is None or not self.can_undo:
+            raise NothingToUndo
+        self._append("undo", actor)
+        return self._game
+
+
+    def redo(self, actor: Optional[int]) -> Game:
+        """Reapplies the last reverted mutation.
+
+        Raises
+        ------
+        NothingToUndo
+            If there is no mutation to reapply.
+        """
+
+        if self._game is None or not self.can_redo:
+            raise NothingToUndo
+        self._append("redo", actor)
+        return self._game
+
+
+    def set_done(self, actor: Optional[int], is_done: bool, restored: bool = False) -> None:
+        self._append("end" if is_done else "resume", actor, **({"restored": True} if restored else {}))
+
+
+    def set_message(self, message_id: int) -> None:
+        self._append("message", None, id=message_id)
+
+
+def _archive(path: Path, name: str) -> None:
+    """Moves a journal to the archive next to it as ``name``, numbered if that is already taken."""
+
+    archive = path.parent / "archive"
+    archive.mkdir(exist_ok=True)
+    target, n = archive / f"{name}.jsonl", 1
+    while target.exists():
+        n += 1
+        target = archive / f"{name}-{n}.jsonl"
+    path.rename(target)
+
+
+class JournalStore:
+    """The journals of all channels, loaded lazily.
+
+    Parameters
+    ----------
+    path : Path
+        The directory to store the journals in.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.listeners: list[Callable[[int, Event], None]] = []
+        self._journals: dict[int, GameJournal] = {}
+        self.path.mkdir(parents=True, exist_ok=True)
+
+
+    def __len__(self) -> int:
+        return len(self._journals)
+
+
+    def __getitem__(self, channel_id: int) -> GameJournal:
+        if (journal := self._journals.get(channel_id)) is None:
+            journal = self._journals[channel_id] = self._open(channel_id)
+        return journal
+
+
+    def _open(self, channel_id: int) -> GameJournal:
+        path = self.path / f"{channel_id}.jsonl"
+        try:
+            return GameJournal(path, lambda event: self._notify(channel_id, event))
+        except (ValueError, KeyError):
+            # Cut off in the middle of an event, e.g. by a kill.
+            print(f"Journal: {path.name} is unreadable and was moved to the archive")
+            self.quarantine(channel_id)
+            return GameJournal(path, lambda event: self._notify(channel_id, event))
+
+
+    async def preload(self, channel_id: int) -> GameJournal:
+        """Reads the journal of a channel in a thread, so that many can be read at once on startup.
+
+        An unreadable journal is quarantined and comes back empty, like
+        wherever a journal is first read.
+        """
+
+        journal = await asyncio.to_thread(self._open, channel_id)
+        # A command may have loaded it in the meantime.
+        return self._journals.setdefault(channel_id, journal)
+
+
+    def recent(self, since: float) -> list[int]:
+        """Returns the channels whose journal was written at or after the UNIX time ``since``, without reading them."""
+
+        with os.scandir(self.path) as entries:
+            return [
+                int(entry.name[:-len(".jsonl")])
+                for entry in entries
+                if entry.name.endswith(".jsonl") and entry.is_file() and entry.stat().st_mtime >= since
+            ]
+
+
+    def quarantine(self, channel_id: int) -> None:
+        """Moves an unreadable journal to the archive, so that the channel starts over from its table."""
+
+        self._journals.pop(channel_id, None)
+        _archive(self.path / f"{channel_id}.jsonl", f"{channel_id}-broken-{int(time.time())}")
+
+
+    def _notify(self, channel_id: int, event: Event) -> None:
+        for listener in self.listeners:
+            listener(channel_id, event)
+
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._journals or (self.path / f"{channel_id}.jsonl").exists()
+
+
+    def evict(self, channel_id: int) -> None:
+        """Drops the journal of a channel from memory. It is reloaded from disk on the next access."""
+
+        self._journals.pop(channel_id, None)
+
+
+    def restore(self, channel_id: int, table: GameTable, actor: Optional[int] = None) -> GameJournal:
+        """Starts a journal from a table parsed from a message, e.g. a game that predates the journal.
+
+        Its events are marked ``restored``, as the game was neither started nor ended just now.
+        """
+
+        journal = self[channel_id]
+        journal.start(actor, table._game, table.message.id if table.message else None, restored=True)
+        if table.is_done:
+            journal.set_done(actor, True, restored=True)
+        return journal
@@ -0,0 +1,47 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from collections import Counter
+
+
+class _Summary:
+
+    __slots__ = ("count", "total", "max")
+
+    if TYPE_CHECKING:
+        count: int
+        total: float
+        max: float
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Metrics:
+    """In-process counters and timings, shown by the ``metrics`` command."""
+
+    def __init__(self) -> None:
+        self.counters: Counter[str] = Counter()
+        self.timings: dict[str, _Summary] = {}
+
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+
+    def observe(self, name: str, seconds: float) -> None:
+        if (summary := self.timings.get(name)) is None:
+            summary = self.timings[name] = _Summary()
+        summary.count += 1
+        summary.total += seconds
+        summary.max = max(summary.max, seconds)
+
+
+    def render(self) -> str:
+        lines = [f"{name} {value}" for name, value in sorted(self.counters.items())]
+        lines += [
+            f"{name} count={s.count} avg={s.total/s.count*1000:.1f}ms max={s.max*1000:.1f}ms"
+            for name, s in sorted(self.timings.items())
+        ]
+        return "\n".join(lines) or "No metrics yet."
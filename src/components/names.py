@@ -0,0 +1,139 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+from bisect import bisect_left, insort
+import time
+
+from .utils import get_name
+
+if TYPE_CHECKING:
+    from discord import Member
+
+
+class NameIndex:
+    """A prefix index of the names of the members seen in a guild.
+
+    Entries are kept sorted by their case-folded name, so a prefix search
+    is a binary search followed by a scan of the matches only. Adding,
+    renaming and removing a member touch a single entry.
+
+    Parameters
+    ----------
+    capacity : int, optional
+        The number of members to keep, by default 5000. The members seen
+        least recently are dropped first.
+    """
+
+    def __init__(self, capacity: int = 5000) -> None:
+        self.capacity = capacity
+        self._entries: list[tuple[str, str, int]] = []
+        self._names: dict[int, str] = {}
+        self._ids: dict[str, int] = {}
+        self._seen: dict[int, float] = {}
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def __contains__(self, member_id: int) -> bool:
+        return member_id in self._names
+
+
+    def add(self, member_id: int, name: str, now: Optional[float] = None) -> None:
+        """Adds a member, or renames one already indexed."""
+
+        self._seen[member_id] = time.monotonic() if now is None else now
+
+        if (old := self._names.get(member_id)) == name:
+            return
+        if old is not None:
+            self._discard(member_id, old)
+
+        insort(self._entries, (name.casefold(), name, member_id))
+        self._names[member_id] = name
+        self._ids[name] = member_id
+
+        if len(self._entries) > self.capacity:
+            self._evict()
+
+
+    def _discard(self, member_id: int, name: str) -> None:
+        entry = (name.casefold(), name, member_id)
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+        if self._ids.get(name) == member_id:
+            del self._ids[name]
+
+
+    def remove(self, member_id: int) -> None:
+        if (name := self._names.pop(member_id, None)) is not None:
+            self._discard(member_id, name)
+            self._seen.pop(member_id, None)
+
+
+    def _evict(self) -> None:
+        # Drop a tenth at once so that eviction stays rare.
+        stale = sorted(self._seen, key=self._seen.__getitem__)[:max(self.capacity // 10, 1)]
+        for member_id in stale:
+            self._names.pop(member_id, None)
+            self._seen.pop(member_id, None)
+        stale_ids = set(stale)
+        self._entries = [e for e in self._entries if e[2] not in stale_ids]
+        self._ids = {name: i for name, i in self._ids.items() if i not in stale_ids}
+
+
+    def get(self, name: str) -> Optional[int]:
+        """Returns the id of the member with exactly this name."""
+
+        return self._ids.get(name)
+
+
+    def search(self, prefix: str, limit: int = 25) -> list[tuple[str, int]]:
+        """Returns up to ``limit`` ``(name, id)`` whose name starts with ``prefix``, ignoring case."""
+
+        key = prefix.casefold()
+        result: list[tuple[str, int]] = []
+
+        for i in range(bisect_left(self._entries, (key,)), len(self._entries)):
+            folded, name, member_id = self._entries[i]
+            if not folded.startswith(key) or len(result) >= limit:
+                break
+            result.append((name, member_id))
+
+        return result
+
+
+class NameDirectory:
+    """The name indexes of all guilds."""
+
+    def __init__(self, capacity: int = 5000) -> None:
+        self.capacity = capacity
+        self._indexes: dict[int, NameIndex] = {}
+
+
+    def __getitem__(self, guild_id: int) -> NameIndex:
+        if (index := self._indexes.get(guild_id)) is None:
+            index = self._indexes[guild_id] = NameIndex(self.capacity)
+        return index
+
+
+    def touch(self, member: Member) -> None:
+        """Records that a member took part in something, indexing them under their current name."""
+
+        if (guild := getattr(member, "guild", None)) is not None:
+            self[guild.id].add(member.id, get_name(member))
+
+
+    def rename(self, member_id: int, name: str) -> None:
+        """Updates the name of a member in every guild they are indexed in."""
+
+        for index in self._indexes.values():
+            if member_id in index:
+                index.add(member_id, name)
+
+
+    def find(self, name: str) -> list[int]:
+        """Returns the ids of the members named exactly ``name`` in any guild."""
+
+        return list({i for index in self._indexes.values() if (i := index.get(name)) is not None})
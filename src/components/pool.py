@@ -0,0 +1,123 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterator, Optional
+from itertools import count
+import heapq
+
+
+class MatchmakingPool:
+    """A first-come-first-served pool of players waiting for a room.
+
+    Waiting players are kept in a heap ordered by join order. Leaving only
+    drops the player from the lookup table and the stale heap entry is
+    skipped when rooms are formed, so joining, leaving and forming a room
+    are all O(log n).
+
+    Parameters
+    ----------
+    size : int, optional
+        The number of players in a room, by default 12
+    """
+
+    __slots__ = ("size", "_heap", "_entries", "_counter")
+
+    if TYPE_CHECKING:
+        size: int
+        _heap: list[tuple[int, str, int]]
+        _entries: dict[str, int]
+        _counter: Iterator[int]
+
+
+    def __init__(self, size: int = 12) -> None:
+        self.size = size
+        self._heap = []
+        self._entries = {}
+        self._counter = count()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+
+    def join(self, name: str, channel_id: int) -> bool:
+        """Adds a player to the pool.
+
+        Parameters
+        ----------
+        name : str
+            The name of the player.
+        channel_id : int
+            The channel the player joined from.
+
+        Returns
+        -------
+        bool
+            Whether the player was added. ``False`` if already waiting.
+        """
+
+        if name in self._entries:
+            return False
+
+        seq = self._entries[name] = next(self._counter)
+        heapq.heappush(self._heap, (seq, name, channel_id))
+        return True
+
+
+    def leave(self, name: str) -> bool:
+        """Removes a player from the pool.
+
+        Returns
+        -------
+        bool
+            Whether the player was waiting.
+        """
+
+        if self._entries.pop(name, None) is None:
+            return False
+
+        self._compact()
+        return True
+
+
+    def pop_room(self) -> Optional[list[tuple[str, int]]]:
+        """Takes the players who have waited the longest if a room can be formed.
+
+        Returns
+        -------
+        Optional[list[tuple[str, int]]]
+            ``(name, channel_id)`` of the players in the room, oldest first,
+            or ``None`` if not enough players are waiting.
+        """
+
+        if len(self._entries) < self.size:
+            return None
+
+        room: list[tuple[str, int]] = []
+
+        while len(room) < self.size:
+            seq, name, channel_id = heapq.heappop(self._heap)
+
+            if self._entries.get(name) != seq:
+                continue
+
+            del self._entries[name]
+            room.append((name, channel_id))
+
+        return room
+
+
+    def waiting(self) -> list[tuple[str, int]]:
+        """Returns ``(name, channel_id)`` of the waiting players, oldest first."""
+
+        return [(name, channel_id) for seq, name, channel_id in sorted(self._heap) if self._entries.get(name) == seq]
+
+
+    def _compact(self) -> None:
+        # Stale entries are dropped once they outnumber the live ones,
+        # which keeps leaving amortized O(log n).
+        if len(self._heap) > 2 * len(self._entries) + self.size:
+            self._heap = [entry for entry in self._heap if self._entries.get(entry[1]) == entry[0]]
+            heapq.heapify(self._heap)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+from typing import Optional
+from collections import Counter
+from threading import Thread, Event, get_ident
+import asyncio
+import tracemalloc
+import sys
+import time
+
+
+class SamplingProfiler:
+    """A sampling profiler for the thread running the event loop.
+
+    A daemon thread samples the stack of the target thread at a fixed
+    interval and counts identical stacks. Nothing is installed in the
+    profiled thread, so there is no overhead while the profiler is not
+    running and only the cost of the sampling thread while it is.
+
+    Parameters
+    ----------
+    interval : float, optional
+        The seconds between two samples, by default 0.005
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self._stacks: Counter[str] = Counter()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+    def _sample(self, target: int) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack: list[str] = []
+
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+
+            if stack:
+                self._stacks[";".join(reversed(stack))] += 1
+
+
+    async def run(self, duration: float) -> str:
+        """Profiles the current thread for ``duration`` seconds.
+
+        Returns
+        -------
+        str
+            The samples in the collapsed stack format used by flamegraph tools.
+        """
+
+        if self.is_running:
+            raise RuntimeError("The profiler is already running.")
+
+        self._stacks.clear()
+        self._stop.clear()
+        self._thread = Thread(target=self._sample, args=(get_ident(),), daemon=True)
+        self._thread.start()
+
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            self._stop.set()
+            await asyncio.to_thread(self._thread.join)
+
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common())
+
+
+class MemoryTracer:
+    """A thin wrapper of :mod:`tracemalloc` that diffs against the snapshot taken at start.
+
+    Snapshots are taken in a worker thread, as they take seconds with a
+    large heap and would block the event loop meanwhile.
+    """
+
+    def __init__(self) -> None:
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self.started_at: Optional[float] = None
+
+
+    @property
+    def is_running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+
+    async def start(self, frames: int = 25) -> None:
+        """Starts tracing, or takes a new baseline if it already is."""
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._baseline = await asyncio.to_thread(self._snapshot)
+        self.started_at = time.time()
+
+
+    def _diff(self, limit: int) -> str:
+        snapshot = self._snapshot()
+        if self._baseline is None:
+            # Tracing was started elsewhere, e.g. by PYTHONTRACEMALLOC, so the diffs start from now.
+            self._baseline, self.started_at = snapshot, time.time()
+
+        stats = snapshot.compare_to(self._baseline, "lineno")
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"current={current/1024:.1f}KiB peak={peak/1024:.1f}KiB since={time.ctime(self.started_at)}"]
+        lines += [str(stat) for stat in stats[:limit]]
+        return "\n".join(lines)
+
+
+    async def diff(self, limit: int = 25) -> str:
+        """Returns the allocations that grew the most since :meth:`start`."""
+
+        return await asyncio.to_thread(self._diff, limit)
+
+
+    async def stop(self) -> str:
+        """Stops tracing and returns the final diff."""
+
+        result = await self.diff()
+        tracemalloc.stop()
+        self._baseline = None
+        return result
@@ -0,0 +1,110 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from errors import MissingDependency
+
+if TYPE_CHECKING:
+    from .game import Game
+
+
+# The number of distinct outcomes sampled for every remaining race. Each
+# simulation draws one of them per race, so the cost of sorting placements
+# does not grow with the number of simulations.
+_BANK: int = 8192
+
+
+def project(
+    game: Game,
+    simulations: int = 100_000,
+    histograms: Optional[dict[str, list[int]]] = None,
+    seed: Optional[int] = None
+) -> list[tuple[str, float, float]]:
+    """Simulates the remaining races of a game.
+
+    For every remaining race a bank of outcomes is sampled once: the players
+    who have not registered the race yet are shuffled onto the ranks still
+    free in it, and the resulting points are reduced to team totals with one
+    matrix product. A simulation then only picks one outcome per race.
+    With histograms, every player first draws a preferred placement from
+    their history and the free ranks are handed out in that order.
+
+    Parameters
+    ----------
+    game : Game
+        The game to project.
+    simulations : int, optional
+        The number of simulations, by default 100000
+    histograms : Optional[dict[str, list[int]]], optional
+        How many times each player finished in each placement, by default uniform.
+    seed : Optional[int], optional
+        The seed of the random generator.
+
+    Returns
+    -------
+    list[tuple[str, float, float]]
+        ``(team tag or player name, win probability, expected points)``,
+        the most likely winner first.
+
+    Raises
+    ------
+    MissingDependency
+        If NumPy is not installed.
+    """
+
+    if np is None:
+        raise MissingDependency("numpy")
+
+    rng = np.random.default_rng(seed)
+    rules = game.rules
+    players = list(game._players.values())
+    team_of = np.array([game._team_index[p.name] for p in players])
+    team_count = len(game._teams)
+    base = np.array([sum(scores) for scores in game._race_sums], dtype=np.float64)
+
+    cdf = None
+    if histograms is not None:
+        counts = np.ones((len(players), rules.room_size))
+        for i, p in enumerate(players):
+            h = histograms.get(p.name, [])[:rules.room_size]
+            counts[i, :len(h)] += h
+        cdf = np.cumsum(counts, axis=1) / counts.sum(axis=1, keepdims=True)
+
+    races: list[tuple[np.ndarray, np.ndarray]] = []
+    for race in range(rules.race_count):
+        pending = np.array([i for i, p in enumerate(players) if len(p.points) <= race], dtype=np.intp)
+        if not len(pending):
+            continue
+        free = [rank for rank in range(1, rules.room_size+1) if not game._occupancy[race] & (1 << (rank-1))]
+        # Conflicting placements can leave fewer free ranks than pending players.
+        free += [rules.room_size] * (len(pending) - len(free))
+        races.append((pending, np.array([rules.points[rank] for rank in free[:len(pending)]], dtype=np.float64)))
+
+    onehot = np.zeros((len(players), team_count))
+    onehot[np.arange(len(players)), team_of] = 1
+    totals = np.tile(base.astype(np.float32), (simulations, 1))
+
+    for pending, points in races:
+        keys = rng.random((_BANK, len(pending)))
+        if cdf is not None:
+            for column, i in enumerate(pending):
+                keys[:, column] += np.searchsorted(cdf[i], rng.random(_BANK))
+        assigned = np.empty_like(keys)
+        np.put_along_axis(assigned, keys.argsort(axis=1), np.broadcast_to(points, keys.shape), axis=1)
+        bank = (assigned @ onehot[pending]).astype(np.float32)
+        totals += np.take(bank, rng.integers(_BANK, size=simulations), axis=0)
+
+    is_top = totals == totals.max(axis=1, keepdims=True)
+    wins = (is_top / is_top.sum(axis=1, keepdims=True)).sum(axis=0)
+    expected = totals.sum(axis=0)
+
+    labels = [t._players[0].name if game.is_ffa else t.tag for t in game._teams]
+    return sorted(
+        ((label, float(w / simulations), float(e / simulations)) for label, w, e in zip(labels, wins, expected)),
+        key=lambda item: item[1],
+        reverse=True
+    )
@@ -0,0 +1,110 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Optional
+from hashlib import blake2b
+from pathlib import Path
+import json
+import os
+import re
+import time
+
+if TYPE_CHECKING:
+    from discord import Guild
+
+
+# Mentions and bare snowflakes, which commands accept as users too.
+_MENTION_RE = re.compile(r"<@!?([0-9]{15,20})>|\b([0-9]{15,20})\b")
+_MAX_NAME_WORDS: int = 16 # A name of Discord has at most 32 characters, so at most 16 words
+
+
+def pseudonym_name(user_id: int) -> str:
+    """Returns the name a pseudonymous user goes by in a recording."""
+
+    return f"u{user_id:x}"
+
+
+class TrafficRecorder:
+    """Appends the events the bot reacts to, to a JSON lines file.
+
+    Users are replaced by pseudonymous ids that are stable within a
+    recording only, and guilds and channels by small sequential numbers.
+    Each line holds the seconds since the recording started (``t``), the
+    kind of event (``k``), the guild (``g``), the channel (``c``), the user
+    (``u``) and the payload of the event.
+
+    Parameters
+    ----------
+    path : Path
+        The file to append to.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fp = path.open("a", encoding="utf-8")
+        self._salt = os.urandom(16)
+        self._started = time.monotonic()
+        self._scopes: dict[int, int] = {}
+        self._users: dict[int, int] = {}
+
+
+    def user(self, user_id: int) -> int:
+        """Returns the pseudonymous id of a user, a snowflake-sized number like a real id."""
+
+        if (pseudonym := self._users.get(user_id)) is None:
+            digest = blake2b(user_id.to_bytes(8, "little"), key=self._salt, digest_size=8).digest()
+            pseudonym = self._users[user_id] = 10**17 + int.from_bytes(digest, "little") % (9 * 10**17)
+        return pseudonym
+
+
+    def scope(self, id: int) -> int:
+        if (number := self._scopes.get(id)) is None:
+            number = self._scopes[id] = len(self._scopes) + 1
+        return number
+
+
+    def text(self, guild: Optional[Guild], text: str) -> str:
+        """Replaces the mentions, ids and names of members in a text by their pseudonyms.
+
+        Every number the size of a snowflake is taken for a user id, as
+        only the guild knows which ones are.
+        """
+
+        text = _MENTION_RE.sub(
+            lambda m: f"<@{self.user(int(m.group(1)))}>" if m.group(1) else str(self.user(int(m.group(2)))),
+            text
+        )
+        if guild is None:
+            return text
+
+        # Names may have spaces, so the longest run of words naming a member is replaced.
+        words = text.split(" ")
+        result: list[str] = []
+        i = 0
+        while i < len(words):
+            for j in range(min(len(words), i + _MAX_NAME_WORDS), i, -1):
+                name = " ".join(words[i:j])
+                if name.strip() and (member := guild.get_member_named(name)) is not None:
+                    result.append(pseudonym_name(self.user(member.id)))
+                    i = j
+                    break
+            else:
+                result.append(words[i])
+                i += 1
+        return " ".join(result)
+
+
+    def write(self, kind: str, guild_id: Optional[int], channel_id: int, user_id: int, **data: Any) -> None:
+        line = {
+            "t": round(time.monotonic() - self._started, 3),
+            "k": kind,
+            "g": guild_id and self.scope(guild_id),
+            "c": self.scope(channel_id),
+            "u": self.user(user_id),
+            **data
+        }
+        self._fp.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self._fp.flush()
+
+
+    def close(self) -> None:
+        self._fp.close()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+from weakref import WeakKeyDictionary
+from discord import Embed, Colour
+
+from .utils import format_name
+
+if TYPE_CHECKING:
+    from .game import Game, Player
+
+
+class GameRenderer:
+    """Builds the embed of a game, reusing the text of unchanged players.
+
+    Mutations of a :class:`Game` mark the players they touch as dirty.
+    Only the fields of those players are formatted again, and the ranking
+    and the description are rebuilt only if anything changed at all.
+
+    Parameters
+    ----------
+    game : Game
+        The game to render.
+
+    Attributes
+    ----------
+    signature : Optional[int]
+        A hash of the content of the last embed built.
+    published : Optional[int]
+        The signature of the content shown in the message of the game.
+    """
+
+    __slots__ = ("_game", "_fields", "_ranking", "_description", "signature", "published")
+
+    if TYPE_CHECKING:
+        _game: Game
+        _fields: dict[str, tuple[str, str]]
+        _ranking: Optional[list[Player]]
+        _description: Optional[str]
+        signature: Optional[int]
+        published: Optional[int]
+
+    def __init__(self, game: Game) -> None:
+        self._game = game
+        self._fields = {}
+        self._ranking = None
+        self._description = None
+        self.signature = None
+        self.published = None
+
+
+    @property
+    def is_published(self) -> bool:
+        """Whether the last embed built is identical to the one in the message."""
+
+        return self.signature is not None and self.signature == self.published
+
+
+    def publish(self) -> None:
+        """Marks the last embed built as shown in the message."""
+
+        self.published = self.signature
+
+
+    def _sync(self) -> None:
+        if dirty := self._game._dirty:
+            for name in dirty:
+                self._fields.pop(name, None)
+            dirty.clear()
+            self._ranking = None
+            self._description = None
+
+
+    def _field(self, player: Player) -> tuple[str, str]:
+        if (field := self._fields.get(player.name)) is None:
+            label = player.name if self._game.is_ffa else f"{player.name} ({player.tag})"
+            field = self._fields[player.name] = (
+                f"{label} @{player.left_race_num}",
+                f"> {player.total_point}pt ({'-'.join(str(point) for point in player.points)})"
+            )
+        return field
+
+
+    def _build_description(self) -> Optional[str]:
+        if self._game.is_ffa:
+            return None
+
+        teams = self._game.teams
+        description = "**Ranking\n\n**"
+        for i, team in enumerate(teams):
+            description += f"`{i+1}.` **{team.tag}**  ({team.total_point}pt)\n"
+
+        if diffs := self._game.running_diffs():
+            scores = [self._game.race_scores(team) for team in teams]
+            lines = ["  R" + "".join(f"{team.tag:>4}" for team in teams) + "  Diff"]
+            for race, diff in enumerate(diffs):
+                lines.append(f"{race+1:>3}" + "".join(f"{s[race]:>4}" for s in scores) + f"{diff:>+6d}")
+            description += "\n```\n" + "\n".join(lines) + "\n```"
+
+        return description
+
+
+    def embed(self, is_done: bool, color: Colour) -> Embed:
+        """Returns the embed of the game.
+
+        Parameters
+        ----------
+        is_done : bool
+            Whether the table has been ended.
+        color : Colour
+            The color of the embed.
+
+        Returns
+        -------
+        Embed
+            The embed of the game.
+        """
+
+        self._sync()
+
+        if self._ranking is None:
+            self._ranking = self._game.ranking
+            self._description = self._build_description()
+
+        fields = [(f"{i+1}. {label}", value) for i, (label, value) in enumerate(map(self._field, self._ranking))]
+        footer = None
+        image = None
+
+        if conflicts := self._game.conflicts:
+            footer = "⚠ " + ", ".join(f"Race {race}: {rank}" for race, rank in conflicts)
+
+        if is_done or self._game.is_done:
+            image = self._game.result_url
+
+        self.signature = hash((color.value, self._description, tuple(fields), footer, image))
+
+        e = Embed(title=f"Format: **{format_name(self._game.format)}**", color=color)
+        if self._description is not None:
+            e.description = self._description
+        for name, value in fields:
+            e.add_field(name=name, value=value, inline=False)
+        if footer is not None:
+            e.set_footer(text=footer)
+        if image is not None:
+            e.set_image(url=image)
+
+        return e
+
+
+_RENDERERS: WeakKeyDictionary[Game, GameRenderer] = WeakKeyDictionary()
+
+
+def get_renderer(game: Game) -> GameRenderer:
+    """Returns the renderer of a game, which lives as long as the game."""
+
+    if (renderer := _RENDERERS.get(game)) is None:
+        renderer = _RENDERERS[game] = GameRenderer(game)
+    return renderer
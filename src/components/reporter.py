@@ -0,0 +1,127 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from traceback import extract_tb, format_exception
+from hashlib import blake2b
+from pathlib import Path
+from io import StringIO
+from queue import SimpleQueue
+import logging
+
+from discord import File
+
+if TYPE_CHECKING:
+    from discord import Embed
+    from discord.abc import Messageable
+
+
+class _Entry:
+
+    __slots__ = ("embed", "traceback", "count")
+
+    if TYPE_CHECKING:
+        embed: Embed
+        traceback: str
+        count: int
+
+    def __init__(self, embed: Embed, traceback: str) -> None:
+        self.embed = embed
+        self.traceback = traceback
+        self.count = 0
+
+
+class ErrorReporter:
+    """Deduplicates unexpected errors before they are posted to the log channel.
+
+    Errors are fingerprinted by their type and stack. Every occurrence is
+    written to a rotating file from a background thread, while only one
+    summary per distinct error is posted by :meth:`flush`.
+
+    Parameters
+    ----------
+    path : Path
+        The file to write tracebacks to.
+    max_posts : int, optional
+        The maximum number of messages per flush, by default 5
+    """
+
+    def __init__(self, path: Path, max_posts: int = 5) -> None:
+        self.max_posts = max_posts
+        self._pending: dict[str, _Entry] = {}
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=1 << 20, backupCount=5, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        queue: SimpleQueue = SimpleQueue()
+        self._logger = logging.getLogger(f"{__name__}.{id(self)}")
+        self._logger.propagate = False
+        self._logger.addHandler(QueueHandler(queue))
+        self._listener = QueueListener(queue, handler)
+        self._listener.start()
+
+
+    @staticmethod
+    def fingerprint(error: BaseException) -> str:
+        """Returns an identifier shared by errors of the same type raised from the same place."""
+
+        frames = "\n".join(f"{f.filename}:{f.name}:{f.lineno}" for f in extract_tb(error.__traceback__))
+        return blake2b(f"{type(error).__qualname__}\n{frames}".encode(), digest_size=8).hexdigest()
+
+
+    def report(self, error: BaseException, embed: Embed) -> None:
+        """Logs an occurrence of an error and counts it for the next summary.
+
+        Parameters
+        ----------
+        error : BaseException
+            The error raised.
+        embed : Embed
+            The embed describing the first occurrence.
+        """
+
+        key = self.fingerprint(error)
+        traceback = "".join(format_exception(type(error), error, error.__traceback__))
+        self._logger.error("[%s]\n%s", key, traceback)
+
+        if (entry := self._pending.get(key)) is None:
+            entry = self._pending[key] = _Entry(embed, traceback)
+
+        entry.count += 1
+
+
+    async def flush(self, channel: Optional[Messageable]) -> None:
+        """Posts one summary for every distinct error reported since the last flush.
+
+        A summary that cannot be posted is logged and skipped, so that it does not hold back the others.
+        """
+
+        if channel is None or not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        entries = sorted(pending.items(), key=lambda item: item[1].count, reverse=True)
+
+        for key, entry in entries[:self.max_posts]:
+            try:
+                entry.embed.insert_field_at(0, name="Occurrences", value=f"{entry.count} (`{key}`)", inline=False)
+                await channel.send(
+                    embed=entry.embed,
+                    file=File(fp=StringIO(entry.traceback), filename="traceback.txt")
+                )
+            except Exception:
+                self._logger.exception("[%s] could not be posted", key)
+
+        if rest := entries[self.max_posts:]:
+            try:
+                await channel.send(
+                    "\n".join(
+                        [f"{len(rest)} more distinct errors:"]
+                        + [f"`{key}` {entry.embed.title} x{entry.count}" for key, entry in rest]
+                    )[:2000]
+                )
+            except Exception:
+                self._logger.exception("The summary of %d errors could not be posted", len(rest))
+
+
+    def close(self) -> None:
+        self._listener.stop()
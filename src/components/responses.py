@@ -0,0 +1,100 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterable
+
+from discord import Embed, SlashCommand
+from discord.ext import commands
+
+if TYPE_CHECKING:
+    from discord.ext.commands import Cog
+
+
+HELP_LOCALES: tuple[str, ...] = ("ja", "en", "en-US") # Built ahead of the first /help, other locales on first use
+
+
+def build_help(cogs: Iterable[Cog], locale: str, prefix: str) -> list[Embed]:
+    """Returns one help page for every public cog.
+
+    Parameters
+    ----------
+    cogs : Iterable[Cog]
+        The cogs of the bot.
+    locale : str
+        The locale to describe the commands in.
+    prefix : str
+        The prefix of the text commands.
+    """
+
+    is_ja = locale == "ja"
+    embeds: list[Embed] = []
+
+    for cog in cogs:
+
+        if not cog.is_public:
+            continue
+
+        e = Embed(title=cog.description_localizations.get(locale, cog.description))
+        e.set_footer(text = '<必須> [任意]' if is_ja else '<Required> [Optional]')
+
+        for command in cog.walk_commands():
+
+            if isinstance(command, SlashCommand):
+                usage = command.description_localizations
+                if usage is not None:
+                    usage = usage.get(locale, command.description)
+                e.add_field(
+                    name = f'/{command.qualified_name}',
+                    value = '> ' + (usage or command.description),
+                    inline = False
+                )
+
+            elif isinstance(command, commands.Command):
+                if command.hidden:
+                    continue
+                e.add_field(
+                    name = prefix+command.usage,
+                    value = '> ' + (command.brief if is_ja else command.description),
+                    inline = False
+                )
+
+        embeds.append(e)
+
+    return embeds
+
+
+class ResponseCache:
+    """Responses that only change when cogs are added or removed, keyed by locale.
+
+    Help pages are built once per locale and prefix and shared by every
+    invocation, so they must not be modified by the caller. The bot clears
+    the cache whenever a cog is added or removed, which includes reloading
+    an extension.
+    """
+
+    __slots__ = ("_help",)
+
+    if TYPE_CHECKING:
+        _help: dict[tuple[str, str], tuple[Embed, ...]]
+
+    def __init__(self) -> None:
+        self._help = {}
+
+
+    def help(self, cogs: Iterable[Cog], locale: str, prefix: str) -> tuple[Embed, ...]:
+        """Returns the help pages, building them if they are not cached."""
+
+        key = (locale, prefix)
+        if (embeds := self._help.get(key)) is None:
+            embeds = self._help[key] = tuple(build_help(cogs, locale, prefix))
+        return embeds
+
+
+    def build(self, cogs: Iterable[Cog], prefix: str, locales: Iterable[str] = HELP_LOCALES) -> None:
+        """Builds the help pages of the given locales ahead of their first use."""
+
+        cogs = list(cogs)
+        for locale in locales:
+            self.help(cogs, locale, prefix)
+
+
+    def clear(self) -> None:
+        self._help.clear()
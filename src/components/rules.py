@@ -0,0 +1,135 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from errors import InvalidRank, InvalidPlayerNum
+
+if TYPE_CHECKING:
+    from .game import Player
+
+
+_TAGS: str = "ABCDEFGHIJKLMNOPQRSTUVWX"
+_DEFAULT_POINTS: tuple[int, ...] = (15, 12, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1)
+MAX_ROOM_SIZE: int = 24 # Also the largest rank a slash command accepts
+MAX_RACE_COUNT: int = 32 # Also the largest race number a slash command accepts
+MAX_POINTS: int = 0xFFFF # The points of a rank are stored as 16 bits by StatsStore
+
+
+class ScoringRules:
+    """The room size, race count and points table of a game.
+
+    Everything a game looks up per submission is computed once here, and
+    rules are interned so that all games with the same rules share one
+    instance. Use :meth:`get` instead of the constructor.
+
+    Attributes
+    ----------
+    room_size : int
+        The number of players in a game.
+    race_count : int
+        The number of races in a game.
+    points : tuple[int, ...]
+        The points of each rank, indexed by the rank. ``points[0]`` is unused.
+    formats : tuple[int, ...]
+        The team sizes that split the room into at least two teams, and FFA.
+    """
+
+    __slots__ = ("room_size", "race_count", "points", "formats", "_ranks", "_rank_of", "_layouts")
+
+    if TYPE_CHECKING:
+        room_size: int
+        race_count: int
+        points: tuple[int, ...]
+        formats: tuple[int, ...]
+        _ranks: dict[Union[str, int], int]
+        _rank_of: dict[int, int]
+        _layouts: dict[int, tuple[Optional[str], ...]]
+
+    _cache: dict[tuple[int, int, tuple[int, ...]], ScoringRules] = {}
+
+    def __init__(self, room_size: int, race_count: int, points: tuple[int, ...]) -> None:
+        self.room_size = room_size
+        self.race_count = race_count
+        self.points = (0, *points)
+        self.formats = tuple(f for f in range(1, room_size+1) if not room_size % f and (f == 1 or room_size // f >= 2))
+        self._ranks = {**{r: r for r in range(1, room_size+1)}, **{str(r): r for r in range(1, room_size+1)}}
+        # With repeated points, a legacy table that only shows points maps to the best rank.
+        self._rank_of = {p: r for r, p in reversed(list(enumerate(points, 1)))}
+        self._layouts = {
+            f: (None,) * room_size if f == 1 else tuple(_TAGS[:room_size // f] * f)
+            for f in self.formats
+        }
+
+
+    @classmethod
+    def get(
+        cls,
+        room_size: int = 12,
+        race_count: int = 12,
+        points: tuple[int, ...] = _DEFAULT_POINTS
+    ) -> ScoringRules:
+        """Returns the shared rules for the given parameters."""
+
+        key = (room_size, race_count, tuple(points))
+        if (rules := cls._cache.get(key)) is None:
+            rules = cls._cache[key] = cls(*key)
+        return rules
+
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"room_size": self.room_size, "race_count": self.race_count, "points": list(self.points[1:])}
+
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict[str, Any]]) -> ScoringRules:
+        """Restores rules from :meth:`to_dict`. ``None`` gives the default rules."""
+
+        return DEFAULT_RULES if data is None else cls.get(data["room_size"], data["race_count"], tuple(data["points"]))
+
+
+    def is_rank(self, value: Union[str, int]) -> bool:
+        return value in self._ranks
+
+
+    def rank(self, value: Union[str, int]) -> int:
+        """Returns a rank given as a number or a string.
+
+        Raises
+        ------
+        InvalidRank
+            If it is not a rank of the room.
+        """
+
+        try:
+            return self._ranks[value]
+        except (KeyError, TypeError):
+            raise InvalidRank(self.room_size)
+
+
+    def rank_of(self, points: int) -> int:
+        """Returns the rank worth ``points``, or the last rank if no rank is."""
+
+        return self._rank_of.get(points, self.room_size)
+
+
+    def fits(self, players: list[Player]) -> bool:
+        """Returns whether a table of ``players`` can be a game of these rules."""
+
+        return len(players) == self.room_size and all(len(p.points) <= self.race_count for p in players)
+
+
+    def layout(self, format: int) -> tuple[Optional[str], ...]:
+        """Returns the team tag of each seat for a format.
+
+        Raises
+        ------
+        InvalidPlayerNum
+            If the format does not split the room.
+        """
+
+        try:
+            return self._layouts[format]
+        except KeyError:
+            raise InvalidPlayerNum(self.room_size)
+
+
+DEFAULT_RULES: ScoringRules = ScoringRules.get()
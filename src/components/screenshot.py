@@ -0,0 +1,212 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+import asyncio
+import io
+import multiprocessing
+import re
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+from errors import MissingDependency
+
+if TYPE_CHECKING:
+    from discord import Attachment
+
+
+SCREENSHOT_WORKERS: int = 2 # Processes reading screenshots
+MAX_SCREENSHOT_SIZE: int = 8 << 20 # Bytes, larger attachments are not downloaded
+MATCH_CUTOFF: float = 0.6 # The similarity a line of text needs to be taken for a player's name
+
+_RANK = re.compile(r"^(\d{1,2})(?:st|nd|rd|th)?[.:)]?$", re.IGNORECASE)
+
+
+def is_screenshot(attachment: Attachment) -> bool:
+    return (
+        attachment.content_type is not None
+        and attachment.content_type.startswith("image/")
+        and attachment.size <= MAX_SCREENSHOT_SIZE
+    )
+
+
+def _normalize(text: str) -> str:
+    return "".join(c for c in text.casefold() if c.isalnum())
+
+
+def read_rows(data: bytes) -> list[tuple[Optional[int], list[str], float]]:
+    """Returns the lines of text of a result screen, top to bottom.
+
+    Each line is its leading rank, if one could be read, its remaining
+    words and its vertical position. Result screens print light text on
+    dark rows, so the image is inverted when it is mostly dark and
+    binarized before being read.
+    """
+
+    image = ImageOps.grayscale(Image.open(io.BytesIO(data)))
+    if image.width < 1280:
+        # Tesseract reads small glyphs poorly.
+        scale = 1280 / image.width
+        image = image.resize((1280, round(image.height * scale)), Image.LANCZOS)
+    histogram = image.histogram()
+    if sum(i * n for i, n in enumerate(histogram)) / max(sum(histogram), 1) < 128:
+        image = ImageOps.invert(image)
+    image = ImageOps.autocontrast(image).point(lambda v: 255 if v > 128 else 0)
+
+    data = pytesseract.image_to_data(image, config="--psm 6", output_type=pytesseract.Output.DICT)
+    lines: dict[tuple[int, int, int], tuple[list[str], float]] = {}
+
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        words, top = lines.setdefault(key, ([], data["top"][i]))
+        words.append(word.strip())
+
+    rows = []
+    for words, top in sorted(lines.values(), key=lambda line: line[1]):
+        rank = None
+        if (m := _RANK.match(words[0])) is not None:
+            rank = int(m.group(1))
+            words = words[1:]
+        if words:
+            rows.append((rank, words, top))
+    return rows
+
+
+def _rank_rows(rows: list[tuple[Optional[int], list[str], float]], max_rank: int) -> list[Optional[int]]:
+    """Returns the rank of every row, estimating the ones that could not be read from their position."""
+
+    known = [(top, rank) for rank, _, top in rows if rank is not None and 1 <= rank <= max_rank]
+
+    if len(known) < 2:
+        return [i + 1 if i < max_rank else None for i in range(len(rows))]
+
+    # The rows of a result screen are evenly spaced, so a line through the
+    # ranks that were read places the others.
+    n = len(known)
+    mean_top = sum(t for t, _ in known) / n
+    mean_rank = sum(r for _, r in known) / n
+    var = sum((t - mean_top) ** 2 for t, _ in known)
+    slope = sum((t - mean_top) * (r - mean_rank) for t, r in known) / var if var else 0
+
+    ranks = []
+    for rank, _, top in rows:
+        if rank is None or not 1 <= rank <= max_rank:
+            rank = round(mean_rank + slope * (top - mean_top))
+        ranks.append(rank if 1 <= rank <= max_rank else None)
+    return ranks
+
+
+def _similarity(name: str, words: list[str]) -> float:
+    """Returns how closely any run of consecutive words spells the name."""
+
+    target = _normalize(name)
+    if not target:
+        return 0.0
+
+    best = 0.0
+    for start in range(len(words)):
+        for stop in range(start + 1, len(words) + 1):
+            text = _normalize("".join(words[start:stop]))
+            if len(text) > 2 * len(target):
+                break
+            best = max(best, SequenceMatcher(None, target, text).ratio())
+    return best
+
+
+def match_rows(
+    rows: list[tuple[Optional[int], list[str], float]],
+    names: list[str],
+    max_rank: int
+) -> dict[str, int]:
+    """Assigns the ranks of the rows to the names they are most similar to.
+
+    Pairs are taken best first, so every name and every rank is used at
+    most once. Names that no row resembles are left out.
+    """
+
+    ranks = _rank_rows(rows, max_rank)
+    pairs = sorted(
+        (
+            (score, name, rank)
+            for (_, words, _), rank in zip(rows, ranks) if rank is not None
+            for name in names
+            if (score := _similarity(name, words)) >= MATCH_CUTOFF
+        ),
+        reverse=True
+    )
+
+    placements: dict[str, int] = {}
+    taken: set[int] = set()
+
+    for _, name, rank in pairs:
+        if name in placements or rank in taken:
+            continue
+        placements[name] = rank
+        taken.add(rank)
+
+    return placements
+
+
+def _extract(data: bytes, names: list[str], max_rank: int) -> dict[str, int]:
+    return match_rows(read_rows(data), names, max_rank)
+
+
+class ScreenshotReader:
+    """Reads the placements of a race from screenshots of its result screen.
+
+    Screenshots are decoded and read by Tesseract in a pool of processes,
+    so reading them does not block the event loop.
+
+    Parameters
+    ----------
+    workers : int, optional
+        The number of processes, by default :data:`SCREENSHOT_WORKERS`.
+
+    Raises
+    ------
+    MissingDependency
+        If Pillow, pytesseract or the Tesseract binary is not installed.
+    """
+
+    def __init__(self, workers: int = SCREENSHOT_WORKERS) -> None:
+        if Image is None:
+            raise MissingDependency("Pillow")
+        if pytesseract is None:
+            raise MissingDependency("pytesseract")
+        try:
+            pytesseract.get_tesseract_version()
+        except pytesseract.TesseractNotFoundError:
+            raise MissingDependency("Tesseract")
+
+        # Forking the threads of the bot could copy locks held by them, so workers fork from a server process instead.
+        self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("forkserver"))
+
+
+    async def read(self, data: bytes, names: list[str], max_rank: int) -> dict[str, int]:
+        """Returns the rank of every player found in a screenshot.
+
+        Parameters
+        ----------
+        data : bytes
+            The image.
+        names : list[str]
+            The names of the players of the game.
+        max_rank : int
+            The number of players in the room.
+        """
+
+        return await asyncio.get_running_loop().run_in_executor(self._pool, _extract, data, names, max_rank)
+
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,246 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Optional
+from pathlib import Path
+import json
+import os
+
+from errors import InvalidSetting
+from .rules import ScoringRules, MAX_ROOM_SIZE, MAX_RACE_COUNT, MAX_POINTS
+
+
+_LANGUAGES: frozenset[str] = frozenset({"ja", "en-US"})
+
+
+class GuildSettings:
+    """The settings of a guild.
+
+    Instances are never mutated, so the cached ones can be shared freely.
+    Use :meth:`replace` to derive new settings.
+
+    Attributes
+    ----------
+    prefix : str
+        The prefix of the text commands.
+    room_size : int
+        The number of players in a game.
+    race_count : int
+        The number of races in a game.
+    points : tuple[int, ...]
+        The points of each rank, from the first place.
+    formats : tuple[int, ...]
+        The team sizes players can vote for. ``1`` is FFA.
+    language : Optional[str]
+        The language of the replies to text commands, or ``None`` for all languages.
+    """
+
+    __slots__ = ("prefix", "room_size", "race_count", "points", "formats", "language")
+
+    if TYPE_CHECKING:
+        prefix: str
+        room_size: int
+        race_count: int
+        points: tuple[int, ...]
+        formats: tuple[int, ...]
+        language: Optional[str]
+
+    def __init__(
+        self,
+        prefix: str = "$",
+        room_size: int = 12,
+        race_count: int = 12,
+        points: tuple[int, ...] = (15, 12, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1),
+        formats: tuple[int, ...] = (1, 2, 3, 4, 6),
+        language: Optional[str] = None
+    ) -> None:
+        self.prefix = prefix
+        self.room_size = room_size
+        self.race_count = race_count
+        self.points = tuple(points)
+        self.formats = tuple(sorted(formats))
+        self.language = language
+
+
+    @property
+    def rules(self) -> ScoringRules:
+        """The shared scoring rules built from these settings."""
+
+        return ScoringRules.get(self.room_size, self.race_count, self.points)
+
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, GuildSettings) and self.to_dict() == other.to_dict()
+
+
+    def to_dict(self) -> dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+    def replace(self, **changes) -> GuildSettings:
+        """Returns a copy with some settings changed.
+
+        Changing the room size alone also resizes the points table and
+        drops the formats that no longer divide the room. Back to the
+        default size, the default points and formats are restored instead.
+
+        Raises
+        ------
+        InvalidSetting
+            If the resulting settings are inconsistent.
+        """
+
+        if (size := changes.get("room_size", self.room_size)) != self.room_size:
+            if size == DEFAULT.room_size:
+                changes.setdefault("points", DEFAULT.points)
+                changes.setdefault("formats", DEFAULT.formats)
+            if "points" not in changes:
+                changes["points"] = (self.points + (self.points[-1],) * size)[:size]
+            if "formats" not in changes:
+                changes["formats"] = tuple(f for f in self.formats if not size % f and (f == 1 or size // f >= 2)) or (1,)
+
+        settings = GuildSettings(**{**self.to_dict(), **changes})
+        settings.validate()
+        return settings
+
+
+    def validate(self) -> None:
+        """Checks that the settings are consistent with each other.
+
+        Raises
+        ------
+        InvalidSetting
+            With the name of the first inconsistent setting.
+        """
+
+        if not self.prefix or len(self.prefix) > 5 or any(c.isspace() for c in self.prefix):
+            raise InvalidSetting("prefix")
+        if not 2 <= self.room_size <= MAX_ROOM_SIZE:
+            raise InvalidSetting("room_size")
+        if not 1 <= self.race_count <= MAX_RACE_COUNT:
+            raise InvalidSetting("race_count")
+        if (
+            len(self.points) != self.room_size
+            or any(not 0 <= p <= MAX_POINTS for p in self.points)
+            or any(a < b for a, b in zip(self.points, self.points[1:]))
+        ):
+            raise InvalidSetting("points")
+        if not self.formats or any(
+            f < 1 or self.room_size % f or (f > 1 and self.room_size // f < 2) for f in self.formats
+        ):
+            raise InvalidSetting("formats")
+        if self.language is not None and self.language not in _LANGUAGES:
+            raise InvalidSetting("language")
+
+
+    @staticmethod
+    def parse(key: str, text: str) -> Any:
+        """Parses the value of a setting typed by a user.
+
+        Raises
+        ------
+        InvalidSetting
+            If the key is unknown or the value cannot be parsed.
+        """
+
+        text = text.strip()
+
+        try:
+            if key == "prefix":
+                return text
+            if key in ("room_size", "race_count"):
+                return int(text)
+            if key == "points":
+                return tuple(int(p) for p in text.replace(" ", ",").split(",") if p)
+            if key == "formats":
+                return tuple(
+                    1 if f.lower() == "ffa" else int(f.lower().split("v")[0])
+                    for f in text.replace(" ", ",").split(",") if f
+                )
+            if key == "language":
+                return None if text.lower() in ("", "none", "all") else text
+        except ValueError:
+            pass
+
+        raise InvalidSetting(key)
+
+
+DEFAULT: GuildSettings = GuildSettings()
+
+
+class SettingsStore:
+    """The settings of all guilds, served from memory.
+
+    Only the guilds that changed anything are stored. Every change is
+    written to disk before the cache is updated, so reads never touch the
+    disk and a crash never leaves the cache ahead of the file.
+
+    Parameters
+    ----------
+    path : Path
+        The JSON file to store the settings in.
+    default : GuildSettings, optional
+        The settings of the guilds that changed nothing.
+    """
+
+    def __init__(self, path: Path, default: GuildSettings = DEFAULT) -> None:
+        self.path = path
+        self.default = default
+        self._cache: dict[int, GuildSettings] = {}
+
+        if path.exists():
+            with path.open(encoding="utf-8") as fp:
+                for guild_id, data in json.load(fp).items():
+                    self._cache[int(guild_id)] = default.replace(**data)
+
+
+    def get(self, guild_id: Optional[int]) -> GuildSettings:
+        """Returns the settings of a guild, or the defaults for DMs and unset guilds."""
+
+        return self._cache.get(guild_id, self.default)
+
+
+    def _write(self, cache: dict[int, GuildSettings]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            str(guild_id): {k: v for k, v in settings.to_dict().items() if v != getattr(self.default, k)}
+            for guild_id, settings in cache.items()
+        }
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as fp:
+            json.dump(data, fp, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+
+    def update(self, guild_id: int, **changes) -> GuildSettings:
+        """Changes some settings of a guild.
+
+        Returns
+        -------
+        GuildSettings
+            The new settings of the guild.
+
+        Raises
+        ------
+        InvalidSetting
+            If the resulting settings are inconsistent.
+        """
+
+        settings = self.get(guild_id).replace(**changes)
+        cache = {**self._cache, guild_id: settings}
+        if settings == self.default:
+            del cache[guild_id]
+
+        self._write(cache)
+        self._cache = cache
+        return settings
+
+
+    def reset(self, guild_id: int, *keys: str) -> GuildSettings:
+        """Restores the defaults of some settings of a guild, or of all settings if no key is given.
+
+        The room size is restored with the points and formats, which were resized to fit it.
+        """
+
+        keys = set(keys or GuildSettings.__slots__)
+        if "room_size" in keys:
+            keys |= {"points", "formats"}
+        return self.update(guild_id, **{key: getattr(self.default, key) for key in keys})
@@ -0,0 +1,675 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from hashlib import blake2b
+from pathlib import Path
+import asyncio
+import os
+import struct
+import threading
+import time
+
+if TYPE_CHECKING:
+    from .game import Game
+
+
+# guild_id, channel_id, lineup fingerprint, finished_at, rows offset, format, player count,
+# started_at (0 if unknown) and the id of the game this one replaces (-1 if none)
+_GAME = struct.Struct("<QQQdQBBdq")
+# The header before games had an identity, migrated on load.
+_GAME_V1 = struct.Struct("<QQQdQBB")
+# player_id, tag, won, race count (followed by placements (B) and points (H))
+_ROW = struct.Struct("<IBBB")
+
+# Finishing the same lineup again in the same channel within this window is
+# treated as an edit of an already recorded game, not as a new one, for
+# games whose start is unknown.
+_DUPLICATE_WINDOW: float = 20 * 60
+
+Header = tuple[int, int, int, float, int, int, int, float, int]
+Rows = list[tuple[int, int, bool, list[int], list[int]]]
+
+
+class PlayerSummary:
+    """Aggregated statistics of a player.
+
+    Attributes
+    ----------
+    games : int
+        The number of games played.
+    races : int
+        The number of races played.
+    placement_sum : int
+        The sum of all placements.
+    points_sum : int
+        The sum of all points.
+    wins : int
+        The number of games won.
+    """
+
+    __slots__ = (
+        "games",
+        "races",
+        "placement_sum",
+        "points_sum",
+        "wins"
+    )
+
+    if TYPE_CHECKING:
+        games: int
+        races: int
+        placement_sum: int
+        points_sum: int
+        wins: int
+
+    def __init__(self, games: int, races: int, placement_sum: int, points_sum: int, wins: int) -> None:
+        self.games = games
+        self.races = races
+        self.placement_sum = placement_sum
+        self.points_sum = points_sum
+        self.wins = wins
+
+    @property
+    def average_placement(self) -> float:
+        return self.placement_sum / self.races if self.races else 0.0
+
+    @property
+    def points_per_race(self) -> float:
+        return self.points_sum / self.races if self.races else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+
+class _Rollup:
+    """Prefix sums over a player's games, so that any "last N games" window is O(1)."""
+
+    __slots__ = (
+        "game_ids",
+        "races",
+        "placements",
+        "points",
+        "wins",
+        "histogram"
+    )
+
+    def __init__(self) -> None:
+        self.game_ids = array("Q")
+        self.races = array("q", [0])
+        self.placements = array("q", [0])
+        self.points = array("q", [0])
+        self.wins = array("q", [0])
+        self.histogram: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.races) - 1
+
+    def append(self, game_id: int, placements: list[int], points: list[int], won: bool) -> None:
+        self.game_ids.append(game_id)
+        self.races.append(self.races[-1] + len(placements))
+        self.placements.append(self.placements[-1] + sum(placements))
+        self.points.append(self.points[-1] + sum(points))
+        self.wins.append(self.wins[-1] + won)
+
+        for placement in placements:
+            if placement > len(self.histogram):
+                self.histogram.extend([0] * (placement - len(self.histogram)))
+            self.histogram[placement-1] += 1
+
+    def pop(self, placements: list[int]) -> None:
+        """Removes the last game, whose placements are given."""
+
+        for values in (self.game_ids, self.races, self.placements, self.points, self.wins):
+            values.pop()
+        for placement in placements:
+            self.histogram[placement-1] -= 1
+
+    def summary(self, last: Optional[int] = None) -> PlayerSummary:
+        games = len(self)
+        start = 0 if last is None else max(games - last, 0)
+        return PlayerSummary(
+            games - start,
+            self.races[-1] - self.races[start],
+            self.placements[-1] - self.placements[start],
+            self.points[-1] - self.points[start],
+            self.wins[-1] - self.wins[start]
+        )
+
+
+class GameRecord:
+    """A finished game read back from the store.
+
+    Attributes
+    ----------
+    game_id : int
+        The sequential id of the game in the store.
+    guild_id : int
+        The id of the guild the game was played in.
+    channel_id : int
+        The id of the channel the game was played in.
+    finished_at : float
+        The UNIX time the game was recorded.
+    format : int
+        The number of players per team.
+    rows : list[tuple[str, Optional[str], bool, list[int], list[int]]]
+        ``(name, tag, won, placements, points)`` for each player.
+    """
+
+    __slots__ = (
+        "game_id",
+        "guild_id",
+        "channel_id",
+        "finished_at",
+        "format",
+        "rows"
+    )
+
+    if TYPE_CHECKING:
+        game_id: int
+        guild_id: int
+        channel_id: int
+        finished_at: float
+        format: int
+        rows: list[tuple[str, Optional[str], bool, list[int], list[int]]]
+
+    def __init__(self, **kwargs) -> None:
+        for key in self.__slots__:
+            setattr(self, key, kwargs[key])
+
+
+class _Index:
+    """The in-memory indexes of a store.
+
+    :meth:`StatsStore.reindex` builds new indexes on the side and swaps
+    them in at once, so that readers never see them half built.
+    """
+
+    __slots__ = (
+        "names",
+        "name_ids",
+        "games",
+        "superseded",
+        "guild_games",
+        "rollups",
+        "last_by_channel",
+        "keys",
+        "fingerprints"
+    )
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+        self.games: list[Header] = []
+        self.superseded: set[int] = set()
+        self.guild_games: dict[int, array] = {}
+        self.rollups: dict[tuple[int, int], _Rollup] = {}
+        self.last_by_channel: dict[int, tuple[int, float, int]] = {}
+        self.keys: dict[tuple[int, float], int] = {}
+        self.fingerprints: Optional[dict[tuple[int, int], list[float]]] = None
+
+
+class StatsStore:
+    """An append-only store of finished games.
+
+    Every game is written as one fixed-size header in ``games.v2.bin`` and
+    one variable-size row per player in ``rows.bin``. Player names are
+    interned in ``names.txt``. Per-guild and per-player indexes with
+    prefix-sum rollups are rebuilt in memory on load and kept up to date on
+    every record.
+
+    A game recorded again, e.g. after a rank was corrected once it had
+    finished, is appended with the id of the record it replaces, and only
+    the latest version is indexed.
+
+    Writes and :meth:`reindex` should be run with :meth:`submit`, on a
+    single thread of the store, so that they neither block the event loop
+    nor overlap. Readers take a lock held only briefly by writers.
+
+    Parameters
+    ----------
+    path : Path
+        The directory to store the files in.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="stats")
+        self._ix: _Index = self._build()
+
+
+    @property
+    def _names_path(self) -> Path:
+        return self.path / "names.txt"
+
+    @property
+    def _games_path(self) -> Path:
+        return self.path / "games.v2.bin"
+
+    @property
+    def _rows_path(self) -> Path:
+        return self.path / "rows.bin"
+
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """Runs a method of the store on its thread, after the ones submitted before."""
+
+        return asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+
+    def close(self) -> None:
+        """Waits for the submitted writes to finish."""
+
+        self._executor.shutdown(wait=True)
+
+
+    def _migrate(self) -> None:
+        old = self.path / "games.bin"
+        if not old.exists() or self._games_path.exists():
+            return
+
+        data = old.read_bytes()
+        tmp = self._games_path.with_suffix(".tmp")
+        with tmp.open("wb") as fp:
+            for header in _GAME_V1.iter_unpack(data[:len(data) - len(data) % _GAME_V1.size]):
+                fp.write(_GAME.pack(*header, 0.0, -1))
+        os.replace(tmp, self._games_path)
+        old.unlink()
+
+
+    def _build(self) -> _Index:
+        ix = _Index()
+        self._migrate()
+
+        if self._names_path.exists():
+            for name in self._names_path.read_text(encoding="utf-8").splitlines():
+                ix.name_ids[name] = len(ix.names)
+                ix.names.append(name)
+
+        if not self._games_path.exists():
+            return ix
+
+        data = self._games_path.read_bytes()
+        ix.games = list(_GAME.iter_unpack(data[:len(data) - len(data) % _GAME.size]))
+        ix.superseded = {header[8] for header in ix.games if header[8] >= 0}
+        # Rows are written before their header, so a header whose rows are
+        # not on disk means rows.bin was lost or truncated.
+        broken: Optional[int] = None
+
+        try:
+            with self._rows_path.open("rb") as rows:
+                # Backfilled games are appended after newer ones, so games are
+                # indexed in the order they finished for "last N games" to hold.
+                for game_id in sorted(range(len(ix.games)), key=lambda i: ix.games[i][3]):
+                    if game_id in ix.superseded:
+                        continue
+                    header = ix.games[game_id]
+                    rows.seek(header[4])
+                    try:
+                        self._index(ix, game_id, header, list(self._read_rows(rows, header[6])))
+                    except struct.error:
+                        broken = game_id if broken is None else min(broken, game_id)
+        except FileNotFoundError:
+            broken = 0 if ix.games else None
+
+        if broken is not None or len(data) % _GAME.size:
+            kept = len(ix.games) if broken is None else broken
+            print(f"Stats: dropped {len(ix.games) - kept} games without rows and {len(data) % _GAME.size} stray bytes")
+            with self._games_path.open("r+b") as fp:
+                fp.truncate(kept * _GAME.size)
+            if broken is not None:
+                return self._build()
+
+        return ix
+
+
+    def reindex(self) -> None:
+        """Rebuilds the indexes from disk, e.g. after older games were inserted with :meth:`record_many`."""
+
+        # Readers keep using the old indexes while the new ones are built.
+        ix = self._build()
+        with self._lock:
+            self._ix = ix
+
+
+    @staticmethod
+    def _read_rows(fp, count: int) -> Iterator[tuple[int, int, bool, list[int], list[int]]]:
+        for _ in range(count):
+            player_id, tag, won, n = _ROW.unpack(fp.read(_ROW.size))
+            placements = list(fp.read(n))
+            points = list(struct.unpack(f"<{n}H", fp.read(2 * n)))
+            yield player_id, tag, bool(won), placements, points
+
+
+    @staticmethod
+    def _index(ix: _Index, game_id: int, header: Header, rows: Rows) -> None:
+        guild_id, channel_id, fingerprint, finished_at = header[:4]
+        ix.guild_games.setdefault(guild_id, array("Q")).append(game_id)
+        if (last := ix.last_by_channel.get(channel_id)) is None or last[1] <= finished_at:
+            ix.last_by_channel[channel_id] = (fingerprint, finished_at, game_id)
+        if header[7]:
+            ix.keys[(channel_id, header[7])] = game_id
+        if ix.fingerprints is not None:
+            ix.fingerprints.setdefault((channel_id, fingerprint), []).append(finished_at)
+
+        for player_id, _, won, placements, points in rows:
+            ix.rollups.setdefault((guild_id, player_id), _Rollup()).append(game_id, placements, points, won)
+
+
+    def _supersede(self, game_id: int) -> bool:
+        """Removes a game from the indexes, when it is the last game of its guild and players.
+
+        Returns ``False`` if it is not, and the indexes must be rebuilt instead.
+        """
+
+        ix = self._ix
+        header = ix.games[game_id]
+        with self._rows_path.open("rb") as fp:
+            fp.seek(header[4])
+            rows = list(self._read_rows(fp, header[6]))
+        rollups = [ix.rollups.get((header[0], player_id)) for player_id, *_ in rows]
+
+        if ix.guild_games[header[0]][-1] != game_id or any(r is None or r.game_ids[-1] != game_id for r in rollups):
+            return False
+
+        ix.guild_games[header[0]].pop()
+        for rollup, (_, _, _, placements, _) in zip(rollups, rows):
+            rollup.pop(placements)
+        ix.superseded.add(game_id)
+        return True
+
+
+    def _intern(self, name: str) -> int:
+        ix = self._ix
+        if (player_id := ix.name_ids.get(name)) is not None:
+            return player_id
+
+        player_id = ix.name_ids[name] = len(ix.names)
+        ix.names.append(name)
+
+        with self._names_path.open("a", encoding="utf-8") as fp:
+            fp.write(name + "\n")
+
+        return player_id
+
+
+    @staticmethod
+    def fingerprint(channel_id: int, game: Game) -> int:
+        """Returns a stable fingerprint of the lineup of a game."""
+
+        lineup = sorted(f"{p.name}\t{p.tag}" for p in game.ranking)
+        digest = blake2b(f"{channel_id}\n{chr(10).join(lineup)}".encode(), digest_size=8)
+        return int.from_bytes(digest.digest(), "little")
+
+
+    def record(
+        self,
+        guild_id: int,
+        channel_id: int,
+        game: Game,
+        finished_at: Optional[float] = None,
+        started_at: Optional[float] = None
+    ) -> bool:
+        """Records a finished game, replacing the earlier record of the same game.
+
+        The same game is the one started at ``started_at`` in the channel,
+        or, when either start is unknown, the last game of the channel if it
+        has the same lineup and finished within
+        :data:`_DUPLICATE_WINDOW`. The game must not change while this
+        runs, so pass a copy when running it off the event loop.
+
+        Parameters
+        ----------
+        guild_id : int
+            The id of the guild the game was played in.
+        channel_id : int
+            The id of the channel the game was played in.
+        game : Game
+            The finished game.
+        finished_at : Optional[float], optional
+            The UNIX time the game finished, by default now.
+        started_at : Optional[float], optional
+            The UNIX time the game started, which identifies it in the channel.
+
+        Returns
+        -------
+        bool
+            Whether the game was recorded. ``False`` if it was already recorded as it is.
+        """
+
+        finished_at = time.time() if finished_at is None else finished_at
+        fingerprint = self.fingerprint(channel_id, game)
+
+        with self._lock:
+            ix = self._ix
+            previous = None if started_at is None else ix.keys.get((channel_id, started_at))
+            if (
+                previous is None
+                and (last := ix.last_by_channel.get(channel_id)) is not None
+                and (started_at is None or not ix.games[last[2]][7])
+                and last[0] == fingerprint
+                and abs(finished_at - last[1]) < _DUPLICATE_WINDOW
+            ):
+                previous = last[2]
+
+            rows = self._rows(game)
+            buffer = self._pack(rows)
+
+            if previous is not None:
+                old = ix.games[previous]
+                with self._rows_path.open("rb") as fp:
+                    fp.seek(old[4])
+                    if fp.read(len(buffer)) == buffer and old[6] == len(rows):
+                        return False
+
+            with self._rows_path.open("ab") as fp:
+                offset = fp.tell()
+                fp.write(buffer)
+
+            header = (
+                guild_id, channel_id, fingerprint, finished_at, offset, game.format, len(rows),
+                started_at or 0.0, -1 if previous is None else previous
+            )
+
+            with self._games_path.open("ab") as fp:
+                fp.write(_GAME.pack(*header))
+
+            ix.games.append(header)
+            # An older game is replaced by rebuilding the indexes, outside the lock.
+            rebuild = previous is not None and not self._supersede(previous)
+            if not rebuild:
+                self._index(ix, len(ix.games) - 1, header, rows)
+
+        if rebuild:
+            self.reindex()
+        return True
+
+
+    def record_many(self, guild_id: int, channel_id: int, games: Iterable[tuple[Game, float]]) -> int:
+        """Records finished games of a channel at once, with one write per file.
+
+        Unlike :meth:`record`, a game is skipped if the same lineup was
+        recorded in the channel within the duplicate window at any time,
+        so that games can be inserted in any order and more than once.
+        Call :meth:`reindex` after inserting games older than the newest
+        ones, so that the "last N games" of the players are in order.
+
+        Parameters
+        ----------
+        guild_id : int
+            The id of the guild the games were played in.
+        channel_id : int
+            The id of the channel the games were played in.
+        games : Iterable[tuple[Game, float]]
+            The finished games and the UNIX times they finished.
+
+        Returns
+        -------
+        int
+            The number of games recorded.
+        """
+
+        with self._lock:
+            ix = self._ix
+            if ix.fingerprints is None:
+                ix.fingerprints = {}
+                for game_id, header in enumerate(ix.games):
+                    if game_id not in ix.superseded:
+                        ix.fingerprints.setdefault((header[1], header[2]), []).append(header[3])
+
+            with self._rows_path.open("ab") as fp:
+                offset = fp.tell()
+                buffer = bytearray()
+                recorded: list[tuple[Header, Rows]] = []
+
+                for game, finished_at in games:
+                    fingerprint = self.fingerprint(channel_id, game)
+                    seen = ix.fingerprints.setdefault((channel_id, fingerprint), [])
+                    if any(abs(finished_at - t) < _DUPLICATE_WINDOW for t in seen):
+                        continue
+                    # Indexed below, but later games of the same batch must see it already.
+                    seen.append(finished_at)
+
+                    rows = self._rows(game)
+                    recorded.append((
+                        (guild_id, channel_id, fingerprint, finished_at, offset + len(buffer), game.format, len(rows), 0.0, -1),
+                        rows
+                    ))
+                    buffer += self._pack(rows)
+
+                fp.write(buffer)
+
+            with self._games_path.open("ab") as fp:
+                fp.write(b"".join(_GAME.pack(*header) for header, _ in recorded))
+
+            # The fingerprints are already added above.
+            fingerprints, ix.fingerprints = ix.fingerprints, None
+            for header, rows in recorded:
+                ix.games.append(header)
+                self._index(ix, len(ix.games) - 1, header, rows)
+            ix.fingerprints = fingerprints
+
+        return len(recorded)
+
+
+    def _rows(self, game: Game) -> Rows:
+        top = game.teams[0].total_point
+        won = {p.name for t in game.teams if t.total_point == top for p in t.players}
+        return [
+            (self._intern(p.name), ord(p.tag) if p.tag else 0, p.name in won, p.placements, list(p.points))
+            for p in game.ranking
+        ]
+
+
+    @staticmethod
+    def _pack(rows: Rows) -> bytes:
+        buffer = bytearray()
+        for player_id, tag, is_winner, placements, points in rows:
+            buffer += _ROW.pack(player_id, tag, is_winner, len(placements))
+            buffer += bytes(placements)
+            buffer += struct.pack(f"<{len(points)}H", *points)
+        return bytes(buffer)
+
+
+    def summary(self, guild_id: int, name: str, last: Optional[int] = None) -> Optional[PlayerSummary]:
+        """Returns the statistics of a player, or ``None`` if they have not played.
+
+        Parameters
+        ----------
+        guild_id : int
+            The id of the guild.
+        name : str
+            The name of the player.
+        last : Optional[int], optional
+            Only aggregate the last ``last`` games, by default all games.
+        """
+
+        with self._lock:
+            ix = self._ix
+            if (player_id := ix.name_ids.get(name)) is None:
+                return None
+            if (rollup := ix.rollups.get((guild_id, player_id))) is None:
+                return None
+            return rollup.summary(last)
+
+
+    def histogram(self, guild_id: int, name: str) -> list[int]:
+        """Returns how many times a player finished in each placement (index 0 is 1st)."""
+
+        with self._lock:
+            player_id = self._ix.name_ids.get(name)
+            rollup = self._ix.rollups.get((guild_id, player_id))
+            return [] if rollup is None else rollup.histogram.copy()
+
+
+    def leaderboard(
+        self,
+        guild_id: int,
+        last: Optional[int] = None,
+        min_games: int = 1
+    ) -> list[tuple[str, PlayerSummary]]:
+        """Returns the statistics of every player of a guild."""
+
+        with self._lock:
+            return [
+                (self._ix.names[player_id], summary)
+                for (g, player_id), rollup in self._ix.rollups.items()
+                if g == guild_id and (summary := rollup.summary(last)).games >= min_games
+            ]
+
+
+    def games(
+        self,
+        guild_id: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Iterator[GameRecord]:
+        """Streams finished games from disk one at a time.
+
+        Parameters
+        ----------
+        guild_id : Optional[int], optional
+            Only yield the games of this guild, by default all games.
+        since : Optional[float], optional
+            Only yield the games finished at or after this UNIX time.
+        until : Optional[float], optional
+            Only yield the games finished before this UNIX time.
+        """
+
+        # Games recorded meanwhile are not yielded, and a reindex meanwhile
+        # swaps in new indexes without touching these.
+        with self._lock:
+            ix = self._ix
+            if guild_id is None:
+                game_ids = [i for i in range(len(ix.games)) if i not in ix.superseded]
+            else:
+                game_ids = list(ix.guild_games.get(guild_id, ()))
+            names = ix.names
+            headers = ix.games
+
+        if not self._rows_path.exists():
+            return
+
+        with self._rows_path.open("rb") as fp:
+            for game_id in game_ids:
+                g, channel_id, _, finished_at, offset, format, count, *_ = headers[game_id]
+
+                if (since is not None and finished_at < since) or (until is not None and finished_at >= until):
+                    continue
+
+                fp.seek(offset)
+                yield GameRecord(
+                    game_id=game_id,
+                    guild_id=g,
+                    channel_id=channel_id,
+                    finished_at=finished_at,
+                    format=format,
+                    rows=[
+                        (names[player_id], chr(tag) if tag else None, won, placements, points)
+                        for player_id, tag, won, placements, points in self._read_rows(fp, count)
+                    ]
+                )
@@ -6,8 +6,10 @@ from datetime import datetime, timedelta
 import random
 
 from errors import *
-from .utils import get_integers, get_name
+from .utils import get_integers, get_name, format_name, format_value
 from .game import Game, Team, Player
+from .render import GameRenderer, get_renderer
+from .rules import ScoringRules, DEFAULT_RULES
 
 if TYPE_CHECKING:
     from discord import Message, Member
@@ -56,7 +58,8 @@ class TableMixin:
         cls: Type[T],
         channel: Messageable,
         limit: Optional[int] = 100,
-        allow_archived: bool = False
+        allow_archived: bool = False,
+        **kwargs
     ) -> T:
         """Fetches a table from a channel.
 
@@ -68,6 +71,8 @@ class TableMixin:
             The limit of messages to fetch, by default 100
         allow_archived : bool, optional
             Whether to allow archived tables, by default False
+        **kwargs
+            Passed to :meth:`from_message`.
 
         Returns
         -------
@@ -88,7 +93,7 @@ class TableMixin:
             oldest_first=False
         ):
             if cls._is_valid(message):
-                table = cls.from_message(message)
+                table = cls.from_message(message, **kwargs)
 
                 if table.is_done and not allow_archived:
                     raise ArchivedTable
@@ -127,23 +132,26 @@ class TableMixin:
 
 class GatherTable(TableMixin):
 
-    __slots__ = ("names", "message", "is_done")
+    __slots__ = ("names", "message", "is_done", "size")
 
     if TYPE_CHECKING:
         names: set[str]
         message: Optional[Message]
         is_done: bool
+        size: int
 
 
     def __init__(
         self,
         names: set[str] = {},
         message: Optional[Message] = None,
-        is_done: bool = False
+        is_done: bool = False,
+        size: int = 12
     ) -> None:
         self.names = names
         self.message = message
         self.is_done = is_done
+        self.size = size
 
 
     def __len__(self) -> int:
@@ -161,7 +169,7 @@ class GatherTable(TableMixin):
 
         self.names.add(get_name(member))
 
-        if len(self.names) == 12:
+        if len(self.names) >= self.size:
             self.is_done = True
 
 
@@ -179,7 +187,7 @@ class GatherTable(TableMixin):
     @property
     def embed(self):
         return Embed(
-            title=f"Members @{12-len(self.names)}",
+            title=f"Members @{self.size-len(self.names)}",
             color=DONE_COLOR if self.is_done else ON_GOING_COLOR,
             description="\n".join(f"{i+1}. {name}" for i, name in enumerate(self.names))
         )
@@ -195,8 +203,10 @@ class GatherTable(TableMixin):
                 names.add(line.split(". ")[1])
 
         is_done =  e.color == DONE_COLOR
+        # The size of the room is not stored anywhere else.
+        size = int(e.title.split("@")[1]) + len(names)
 
-        return cls(names, message, is_done)
+        return cls(names, message, is_done, size)
 
     @staticmethod
     def is_valid(message):
@@ -211,32 +221,36 @@ class GatherTable(TableMixin):
 
 class FormatTable(TableMixin):
 
-    __slots__ = ("data", "message", "is_done")
+    __slots__ = ("data", "message", "is_done", "formats")
 
     if TYPE_CHECKING:
         data: dict[int, set[str]]
         message: Optional[Message]
         is_done: bool
+        formats: tuple[int, ...]
 
 
     def __init__(
         self,
         _data: dict[int, set[str]],
         message: Optional[Message] = None,
-        is_done: bool = False
+        is_done: bool = False,
+        formats: tuple[int, ...] = (1, 2, 3, 4, 6),
+        size: Optional[int] = 12
     ) -> None:
         data = _data.copy()
 
-        if len(set().union(*_data.values())) != 12:
-            raise InvalidPlayerNum(12)
+        if size is not None and len(set().union(*_data.values())) != size:
+            raise InvalidPlayerNum(size)
 
-        for key in {1, 2, 3, 4, 6, -1}:
+        for key in (*formats, -1):
             if key not in _data.keys():
                 data[key] = set()
 
         self.data = data
         self.message = message
         self.is_done = is_done
+        self.formats = formats
 
     @property
     def embed(self) -> Embed:
@@ -244,15 +258,13 @@ class FormatTable(TableMixin):
         e.color = DONE_COLOR if self.is_done else ON_GOING_COLOR
         e.description = "Click the buttons to vote for the format you prefer"
 
-        name = {1: "FFA", 2: "2v2", 3: "3v3", 4: "4v4", 6: "6v6", -1: "Unvoted"}
-
-        for k in (1, 2, 3, 4, 6, -1):
+        for k in (*self.formats, -1):
             v = self.data[k].copy()
 
             if not v and k != -1:
-                e.add_field(name=name[k], value="> No votes", inline=False)
+                e.add_field(name=format_name(k), value="> No votes", inline=False)
             elif v:
-                e.add_field(name=name[k], value="> "+",".join(n for n in v), inline=False)
+                e.add_field(name=format_name(k), value="> "+",".join(n for n in v), inline=False)
 
         return e
 
@@ -260,15 +272,16 @@ class FormatTable(TableMixin):
     def from_message(cls, message):
         e = message.embeds[0].copy()
         is_done =  e.color == DONE_COLOR
-        name = {"FFA": 1, "2v2": 2, "3v3": 3, "4v4": 4, "6v6": 6, "Unvoted":-1}
         data: dict[int, set[str]] = {}
 
         for field in e.fields:
             if field.value == "> No votes":
+                data[format_value(field.name)] = set()
                 continue
-            data[name[field.name]] = set(field.value[2:].split(","))
+            data[format_value(field.name)] = set(field.value[2:].split(","))
 
-        return cls(data, message, is_done)
+        formats = tuple(k for k in data if k != -1)
+        return cls(data, message, is_done, formats, None)
 
     @staticmethod
     def is_valid(message):
@@ -302,36 +315,15 @@ class GameTable(TableMixin):
         self.is_done = is_done
 
     @property
-    def embed(self) -> Embed:
-        format = {1: "FFA", 2: "2v2", 3: "3v3", 4: "4v4", 6: "6v6"}[self._game.format]
-        e = Embed(title=f"Format: **{format}**")
-        e.color = DONE_COLOR if self.is_done else ON_GOING_COLOR
-
-        if self._game.format == 1:
-            for i, p in enumerate(self._game.ranking):
-                e.add_field(
-                    name=f"{i+1}. {p.name} @{p.left_race_num}",
-                    value=f"> {p.total_point}pt ({'-'.join(str(point) for point in p.points)})",
-                    inline=False
-                )
-        else:
-            e.description = "**Ranking\n\n**"
-            for i, team in enumerate(self._game.teams):
-                e.description += f"`{i+1}.` **{team.tag}**  ({team.total_point}pt)\n"
-            for i, p in enumerate(self._game.ranking):
-                e.add_field(
-                    name=f"{i+1}. {p.name} ({p.tag}) @{p.left_race_num}",
-                    value=f"> {p.total_point}pt ({'-'.join(str(point) for point in p.points)})",
-                    inline=False
-                )
-
-        if self.is_done or self._game.is_done:
-            e.set_image(url=self._game.result_url)
+    def renderer(self) -> GameRenderer:
+        return get_renderer(self._game)
 
-        return e
+    @property
+    def embed(self) -> Embed:
+        return self.renderer.embed(self.is_done, DONE_COLOR if self.is_done else ON_GOING_COLOR)
 
     @classmethod
-    def from_message(cls, message):
+    def from_message(cls, message, rules: ScoringRules = DEFAULT_RULES):
         e = message.embeds[0].copy()
         is_done =  e.color == DONE_COLOR
         is_ffa: bool = "FFA" in e.title
@@ -345,11 +337,19 @@ class GameTable(TableMixin):
             }
             if not is_ffa:
                 payload["tag"] = data[2][1]
-            players.append(Player(**payload))
+            players.append(Player(**payload, rules=rules))
+
+        # A table posted before the rules changed, or before there were any but the default.
+        if not rules.fits(players):
+            if not DEFAULT_RULES.fits(players):
+                raise RulesMismatch
+            rules = DEFAULT_RULES
+            for player in players:
+                player.bind(rules)
         if is_ffa:
-            return cls(Game([Team(players=[p], tag=None) for p in players]), message, is_done)
+            return cls(Game([Team(players=[p], tag=None) for p in players], rules=rules), message, is_done)
         else:
-            return cls(Game(Team.make_teams(players)), message, is_done)
+            return cls(Game(Team.make_teams(players), rules=rules), message, is_done)
 
     @staticmethod
     def is_valid(message):
@@ -363,16 +363,80 @@ class GameTable(TableMixin):
 
 
     @classmethod
-    def initialize(cls: Type[T], format: int, names: list[str]) -> T:
+    def initialize(cls: Type[T], format: int, names: list[str], rules: ScoringRules = DEFAULT_RULES) -> T:
         _names = names.copy()
-        _tags = ["A", "B", "C", "D", "E", "F"]
+
+        if len(_names) != rules.room_size:
+            raise InvalidPlayerNum(rules.room_size)
 
         random.shuffle(_names)
-        tag = _tags[:int(12/format)]*format
+        tag = rules.layout(format)
 
         if format == 1:
-            teams = [Team([Player(name=name,tag=None)], None) for name in _names]
-            return cls(Game(teams))
+            teams = [Team([Player(name=name, tag=None, rules=rules)], None) for name in _names]
+            return cls(Game(teams, rules=rules))
         else:
-            teams = Team.make_teams([Player(name=name, tag=tag) for name, tag in zip(_names, tag)])
-            return cls(Game(teams))
\ No newline at end of file
+            teams = Team.make_teams([Player(name=name, tag=tag, rules=rules) for name, tag in zip(_names, tag)])
+            return cls(Game(teams, rules=rules))
+
+class PlacementTable(TableMixin):
+    """The placements of a race read from a screenshot, waiting to be confirmed."""
+
+    __slots__ = ("race", "placements", "missing", "message", "is_done")
+
+    if TYPE_CHECKING:
+        race: int
+        placements: dict[str, int]
+        missing: list[str]
+        message: Optional[Message]
+        is_done: bool
+
+    def __init__(
+        self,
+        race: int,
+        placements: dict[str, int],
+        missing: list[str] = [],
+        message: Optional[Message] = None,
+        is_done: bool = False
+    ) -> None:
+        self.race = race
+        self.placements = placements
+        self.missing = missing
+        self.message = message
+        self.is_done = is_done
+
+    @property
+    def embed(self) -> Embed:
+        e = Embed(
+            title=f"Placements of race {self.race}",
+            color=DONE_COLOR if self.is_done else ON_GOING_COLOR,
+            description="\n".join(f"{rank}. {name}" for name, rank in sorted(self.placements.items(), key=lambda p: p[1]))
+        )
+        if self.missing:
+            e.set_footer(text="Not found: " + ", ".join(self.missing))
+        return e
+
+    @classmethod
+    def from_message(cls, message):
+        e = message.embeds[0].copy()
+        placements: dict[str, int] = {}
+
+        for line in e.description.split("\n"):
+            rank, name = line.split(". ", 1)
+            placements[name] = int(rank)
+
+        missing = []
+        if type(e.footer.text) is not _EmptyEmbed:
+            missing = e.footer.text.removeprefix("Not found: ").split(", ")
+
+        return cls(int(e.title.rsplit(" ", 1)[1]), placements, missing, message, e.color == DONE_COLOR)
+
+    @staticmethod
+    def is_valid(message):
+        e = message.embeds[0].copy()
+
+        return (
+            message.author.bot
+            and e.title.startswith("Placements of race ")
+            and e.color in (ON_GOING_COLOR, DONE_COLOR)
+        )
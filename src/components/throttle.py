@@ -0,0 +1,97 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Hashable, Optional
+import time
+
+
+class TokenBucket:
+    """A token bucket.
+
+    Parameters
+    ----------
+    capacity : float
+        The maximum number of tokens, i.e. the allowed burst.
+    rate : float
+        The tokens refilled per second.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated_at")
+
+    if TYPE_CHECKING:
+        capacity: float
+        rate: float
+        tokens: float
+        updated_at: float
+
+    def __init__(self, capacity: float, rate: float, now: Optional[float] = None) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def consume(self, now: Optional[float] = None, tokens: float = 1.0) -> bool:
+        """Takes tokens if available.
+
+        Returns
+        -------
+        bool
+            Whether the tokens were taken.
+        """
+
+        self._refill(time.monotonic() if now is None else now)
+
+        if self.tokens < tokens:
+            return False
+
+        self.tokens -= tokens
+        return True
+
+    def retry_after(self, now: Optional[float] = None, tokens: float = 1.0) -> float:
+        """Returns the seconds until ``tokens`` are available."""
+
+        self._refill(time.monotonic() if now is None else now)
+        return max(tokens - self.tokens, 0.0) / self.rate
+
+
+class Throttle:
+    """A set of token buckets, one per key.
+
+    Buckets are created on first use and dropped again once they are full,
+    so idle users and channels cost nothing.
+
+    Parameters
+    ----------
+    capacity : float
+        The allowed burst per key.
+    rate : float
+        The tokens refilled per second per key.
+    """
+
+    def __init__(self, capacity: float, rate: float) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self._buckets: dict[Hashable, TokenBucket] = {}
+        self._prune_at = 1024
+
+    def _bucket(self, key: Hashable, now: float) -> TokenBucket:
+        if (bucket := self._buckets.get(key)) is None:
+            if len(self._buckets) >= self._prune_at:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(self.capacity, self.rate, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        idle = self.capacity / self.rate
+        self._buckets = {k: b for k, b in self._buckets.items() if now - b.updated_at < idle}
+        self._prune_at = max(1024, 2 * len(self._buckets))
+
+    def consume(self, key: Hashable, tokens: float = 1.0) -> bool:
+        now = time.monotonic()
+        return self._bucket(key, now).consume(now, tokens)
+
+    def retry_after(self, key: Hashable, tokens: float = 1.0) -> float:
+        now = time.monotonic()
+        return self._bucket(key, now).retry_after(now, tokens)
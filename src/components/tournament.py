@@ -0,0 +1,522 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+from pathlib import Path
+import json
+import os
+from discord import Embed
+
+from errors import *
+from .game import Game, Player, Team
+from .rules import ScoringRules, DEFAULT_RULES
+
+
+class Entrant:
+    """A team, or a single player in FFA, entered in a tournament.
+
+    Attributes
+    ----------
+    name : str
+        The name of the team, or of the player in FFA.
+    members : list[str]
+        The names of the players of the team.
+    points : int
+        The points earned in all rounds so far, including the current one.
+    round : int
+        The last round the entrant played in.
+    """
+
+    __slots__ = ("name", "members", "points", "round")
+
+    if TYPE_CHECKING:
+        name: str
+        members: list[str]
+        points: int
+        round: int
+
+    def __init__(self, name: str, members: list[str], points: int = 0, round: int = 0) -> None:
+        self.name = name
+        self.members = members
+        self.points = points
+        self.round = round
+
+
+class Room:
+    """A game of the current round of a tournament.
+
+    Attributes
+    ----------
+    channel_id : int
+        The id of the channel the game is played in.
+    entrants : list[str]
+        The names of the entrants in the room.
+    totals : dict[str, int]
+        The points of each entrant in this room, as last counted.
+    is_done : bool
+        Whether the game has ended.
+    """
+
+    __slots__ = ("channel_id", "entrants", "totals", "is_done", "_entrant_of")
+
+    if TYPE_CHECKING:
+        channel_id: int
+        entrants: list[str]
+        totals: dict[str, int]
+        is_done: bool
+        _entrant_of: dict[str, str]
+
+    def __init__(
+        self,
+        channel_id: int,
+        entrants: list[Entrant],
+        totals: Optional[dict[str, int]] = None,
+        is_done: bool = False
+    ) -> None:
+        self.channel_id = channel_id
+        self.entrants = [e.name for e in entrants]
+        self.totals = totals or {e.name: 0 for e in entrants}
+        self.is_done = is_done
+        self._entrant_of = {m: e.name for e in entrants for m in e.members}
+
+
+    def is_playing(self, game: Game) -> bool:
+        """Whether ``game`` is the game of this room, and not another one started in the same channel."""
+
+        return game._players.keys() == self._entrant_of.keys()
+
+
+    def ranking(self) -> list[str]:
+        return sorted(self.entrants, key=self.totals.__getitem__, reverse=True)
+
+
+class Tournament:
+    """A tournament played in many rooms at once.
+
+    Entrants are seeded into rooms round by round, and the best entrants
+    of each room advance to the next round. The standings are updated by
+    the change of a single room, so a rank submitted in one room never
+    rescans the others.
+
+    Parameters
+    ----------
+    guild_id : int
+        The id of the guild the tournament is held in.
+    channel_id : int
+        The id of the channel the standings are shown in.
+    format : int
+        The number of players per team.
+    advance : int
+        The number of entrants of each room that advance to the next round.
+    rules : ScoringRules, optional
+        The rules of the games, by default the default rules.
+    """
+
+    def __init__(
+        self,
+        guild_id: int,
+        channel_id: int,
+        format: int,
+        advance: int,
+        rules: ScoringRules = DEFAULT_RULES
+    ) -> None:
+        rules.layout(format)
+
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.format = format
+        self.advance = advance
+        self.rules = rules
+        self.round: int = 0
+        self.message_id: Optional[int] = None
+        self.entrants: dict[str, Entrant] = {}
+        self.rooms: dict[int, Room] = {}
+
+
+    @property
+    def room_entrants(self) -> int:
+        """The number of entrants in a room."""
+
+        return self.rules.room_size // self.format
+
+
+    @property
+    def is_round_done(self) -> bool:
+        return all(room.is_done for room in self.rooms.values())
+
+
+    @property
+    def is_finished(self) -> bool:
+        return self.round > 0 and len(self.rooms) == 1 and self.is_round_done
+
+
+    def _team_of(self, member: str) -> Optional[Entrant]:
+        return next((e for e in self.entrants.values() if member in e.members), None)
+
+
+    def register(self, member: str, team: Optional[str] = None) -> Entrant:
+        """Enters a player, on their own in FFA or into the team named ``team``.
+
+        Raises
+        ------
+        TournamentStarted
+            If the first round has already started.
+        TeamFull
+            If the team already has enough players.
+        """
+
+        if self.round:
+            raise TournamentStarted
+        self.unregister(member)
+
+        name = member if self.format == 1 or team is None else team
+        if (entrant := self.entrants.get(name)) is None:
+            entrant = self.entrants[name] = Entrant(name, [])
+        if len(entrant.members) >= self.format:
+            raise TeamFull(name)
+
+        entrant.members.append(member)
+        return entrant
+
+
+    def unregister(self, member: str) -> None:
+        if self.round:
+            raise TournamentStarted
+        if (entrant := self._team_of(member)) is not None:
+            entrant.members.remove(member)
+            if not entrant.members:
+                del self.entrants[entrant.name]
+
+
+    def bracket(self, entrants: int, advance: Optional[int] = None) -> Optional[list[int]]:
+        """Returns the number of rooms of every round, or ``None`` if the rounds do not lead to a final.
+
+        Every round but the final must fill its rooms exactly. The final is
+        a single room, which may be only partly filled by the entrants
+        advancing to it.
+
+        Parameters
+        ----------
+        entrants : int
+            The number of entrants of the first round.
+        advance : Optional[int], optional
+            The entrants of each room that advance, by default :attr:`advance`.
+        """
+
+        advance = self.advance if advance is None else advance
+
+        per_room = self.room_entrants
+        if not entrants or entrants % per_room:
+            return None
+
+        rooms = [entrants // per_room]
+        while rooms[-1] > 1:
+            advancing = rooms[-1] * advance
+            if advancing > per_room and advancing % per_room:
+                return None
+            rooms.append(-(-advancing // per_room))
+        return rooms
+
+
+    def seed(self, entrants: list[Entrant], channel_ids: list[int]) -> list[Room]:
+        """Splits entrants in seed order into rooms, snaking so that every room gets a fair share of each tier.
+
+        After the first round, entrants that fit into one room play the
+        final there, even if they do not fill it.
+
+        Raises
+        ------
+        InvalidEntrantNum
+            If the entrants do not fill the rooms exactly.
+        IncompleteTeam
+            If a team does not have enough players.
+        NotEnoughRooms
+            If there are fewer channels than rooms.
+        """
+
+        per_room = self.room_entrants
+        is_final = self.round > 0 and 0 < len(entrants) <= per_room
+        if not entrants or (len(entrants) % per_room and not is_final):
+            raise InvalidEntrantNum(per_room)
+        if incomplete := [e.name for e in entrants if len(e.members) != self.format]:
+            raise IncompleteTeam(incomplete[0], self.format)
+
+        count = 1 if is_final else len(entrants) // per_room
+        if len(channel_ids) < count:
+            raise NotEnoughRooms(count)
+
+        seats: list[list[Entrant]] = [[] for _ in range(count)]
+        for i, entrant in enumerate(entrants):
+            tier, pos = divmod(i, count)
+            seats[pos if tier % 2 == 0 else count-1-pos].append(entrant)
+
+        return [Room(channel_id, room) for channel_id, room in zip(channel_ids, seats)]
+
+
+    def start_round(self, channel_ids: list[int], seeds: dict[str, float]) -> dict[int, Game]:
+        """Starts the next round with the entrants still in the tournament.
+
+        Parameters
+        ----------
+        channel_ids : list[int]
+            The channels to play the rooms in. Only as many as needed are used.
+        seeds : dict[str, float]
+            The rating of each player. Entrants are seeded by the average of their players.
+
+        Returns
+        -------
+        dict[int, Game]
+            The game of each room, by channel.
+
+        Raises
+        ------
+        ArchivedTable
+            If the final has been played.
+        RoundInProgress
+            If a room of the current round has not ended.
+        InvalidAdvance
+            If the first round would not lead to a final with this many entrants.
+        """
+
+        if self.is_finished:
+            raise ArchivedTable
+        if not self.is_round_done:
+            raise RoundInProgress
+
+        if self.round:
+            entrants = self.advancing()
+        else:
+            if len(self.entrants) % self.room_entrants == 0 and self.bracket(len(self.entrants)) is None:
+                raise InvalidAdvance(
+                    len(self.entrants),
+                    self.advance,
+                    [a for a in range(1, self.room_entrants) if self.bracket(len(self.entrants), a)]
+                )
+            entrants = sorted(
+                self.entrants.values(),
+                key=lambda e: sum(seeds.get(m, 0.0) for m in e.members) / len(e.members),
+                reverse=True
+            )
+
+        rooms = self.seed(entrants, channel_ids)
+        self.round += 1
+        self.rooms = {room.channel_id: room for room in rooms}
+
+        for entrant in entrants:
+            entrant.round = self.round
+
+        return {room.channel_id: self._game(room) for room in rooms}
+
+
+    def advancing(self) -> list[Entrant]:
+        """Returns the entrants advancing from the current round, the winners of every room first."""
+
+        placed = [
+            (place, -self.rooms[room.channel_id].totals[name], name)
+            for room in self.rooms.values()
+            for place, name in enumerate(room.ranking()[:self.advance])
+        ]
+        return [self.entrants[name] for *_, name in sorted(placed)]
+
+
+    def _game(self, room: Room) -> Game:
+        if self.format == 1:
+            teams = [Team([Player(name=name, tag=None, rules=self.rules)], None) for name in room.entrants]
+        else:
+            teams = [
+                Team([Player(name=m, tag=tag, rules=self.rules) for m in self.entrants[name].members], tag)
+                for name, tag in zip(room.entrants, self.rules.layout(self.format))
+            ]
+        return Game(teams, rules=self.rules)
+
+
+    def update(self, channel_id: int, game: Optional[Game], is_done: bool, name: Optional[str] = None) -> bool:
+        """Counts the change of a room into the standings.
+
+        Parameters
+        ----------
+        channel_id : int
+            The channel of the room.
+        game : Optional[Game]
+            The game of the channel.
+        is_done : bool
+            Whether the game has been ended.
+        name : Optional[str], optional
+            The player whose ranks changed. Only their entrant is counted
+            again. If not given, the whole room is.
+
+        Returns
+        -------
+        bool
+            Whether the standings changed.
+        """
+
+        if (room := self.rooms.get(channel_id)) is None or game is None or not room.is_playing(game):
+            return False
+
+        names = room.entrants if name is None else [room._entrant_of[name]]
+        changed = False
+
+        for entrant_name in names:
+            entrant = self.entrants[entrant_name]
+            total = sum(game._players[m].total_point for m in entrant.members)
+            if (delta := total - room.totals[entrant_name]):
+                entrant.points += delta
+                room.totals[entrant_name] = total
+                changed = True
+
+        if room.is_done != (done := is_done or game.is_done):
+            room.is_done = done
+            changed = True
+
+        return changed
+
+
+    @property
+    def standings(self) -> list[Entrant]:
+        """The entrants, the ones that went furthest first, then by points."""
+
+        return sorted(self.entrants.values(), key=lambda e: (e.round, e.points), reverse=True)
+
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "guild": self.guild_id,
+            "channel": self.channel_id,
+            "format": self.format,
+            "advance": self.advance,
+            "rules": self.rules.to_dict(),
+            "round": self.round,
+            "message": self.message_id,
+            "entrants": [[e.name, e.members, e.points, e.round] for e in self.entrants.values()],
+            "rooms": [[r.channel_id, r.totals, r.is_done] for r in self.rooms.values()],
+        }
+
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Tournament:
+        tournament = cls(data["guild"], data["channel"], data["format"], data["advance"], ScoringRules.from_dict(data["rules"]))
+        tournament.round = data["round"]
+        tournament.message_id = data["message"]
+        tournament.entrants = {name: Entrant(name, members, points, round) for name, members, points, round in data["entrants"]}
+        tournament.rooms = {
+            channel_id: Room(channel_id, [tournament.entrants[name] for name in totals], totals, is_done)
+            for channel_id, totals, is_done in data["rooms"]
+        }
+        return tournament
+
+
+    def embed(self, limit: int = 40) -> Embed:
+        """Returns the standings of the tournament.
+
+        Parameters
+        ----------
+        limit : int, optional
+            The number of entrants to show, by default 40.
+        """
+
+        done = sum(room.is_done for room in self.rooms.values())
+        e = Embed(title=f"Tournament: **{'FFA' if self.format == 1 else f'{self.format}v{self.format}'}**")
+        e.description = f"Round {self.round} ({done}/{len(self.rooms)} rooms done)\n" if self.round else "Registration\n"
+
+        standings = self.standings
+        lines = [
+            f"{i+1:>3}. {entrant.name[:16]:<16} {entrant.points:>5}pt" + ("" if entrant.round == self.round else f"  R{entrant.round}")
+            for i, entrant in enumerate(standings[:limit])
+        ]
+        if lines:
+            e.description += "```\n" + "\n".join(lines) + "\n```"
+        if len(standings) > limit:
+            e.set_footer(text=f"+{len(standings) - limit} more")
+
+        return e
+
+
+class TournamentStore:
+    """The tournaments of all guilds, one at a time per guild.
+
+    Parameters
+    ----------
+    path : Path
+        The JSON file to store the tournaments in.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._tournaments: dict[int, Tournament] = {}
+        self._rooms: dict[int, Tournament] = {}
+
+        if path.exists():
+            with path.open(encoding="utf-8") as fp:
+                for data in json.load(fp):
+                    self._add(Tournament.from_dict(data))
+
+
+    def __iter__(self) -> Iterator[Tournament]:
+        return iter(self._tournaments.values())
+
+
+    def _add(self, tournament: Tournament) -> None:
+        self._tournaments[tournament.guild_id] = tournament
+        self._index(tournament)
+
+
+    def _index(self, tournament: Tournament) -> None:
+        self._rooms = {k: t for k, t in self._rooms.items() if t is not tournament}
+        self._rooms.update(dict.fromkeys(tournament.rooms, tournament))
+
+
+    def get(self, guild_id: int) -> Tournament:
+        """Returns the tournament of a guild.
+
+        Raises
+        ------
+        TournamentNotFound
+            If the guild has no tournament.
+        """
+
+        try:
+            return self._tournaments[guild_id]
+        except KeyError:
+            raise TournamentNotFound
+
+
+    def of_room(self, channel_id: int) -> Optional[Tournament]:
+        """Returns the tournament a channel is a room of in the current round."""
+
+        return self._rooms.get(channel_id)
+
+
+    def create(self, tournament: Tournament) -> Tournament:
+        """Adds a tournament.
+
+        Raises
+        ------
+        TournamentExists
+            If the guild already has one.
+        """
+
+        if tournament.guild_id in self._tournaments:
+            raise TournamentExists
+        self._add(tournament)
+        self.save()
+        return tournament
+
+
+    def remove(self, guild_id: int) -> Tournament:
+        tournament = self.get(guild_id)
+        del self._tournaments[guild_id]
+        self._rooms = {k: t for k, t in self._rooms.items() if t is not tournament}
+        self.save()
+        return tournament
+
+
+    def save(self, tournament: Optional[Tournament] = None) -> None:
+        """Writes every tournament to disk, and reindexes the rooms of ``tournament`` after a new round."""
+
+        if tournament is not None:
+            self._index(tournament)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as fp:
+            json.dump([t.to_dict() for t in self._tournaments.values()], fp, ensure_ascii=False)
+        os.replace(tmp, self.path)
@@ -1,5 +1,7 @@
 from __future__ import annotations
-from typing import TypeVar, TYPE_CHECKING
+from typing import TypeVar, TYPE_CHECKING, Final
+from pathlib import Path
+import os
 import re
 
 if TYPE_CHECKING:
@@ -9,6 +11,8 @@ if TYPE_CHECKING:
 T = TypeVar('T')
 _NON_NEGATIVE_INT_RE = re.compile(r'[0-9]+')
 
+DATA_DIR: Final[Path] = Path(os.environ.get("DATA_DIR", Path(__file__).parents[1] / "data"))
+
 
 def get_name(member: Member) -> str:
     """Returns the name of the member.
@@ -41,4 +45,16 @@ def get_integers(text: str) -> list[int]:
         The non-negative-integers found in the text.
     """
 
-    return list(map(int, _NON_NEGATIVE_INT_RE.findall(text)))
\ No newline at end of file
+    return list(map(int, _NON_NEGATIVE_INT_RE.findall(text)))
+
+
+def format_name(format: int) -> str:
+    """Returns the label of a format, e.g. ``"FFA"`` or ``"2v2"``."""
+
+    return {1: "FFA", -1: "Unvoted"}.get(format, f"{format}v{format}")
+
+
+def format_value(name: str) -> int:
+    """Returns the format of a label made by :func:`format_name`."""
+
+    return {"FFA": 1, "Unvoted": -1}.get(name) or int(name.split("v")[0])
@@ -3,9 +3,10 @@ from typing import TYPE_CHECKING
 from discord.ui import View, string_select, button
 from discord import SelectOption
 
-from errors import MyError
-from .table import GatherTable, FormatTable, GameTable
-from .utils import get_name
+from errors import MyError, FormatDisabled, ShuttingDown, ArchivedTable
+from .table import GatherTable, FormatTable, GameTable, PlacementTable
+from .utils import get_name, format_name
+from .hooks import GatherFilled
 
 
 if TYPE_CHECKING:
@@ -23,6 +24,12 @@ class _BaseView(View):
             timeout=None
         )
 
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        if interaction.client.is_closing:
+            raise ShuttingDown
+        interaction.client.track()
+        return True
+
     async def on_timeout(self):
         try:
             await self.message.edit(view=None)
@@ -54,44 +61,72 @@ class GatherView(_BaseView):
 
     @button(label="Join", custom_id="gather_join_button")
     async def join(self, button: Button, interaction: Interaction):
-        await interaction.response.defer(ephemeral=True)
-        table = GatherTable.from_message(interaction.message)
-        table.names.add(get_name(interaction.user))
+        cog = interaction.client.get_cog("Gather")
+        cog._allow(interaction.user.id)
+        table = cog._live_table(GatherTable, interaction.message)
+        name = get_name(interaction.user)
+
+        if (table.is_done or len(table.names) >= table.size) and name not in table.names:
+            await interaction.response.defer(ephemeral=True)
+            waiting = await cog._join_pool(interaction.channel, [interaction.user])
+            await interaction.followup.send(
+                f"You have joined the matchmaking pool. ({waiting} waiting)" if interaction.locale != 'ja'
+                else f'マッチングプールに参加しました。(待機中: {waiting}人)',
+                ephemeral=True
+            )
+            return
+
+        # Checked and set without awaiting in between, so only the join that fills the table opens the vote.
+        is_new = name not in table.names
+        is_filling = is_new and len(table.names) + 1 >= table.size
+        table.names.add(name)
+        cog._leave_pool(interaction.guild, [interaction.user])
+        interaction.client.journals[interaction.channel.id].record("join", interaction.user.id, names=[name])
 
-        if len(table.names) == 12:
+        if is_filling:
             table.is_done = True
+            await interaction.response.defer(ephemeral=True)
+            interaction.client.events.publish(GatherFilled(interaction.guild_id, interaction.channel.id, list(table.names)))
+            formats = interaction.client.settings.get(interaction.guild_id).formats
             await interaction.message.edit(embed=table.embed, view=None)
             await interaction.followup.send(
                 content="Select format you prefer." if interaction.locale != 'ja' else 'ゲームの形式を選択してください。',
-                embed=FormatTable({-1: table.names.copy()}).embed,
-                view=FormatView(),
+                embed=FormatTable({-1: table.names.copy()}, formats=formats, size=table.size).embed,
+                view=FormatView(formats),
                 ephemeral=False
             )
         else:
-            await interaction.message.edit(embed=table.embed, view=GatherView())
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 "You have joined the Game" if interaction.locale != 'ja' else 'ゲームに参加しました。',
                 ephemeral=True
             )
+            if is_new:
+                cog._refresh_later(table)
 
 
     @button(label="Cancel", custom_id="gather_cancel_button")
     async def cancel(self, button: Button, interaction: Interaction):
-        await interaction.response.defer(ephemeral=True)
-        table = GatherTable.from_message(interaction.message)
+        cog = interaction.client.get_cog("Gather")
+        cog._allow(interaction.user.id)
+        table = cog._live_table(GatherTable, interaction.message)
+        if table.is_done:
+            raise ArchivedTable
+
         table.names.discard(get_name(interaction.user))
-        await interaction.message.edit(embed=table.embed, view=GatherView())
-        await interaction.followup.send(
+        interaction.client.journals[interaction.channel.id].record("leave", interaction.user.id, names=[get_name(interaction.user)])
+        await interaction.response.send_message(
             "You have canceled the Game" if interaction.locale != 'ja' else 'ゲームをキャンセルしました。',
             ephemeral=True
         )
+        cog._refresh_later(table)
 
 
 
 class FormatView(_BaseView):
 
-    def __init__(self) -> None:
+    def __init__(self, formats: tuple[int, ...] = (1, 2, 3, 4, 6)) -> None:
         super().__init__()
+        self.select_format.options = [SelectOption(label=format_name(f), value=str(f)) for f in formats]
 
 
     @string_select(
@@ -110,52 +145,65 @@ class FormatView(_BaseView):
         select: Select,
         interaction: Interaction
     ) -> None:
-        await interaction.response.defer(ephemeral=True)
-        table = FormatTable.from_message(interaction.message)
+        settings = interaction.client.settings.get(interaction.guild_id)
+        if int(select.values[0]) not in settings.formats:
+            raise FormatDisabled
 
-        for k in {1, 2, 3, 4, 6, -1}:
-            table.data[k].discard(get_name(interaction.user))
+        cog = interaction.client.get_cog("Gather")
+        cog._allow(interaction.user.id)
+        # Parsed by interaction_check already.
+        table = cog._live_table(FormatTable, interaction.message)
+        if table.is_done:
+            raise ArchivedTable
 
-        table.data[int(select.values[0])].add(get_name(interaction.user))
+        for names in table.data.values():
+            names.discard(get_name(interaction.user))
+
+        table.data.setdefault(int(select.values[0]), set()).add(get_name(interaction.user))
+        journal = interaction.client.journals[interaction.channel.id]
+        journal.record("vote", interaction.user.id, format=int(select.values[0]))
 
         if not table.data[-1]:
-            format = max(table.data, key=lambda x: len(table.data[x]))
-            await interaction.followup.send(
-                embed=GameTable.initialize(format, list(set().union(*table.data.values()))).embed,
-                view=GameView(),
-                ephemeral=False
-            )
-            table.is_done = True
-            await interaction.message.edit(embed=table.embed, view=None)
+            await self._start_game(table, interaction, ephemeral=True)
         else:
-            await interaction.message.edit(embed=table.embed, view=FormatView())
-            await interaction.followup.send(
+            await interaction.response.send_message(
                 "Your vote has been recorded" if interaction.locale != 'ja' else '投票が記録されました',
                 ephemeral=True
             )
-
-
+            cog._refresh_later(table)
 
 
     @button(label="Start", custom_id="format_start_button")
     async def start(self, button: Button, interaction: Interaction) -> None:
-        await interaction.response.defer(ephemeral=False)
-        table = FormatTable.from_message(interaction.message)
-        data = table.data.copy()
-        data.pop(-1, None)
-        format = max(data, key=lambda x: len(table.data[x]))
-        await interaction.followup.send(
-            embed=GameTable.initialize(format, list(set().union(*table.data.values()))).embed,
-            view=GameView(),
-            ephemeral=False
-        )
+        table = interaction.client.get_cog("Gather")._live_table(FormatTable, interaction.message)
+        if table.is_done:
+            raise ArchivedTable
+
+        await self._start_game(table, interaction, ephemeral=False)
+
+
+    async def _start_game(self, table: FormatTable, interaction: Interaction, ephemeral: bool) -> None:
+        # Set before awaiting, so that the game is started only once.
         table.is_done = True
-        await table.message.edit(embed=table.embed, view=None)
+        try:
+            await interaction.response.defer(ephemeral=ephemeral)
+            settings = interaction.client.settings.get(interaction.guild_id)
+            format = max(settings.formats, key=lambda x: len(table.data.get(x, ())))
+            game = GameTable.initialize(format, list(set().union(*table.data.values())), settings.rules)
+            message = await interaction.followup.send(embed=game.embed, view=GameView(), ephemeral=False)
+        except BaseException:
+            # No game was sent, so the vote can still be finished.
+            table.is_done = False
+            raise
+
+        interaction.client.journals[interaction.channel.id].start(interaction.user.id, game._game, message.id)
+        await interaction.message.edit(embed=table.embed, view=None)
 
 
     async def interaction_check(self, interaction: Interaction):
-        table = FormatTable.from_message(interaction.message)
-        return get_name(interaction.user)  in set().union(*table.data.values())
+        await super().interaction_check(interaction)
+        table = interaction.client.get_cog("Gather")._live_table(FormatTable, interaction.message)
+        return get_name(interaction.user) in set().union(*table.data.values())
 
 
     async def on_check_failure(self, interaction: Interaction):
@@ -165,6 +213,21 @@ class FormatView(_BaseView):
         )
 
 
+async def _clicked_game(interaction: Interaction) -> GameTable:
+    """Returns the game of the channel, if the clicked message is its table.
+
+    Raises
+    ------
+    ArchivedTable
+        If the message is the table of an earlier game.
+    """
+
+    table = await interaction.client.get_cog("Gather")._fetch_game(interaction.channel, allow_archived=True)
+    if table.message is None or table.message.id != interaction.message.id:
+        raise ArchivedTable
+    return table
+
+
 class GameView(_BaseView):
 
     def __init__(self) -> None:
@@ -174,8 +237,10 @@ class GameView(_BaseView):
     @button(label="End", custom_id="game_finish_button")
     async def end(self, button: Button, interaction: Interaction) -> None:
         await interaction.response.defer(ephemeral=False)
-        table = GameTable.from_message(interaction.message)
-        table.is_done = True
+        table = await _clicked_game(interaction)
+        if table.is_done != True:
+            table.is_done = True
+            interaction.client.journals[interaction.channel.id].set_done(interaction.user.id, True)
         await interaction.message.edit(embed=table.embed, view=ResumeView())
         await interaction.followup.send(
             "ゲームを終了しました。" if interaction.locale == 'ja' else 'Game has ended.',
@@ -190,9 +255,54 @@ class ResumeView(_BaseView):
     @button(label="Resume", custom_id="resume_button")
     async def resume(self, button: Button, interaction: Interaction) -> None:
         await interaction.response.defer(ephemeral=False)
-        table = GameTable.from_message(interaction.message)
-        table.is_done = False
+        table = await _clicked_game(interaction)
+        if table.is_done != False:
+            table.is_done = False
+            interaction.client.journals[interaction.channel.id].set_done(interaction.user.id, False)
         await interaction.message.edit(embed=table.embed, view=GameView())
         await interaction.followup.send(
             "ゲームを再開しました。" if interaction.locale == 'ja' else 'Game has resumed.',
-        )
\ No newline at end of file
+        )
+
+class PlacementView(_BaseView):
+
+    def __init__(self) -> None:
+        super().__init__()
+
+    @button(label="Confirm", custom_id="placement_confirm_button")
+    async def confirm(self, button: Button, interaction: Interaction) -> None:
+        cog = interaction.client.get_cog("Gather")
+        cog._allow(interaction.user.id, interaction.channel.id)
+        table = cog._live_table(PlacementTable, interaction.message)
+        if table.is_done:
+            raise ArchivedTable
+
+        # Set before awaiting, so that the placements are confirmed only once.
+        table.is_done = True
+        try:
+            await interaction.response.defer(ephemeral=True)
+            added = await cog._apply_placements(interaction.channel, interaction.user, table.race, table.placements)
+        except BaseException:
+            table.is_done = False
+            raise
+        await interaction.message.edit(embed=table.embed, view=None)
+        await interaction.followup.send(
+            f"Registered {added} ranks." if interaction.locale != 'ja' else f'{added}人の順位を登録しました。',
+            ephemeral=True
+        )
+
+    @button(label="Cancel", custom_id="placement_cancel_button")
+    async def cancel(self, button: Button, interaction: Interaction) -> None:
+        await interaction.message.delete()
+
+    async def interaction_check(self, interaction: Interaction):
+        await super().interaction_check(interaction)
+        table = PlacementTable.from_message(interaction.message)
+        # Every player of the game is either placed or listed as not found.
+        return get_name(interaction.user) in (*table.placements, *table.missing)
+
+    async def on_check_failure(self, interaction: Interaction):
+        await interaction.response.send_message(
+            "Only the players of this game can do this." if interaction.locale != 'ja' else 'このゲームの参加者のみ操作できます。',
+            ephemeral=True
+        )
@@ -34,6 +34,14 @@ class TableNotFound(MyError):
         )
 
 
+class RulesMismatch(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "この模擬は現在の設定と人数またはレース数が異なるため読み込めません。", "en-US": "This game does not match the room size or race count of the settings, so it cannot be read."}
+        )
+
+
 class ArchivedTable(MyError):
 
     def __init__(self) -> None:
@@ -44,17 +52,17 @@ class ArchivedTable(MyError):
 
 class InvalidRank(MyError):
 
-    def __init__(self) -> None:
+    def __init__(self, max_rank: int = 12) -> None:
         super().__init__(
-            {"ja": "順位は1~12の整数で指定してください。", "en-US": "Rank must be an integer between 1 and 12."}
+            {"ja": f"順位は1~{max_rank}の整数で指定してください。", "en-US": f"Rank must be an integer between 1 and {max_rank}."}
         )
 
 
 class AlreadyFinished(MyError):
 
-    def __init__(self) -> None:
+    def __init__(self, race_count: int = 12) -> None:
         super().__init__(
-            {"ja": "既に12レース終了しています。", "en-US": "This game is already finished."}
+            {"ja": f"既に{race_count}レース終了しています。", "en-US": "This game is already finished."}
         )
 
 
@@ -79,4 +87,179 @@ class NotFoundError(MyError):
     def __init__(self) -> None:
         super().__init__(
             {"ja": "見つかりませんでした。", "en-US": "Not found."}
-        )
\ No newline at end of file
+        )
+
+
+class RankConflict(MyError):
+
+    def __init__(self, race: int, rank: int) -> None:
+        super().__init__(
+            {
+                "ja": f"レース{race}の{rank}位は既に登録されています。",
+                "en-US": f"Rank {rank} of race {race} is already taken."
+            }
+        )
+
+
+class MissingDependency(MyError):
+
+    def __init__(self, name: str) -> None:
+        super().__init__(
+            {"ja": f"この機能には{name}が必要です。", "en-US": f"This feature requires {name}."}
+        )
+
+
+class NothingToUndo(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "取り消せる操作がありません。", "en-US": "There is nothing to undo."}
+        )
+
+
+class NotYourChange(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "他のメンバーの操作は取り消せません。(サーバー管理権限が必要です)", "en-US": "Only the member who made this change, or an admin, can undo it."}
+        )
+
+
+class TooManyRequests(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "操作が多すぎます。少し待ってから再度お試しください。", "en-US": "Too many requests. Please try again in a moment."}
+        )
+
+
+class InvalidSetting(MyError):
+
+    def __init__(self, key: str) -> None:
+        super().__init__(
+            {"ja": f"設定 `{key}` の値が不正です。", "en-US": f"Invalid value for the setting `{key}`."}
+        )
+
+
+class ManageGuildRequired(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "設定の変更にはサーバー管理権限が必要です。", "en-US": "You need the Manage Server permission to change the settings."}
+        )
+
+
+class FormatDisabled(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "この形式はこのサーバーでは無効です。", "en-US": "This format is disabled in this server."}
+        )
+
+
+class TournamentNotFound(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "このサーバーでは大会が開かれていません。", "en-US": "There is no tournament in this server."}
+        )
+
+
+class TournamentExists(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "このサーバーでは既に大会が開かれています。", "en-US": "A tournament is already held in this server."}
+        )
+
+
+class TournamentStarted(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "大会は既に始まっています。", "en-US": "The tournament has already started."}
+        )
+
+
+class RoundInProgress(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "まだ終了していない部屋があります。", "en-US": "Some rooms of this round have not ended yet."}
+        )
+
+
+class TeamFull(MyError):
+
+    def __init__(self, name: str) -> None:
+        super().__init__(
+            {"ja": f"チーム{name}は満員です。", "en-US": f"Team {name} is full."}
+        )
+
+
+class IncompleteTeam(MyError):
+
+    def __init__(self, name: str, size: int) -> None:
+        super().__init__(
+            {"ja": f"チーム{name}の人数が{size}人ではありません。", "en-US": f"Team {name} does not have {size} players."}
+        )
+
+
+class InvalidEntrantNum(MyError):
+
+    def __init__(self, per_room: int) -> None:
+        super().__init__(
+            {"ja": f"エントリー数は{per_room}の倍数にしてください。", "en-US": f"The number of entrants must be a multiple of {per_room}."}
+        )
+
+
+class InvalidAdvance(MyError):
+
+    def __init__(self, entrants: int, advance: int, choices: list[int]) -> None:
+        _choices = ", ".join(map(str, choices)) or "-"
+        super().__init__(
+            {
+                "ja": f"{entrants}組で各部屋の上位{advance}組が勝ち抜けると決勝まで組めません。(可能な勝ち抜け数: {_choices})",
+                "en-US": f"With {entrants} entrants, advancing the top {advance} of every room does not lead to a final. (Possible: {_choices})"
+            }
+        )
+
+
+class NotEnoughRooms(MyError):
+
+    def __init__(self, count: int) -> None:
+        super().__init__(
+            {"ja": f"部屋のチャンネルが{count}個必要です。", "en-US": f"{count} room channels are required."}
+        )
+
+
+class InvalidDate(MyError):
+
+    def __init__(self, text: str) -> None:
+        super().__init__(
+            {"ja": f"`{text}`は日付(YYYY-MM-DD)ではありません。", "en-US": f"`{text}` is not a date (YYYY-MM-DD)."}
+        )
+
+
+class ExportTooLarge(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "出力が大きすぎて送信できません。期間を狭めてください。", "en-US": "The export is too large to upload. Please narrow the period."}
+        )
+
+
+class BackfillInProgress(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "このサーバーでは既に取り込みが実行中です。", "en-US": "A backfill is already running in this server."}
+        )
+
+
+class ShuttingDown(MyError):
+
+    def __init__(self) -> None:
+        super().__init__(
+            {"ja": "Botを再起動しています。しばらくしてから再度お試しください。", "en-US": "The bot is restarting. Please try again in a moment."}
+        )
@@ -0,0 +1,107 @@
+"""Backfills a fake channel holding thousands of messages, interrupting it halfway.
+
+Archived tables are mixed with chatter and tables of unfinished games.
+The backfill is cancelled after half of the pages and run again from its
+checkpoint, and the games recorded are checked against the games posted.
+
+Usage (from ``src``)::
+
+    python -m tools.backfill [--messages 20000] [--every 10] [--workers 4]
+"""
+
+from __future__ import annotations
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+
+from components import backfill
+from components.backfill import Backfill, Checkpoint, PAGE_SIZE
+from components.rules import DEFAULT_RULES
+from components.table import GameTable
+from tools.fake import FakeBot, FakeChannel
+
+
+def _table(rng: random.Random, is_finished: bool, is_done: bool) -> GameTable:
+    format = rng.choice((1, 2, 3, 4, 6))
+    table = GameTable.initialize(format, [f"player{rng.randrange(500)}_{i}" for i in range(DEFAULT_RULES.room_size)])
+    game = table._game
+
+    for _ in range(DEFAULT_RULES.race_count if is_finished else rng.randrange(DEFAULT_RULES.race_count)):
+        ranks = list(range(1, DEFAULT_RULES.room_size + 1))
+        rng.shuffle(ranks)
+        for name, rank in zip(list(game._players), ranks):
+            game.add_rank(name, rank)
+
+    table.is_done = is_done
+    return table
+
+
+def _fill(channel: FakeChannel, messages: int, every: int, seed: int) -> int:
+    """Posts the messages, oldest first, and returns the number of finished games among them."""
+
+    rng = random.Random(seed)
+    user = channel.guild.member(2)
+    started = datetime(2021, 1, 1)
+    games = 0
+
+    for i in range(messages):
+        if i % every:
+            message = channel._post(str(rng.randint(1, 12)), author=user)
+        else:
+            # Some tables were ended with the End button before every race was
+            # registered, and some were left unfinished.
+            is_finished = rng.random() < 0.9
+            message = channel._post(embed=_table(rng, is_finished, is_finished or rng.random() < 0.5).embed)
+            games += is_finished
+        message.created_at = started + timedelta(minutes=5 * i)
+
+    return games
+
+
+async def run(messages: int, every: int, workers: int) -> None:
+    # Pages are not paced against a real rate limit here.
+    backfill.PAGE_BUCKET = (1e9, 1e9)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        bot = FakeBot(Path(data_dir))
+        channel = bot.guild(1).channel(10)
+        expected = _fill(channel, messages, every, seed=0)
+        checkpoint_path = Path(data_dir) / "backfill.json"
+
+        started = time.perf_counter()
+        first = Backfill(bot.stats, Checkpoint(checkpoint_path), workers, bot.metrics)
+        task = asyncio.create_task(first.run(1, channel, DEFAULT_RULES))
+        while bot.metrics.counters["backfill.pages"] < messages // PAGE_SIZE // 2:
+            await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        interrupted = Checkpoint(checkpoint_path).get(channel.id)
+
+        second = Backfill(bot.stats, Checkpoint(checkpoint_path), workers, bot.metrics)
+        entry = await second.run(1, channel, DEFAULT_RULES)
+        elapsed = time.perf_counter() - started
+
+        bot.stats.reindex()
+        stored = sum(1 for _ in bot.stats.games(1))
+
+    print(f"{messages} messages, {expected} finished games, {workers} workers")
+    print(f"interrupted after {interrupted['messages']} messages and {interrupted['games']} games")
+    print(f"resumed to {entry['messages']} messages, {entry['tables']} tables, {entry['games']} games in {elapsed:.2f} s")
+    print(f"{bot.metrics.counters['backfill.pages']} pages, {bot.rest['GET messages']} requests, {stored} games in the store")
+    print("OK" if entry["games"] == stored == expected and entry["messages"] == messages else "MISMATCH")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--every", type=int, default=10, help="one table every N messages")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.every, args.workers))
@@ -0,0 +1,64 @@
+"""Benchmarks rendering the game table after every rank submission.
+
+Usage (from ``src``)::
+
+    python -m tools.bench_render [--format 2] [--games 200]
+"""
+
+from __future__ import annotations
+import argparse
+import random
+import time
+
+from components.table import GameTable, ON_GOING_COLOR
+from components.render import GameRenderer
+
+
+def _play(seed: int) -> list[tuple[str, int]]:
+    rng = random.Random(seed)
+    names = [f"player{i}" for i in range(12)]
+    submissions: list[tuple[str, int]] = []
+
+    for _ in range(12):
+        ranks = list(range(1, 13))
+        rng.shuffle(ranks)
+        submissions += zip(names, ranks)
+
+    return submissions
+
+
+def run(format: int, games: int) -> None:
+    cached = full = 0.0
+    submissions = 0
+
+    for seed in range(games):
+        random.seed(seed)
+        table = GameTable.initialize(format, [f"player{i}" for i in range(12)])
+        game = table._game
+
+        for name, rank in _play(seed):
+            game.add_rank(name, rank)
+            submissions += 1
+
+            start = time.perf_counter()
+            embed = table.embed
+            cached += time.perf_counter() - start
+
+            # A throwaway renderer formats every field, like the embed did before.
+            start = time.perf_counter()
+            reference = GameRenderer(game).embed(table.is_done, ON_GOING_COLOR)
+            full += time.perf_counter() - start
+
+            assert embed.to_dict() == reference.to_dict()
+
+    print(f"{games} games, {submissions} submissions, format {format}")
+    print(f"full rebuild  {full / submissions * 1e6:8.1f} us/submission")
+    print(f"incremental   {cached / submissions * 1e6:8.1f} us/submission")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", type=int, default=2, choices=(1, 2, 3, 4, 6))
+    parser.add_argument("--games", type=int, default=200)
+    args = parser.parse_args()
+    run(args.format, args.games)
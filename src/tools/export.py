@@ -0,0 +1,46 @@
+"""Exports the finished games of the stats store as CSV, JSON lines or Parquet.
+
+Games are streamed from disk in chunks, so memory does not grow with the
+size of the export. Output ending in ``.gz`` is gzipped.
+
+Usage (from ``src``)::
+
+    python -m tools.export [--guild ID] [--format csv|jsonl|parquet] [--since YYYY-MM-DD] [--until YYYY-MM-DD] [-o FILE]
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+
+from components.export import FORMATS, CHUNK_SIZE, export, parse_date
+from components.stats import StatsStore
+from components.utils import DATA_DIR
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--guild", type=int, help="only the games of this guild")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--since", help="only the games on or after this date (UTC)")
+    parser.add_argument("--until", help="only the games on or before this date (UTC)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="games written at once")
+    parser.add_argument("--data", type=Path, default=DATA_DIR / "stats", help="the directory of the stats store")
+    parser.add_argument("-o", "--output", type=Path, help="the file to write, by default stdout")
+    args = parser.parse_args()
+
+    try:
+        since, until = parse_date(args.since), parse_date(args.until, end=True)
+    except ValueError as error:
+        parser.error(str(error))
+
+    records = StatsStore(args.data).games(args.guild, since, until)
+    compress = args.output is not None and args.output.suffix == ".gz"
+
+    if args.output is None:
+        games = export(records, sys.stdout.buffer, args.format, args.chunk_size)
+    else:
+        with args.output.open("wb") as fp:
+            games = export(records, fp, args.format, args.chunk_size, compress)
+
+    print(f"{games} games exported", file=sys.stderr)
@@ -0,0 +1,377 @@
+"""A stand-in for the parts of the Discord API used by the Gather cog and its views.
+
+Nothing leaves the process. Every call that would reach the REST API is
+counted in :attr:`FakeBot.rest` under its route instead.
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import itertools
+
+from discord import Permissions
+from discord.ext import commands
+from discord.utils import MISSING
+
+from components.hooks import EventBus
+from components.journal import JournalStore
+from components.metrics import Metrics
+from components.names import NameDirectory
+from components.responses import ResponseCache
+from components.recorder import pseudonym_name
+from components.settings import SettingsStore
+from components.stats import StatsStore
+
+if TYPE_CHECKING:
+    from discord import Embed
+    from discord.ui import View
+
+
+_ids = itertools.count(1)
+
+
+class FakeUser:
+
+    def __init__(self, id: int, name: str, guild: Optional[FakeGuild] = None, bot: bool = False) -> None:
+        self.id = id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{id}>"
+        self.bot = bot
+        self.guild = guild
+        self.guild_permissions = Permissions.all()
+        self.display_avatar = type("Asset", (), {"url": ""})()
+
+
+class FakeMessage:
+
+    def __init__(
+        self,
+        channel: FakeChannel,
+        author: FakeUser,
+        content: Optional[str] = None,
+        embed: Optional[Embed] = None,
+        view: Optional[View] = None
+    ) -> None:
+        self.id = next(_ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.embeds = [] if embed is None else [embed]
+        self.mentions: list[FakeUser] = []
+        self.created_at = datetime.utcnow()
+        self.edited_at: Optional[datetime] = None
+        self.deleted = False
+        self._state = None
+        self._set_view(view)
+
+
+    def _set_view(self, view: Optional[View]) -> None:
+        self.custom_ids = set() if view is None else {item.custom_id for item in view.children}
+
+
+    async def edit(self, content: Optional[str] = MISSING, embed: Optional[Embed] = MISSING, view: Optional[View] = MISSING, **kwargs: Any) -> FakeMessage:
+        self.channel.bot.rest["PATCH message"] += 1
+        self.edited_at = datetime.utcnow()
+        if content is not MISSING:
+            self.content = content
+        if embed is not MISSING:
+            self.embeds = [] if embed is None else [embed]
+        if view is not MISSING:
+            self._set_view(view)
+        return self
+
+
+    async def delete(self, **kwargs: Any) -> None:
+        self.channel.bot.rest["DELETE message"] += 1
+        self.deleted = True
+
+
+class FakePartialMessage:
+
+    def __init__(self, channel: FakeChannel, id: int) -> None:
+        self.channel = channel
+        self.id = id
+
+
+    def _resolve(self) -> FakeMessage:
+        return self.channel._messages[self.id]
+
+
+    async def edit(self, **kwargs: Any) -> FakeMessage:
+        return await self._resolve().edit(**kwargs)
+
+
+    async def delete(self, **kwargs: Any) -> None:
+        await self._resolve().delete()
+
+
+class FakeChannel:
+
+    def __init__(self, bot: FakeBot, guild: FakeGuild, id: int) -> None:
+        self.bot = bot
+        self.guild = guild
+        self.id = id
+        self.name = f"channel-{id}"
+        self.mention = f"<#{id}>"
+        self._messages: dict[int, FakeMessage] = {}
+
+
+    def _post(
+        self,
+        content: Optional[str] = None,
+        embed: Optional[Embed] = None,
+        view: Optional[View] = None,
+        author: Optional[FakeUser] = None
+    ) -> FakeMessage:
+        message = FakeMessage(self, author or self.bot.user, content, embed, view)
+        self._messages[message.id] = message
+        return message
+
+
+    async def send(self, content: Optional[str] = None, *, embed: Optional[Embed] = None, view: Optional[View] = None, **kwargs: Any) -> FakeMessage:
+        self.bot.rest["POST message"] += 1
+        return self._post(content, embed, view)
+
+
+    async def history(self, limit: Optional[int] = 100, before: Any = None, **kwargs: Any) -> AsyncIterator[FakeMessage]:
+        messages = [m for m in reversed(self._messages.values()) if not m.deleted and (before is None or m.id < before.id)]
+        for i, message in enumerate(messages[:limit]):
+            # One request per page of 100 messages.
+            if i % 100 == 0:
+                self.bot.rest["GET messages"] += 1
+            yield message
+
+
+    async def fetch_message(self, id: int) -> FakeMessage:
+        self.bot.rest["GET message"] += 1
+        return self._messages[id]
+
+
+    def get_partial_message(self, id: int) -> FakePartialMessage:
+        return FakePartialMessage(self, id)
+
+
+    def find(self, custom_id: str) -> Optional[FakeMessage]:
+        """Returns the latest message with a component of ``custom_id``, which is the one people click."""
+
+        return next((m for m in reversed(self._messages.values()) if not m.deleted and custom_id in m.custom_ids), None)
+
+
+class FakeGuild:
+
+    def __init__(self, bot: FakeBot, id: int) -> None:
+        self.bot = bot
+        self.id = id
+        self._channels: dict[int, FakeChannel] = {}
+        self._members: dict[int, FakeUser] = {}
+
+
+    def channel(self, id: int) -> FakeChannel:
+        if (channel := self._channels.get(id)) is None:
+            channel = self._channels[id] = FakeChannel(self.bot, self, id)
+        return channel
+
+
+    def member(self, id: int) -> FakeUser:
+        if (member := self._members.get(id)) is None:
+            member = self._members[id] = FakeUser(id, pseudonym_name(id), self)
+            # Members are indexed as the bot would have seen them before the recording.
+            self.bot.names.touch(member)
+        return member
+
+
+    def get_channel(self, id: int) -> Optional[FakeChannel]:
+        return self._channels.get(id)
+
+
+    def get_member(self, id: int) -> Optional[FakeUser]:
+        return self._members.get(id)
+
+
+    def get_member_named(self, name: str) -> Optional[FakeUser]:
+        return next((m for m in self._members.values() if m.name == name), None)
+
+
+class FakeResponse:
+
+    def __init__(self, interaction: FakeInteraction) -> None:
+        self._interaction = interaction
+        self._done = False
+
+
+    def is_done(self) -> bool:
+        return self._done
+
+
+    async def defer(self, **kwargs: Any) -> None:
+        self._interaction.client.rest["POST interaction"] += 1
+        self._done = True
+
+
+    async def send_message(
+        self,
+        content: Optional[str] = None,
+        *,
+        embed: Optional[Embed] = None,
+        view: Optional[View] = None,
+        ephemeral: bool = False,
+        **kwargs: Any
+    ) -> FakeMessage:
+        self._interaction.client.rest["POST interaction"] += 1
+        self._done = True
+        message = self._interaction.channel._post(content, embed, view)
+        message.deleted = ephemeral
+        return message
+
+
+class FakeFollowup:
+
+    def __init__(self, interaction: FakeInteraction) -> None:
+        self._interaction = interaction
+
+
+    async def send(
+        self,
+        content: Optional[str] = None,
+        *,
+        embed: Optional[Embed] = None,
+        view: Optional[View] = None,
+        ephemeral: bool = False,
+        **kwargs: Any
+    ) -> FakeMessage:
+        self._interaction.client.rest["POST webhook"] += 1
+        message = self._interaction.channel._post(content, embed, view)
+        # Ephemeral messages are never seen by the history of the channel.
+        message.deleted = ephemeral
+        return message
+
+
+class FakeInteraction:
+
+    def __init__(
+        self,
+        client: FakeBot,
+        channel: FakeChannel,
+        user: FakeUser,
+        data: dict[str, Any],
+        message: Optional[FakeMessage] = None,
+        locale: str = "en-US"
+    ) -> None:
+        self.client = client
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild = channel.guild
+        self.guild_id = channel.guild.id
+        self.user = user
+        self.data = data
+        self.message = message
+        self.locale = locale
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+class FakeApplicationContext:
+    """The context of a slash command, answering through its interaction."""
+
+    def __init__(self, interaction: FakeInteraction) -> None:
+        self.interaction = interaction
+        self.bot = interaction.client
+        self.channel = interaction.channel
+        self.channel_id = interaction.channel_id
+        self.guild = interaction.guild
+        self.guild_id = interaction.guild_id
+        self.user = self.author = interaction.user
+        self.locale = interaction.locale
+        self.response = interaction.response
+        self.followup = interaction.followup
+
+
+    async def respond(self, content: Optional[str] = None, **kwargs: Any) -> FakeMessage:
+        if self.response.is_done():
+            return await self.followup.send(content, **kwargs)
+        return await self.response.send_message(content, **kwargs)
+
+
+    async def send(self, content: Optional[str] = None, **kwargs: Any) -> FakeMessage:
+        return await self.channel.send(content, **kwargs)
+
+
+class FakeContext(commands.Context):
+    """The context of a prefix command, sending to the fake channel."""
+
+    async def send(self, content: Optional[str] = None, **kwargs: Any) -> FakeMessage:
+        return await self.channel.send(content, **kwargs)
+
+
+class FakeBot:
+    """Just enough of :class:`QueueBot` to run cogs, with its stores in ``data_dir``.
+
+    Attributes
+    ----------
+    rest : Counter[str]
+        The number of calls to each route of the REST API.
+    """
+
+    def __init__(self, data_dir: Path) -> None:
+        self.rest: Counter[str] = Counter()
+        self.settings = SettingsStore(data_dir / "settings.json")
+        self.stats = StatsStore(data_dir / "stats")
+        self.journals = JournalStore(data_dir / "journal")
+        self.metrics = Metrics()
+        self.names = NameDirectory()
+        self.events = EventBus(self.metrics)
+        self.responses = ResponseCache()
+        self.user = FakeUser(1, "bot", bot=True)
+        self.cogs: dict[str, commands.Cog] = {}
+        self._guilds: dict[int, FakeGuild] = {}
+        self.is_closing = False
+        self._before_invoke = None
+        self._after_invoke = None
+
+
+    def guild(self, id: int) -> FakeGuild:
+        if (guild := self._guilds.get(id)) is None:
+            guild = self._guilds[id] = FakeGuild(self, id)
+        return guild
+
+
+    def get_channel(self, id: int) -> Optional[FakeChannel]:
+        return next((c for g in self._guilds.values() if (c := g.get_channel(id)) is not None), None)
+
+
+    def get_cog(self, name: str) -> Optional[commands.Cog]:
+        return self.cogs.get(name)
+
+
+    def add_cog(self, cog: commands.Cog) -> None:
+        for command in cog.__cog_commands__:
+            command._set_cog(cog)
+        self.cogs[cog.qualified_name] = cog
+        self.responses.clear()
+
+
+    async def dispatch(self, event: str, *args: Any) -> None:
+        """Runs the listeners of ``event`` one after another, so that a replay is deterministic."""
+
+        for cog in self.cogs.values():
+            for name, listener in cog.get_listeners():
+                if name == event:
+                    await listener(*args)
+
+
+    def track(self) -> None:
+        pass
+
+
+    async def can_run(self, ctx: commands.Context, *, call_once: bool = False) -> bool:
+        return True
+
+
+    async def wait_until_ready(self) -> None:
+        # Background loops never start, as there is no gateway to be ready for.
+        await asyncio.Event().wait()
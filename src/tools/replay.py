@@ -0,0 +1,256 @@
+"""Replays traffic recorded by ``cogs.recorder`` against the Gather cog and its views.
+
+Discord is replaced by ``tools.fake``, so nothing is sent anywhere. The
+latency of every event and the REST calls it would have made are
+reported, which makes builds comparable on the same real load.
+
+Usage (from ``src``)::
+
+    python -m tools.replay recording.jsonl [--speed 1|10|max] [--json]
+"""
+
+from __future__ import annotations
+from typing import Any, Optional
+from collections import Counter
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+
+from discord import SlashCommand, SlashCommandGroup
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+from errors import MyError
+from cogs.gather import Gather
+from components.view import GatherView, FormatView, GameView, ResumeView, PlacementView
+from tools.fake import FakeBot, FakeChannel, FakeUser, FakeMessage, FakeContext, FakeInteraction, FakeApplicationContext
+
+
+class Replayer:
+    """Feeds recorded events to a Gather cog running on a :class:`FakeBot`."""
+
+    def __init__(self, bot: FakeBot) -> None:
+        self.bot = bot
+        self.cog = Gather(bot)
+        bot.add_cog(self.cog)
+
+        self.prefix_commands: dict[str, commands.Command] = {}
+        self.slash_commands: dict[str, SlashCommand] = {}
+        for command in self.cog.get_commands():
+            if isinstance(command, commands.Command):
+                for name in (command.name, *command.aliases):
+                    self.prefix_commands[name.lower()] = command
+            else:
+                self._add_slash(command)
+
+        self.views = {
+            item.custom_id: type(view)
+            for view in (GatherView(), FormatView(), GameView(), ResumeView(), PlacementView())
+            for item in view.children
+        }
+
+
+    def _add_slash(self, command: Any) -> None:
+        if isinstance(command, SlashCommandGroup):
+            for subcommand in command.subcommands:
+                self._add_slash(subcommand)
+        elif isinstance(command, SlashCommand):
+            self.slash_commands[command.qualified_name] = command
+
+
+    async def command(self, channel: FakeChannel, user: FakeUser, text: str) -> bool:
+        view = StringView(text)
+        invoked_with = view.get_word()
+        if (command := self.prefix_commands.get(invoked_with.lower())) is None:
+            return False
+
+        message = FakeMessage(channel, user, f"${text}")
+        ctx = FakeContext(message=message, bot=self.bot, view=view, prefix="$", invoked_with=invoked_with, command=command)
+        await self.bot.dispatch("on_command", ctx)
+        try:
+            await command.invoke(ctx)
+        except commands.CommandError as error:
+            # The error handler of the bot replies to the channel.
+            await channel.send(str(error))
+            raise getattr(error, "original", error)
+        return True
+
+
+    async def slash(self, channel: FakeChannel, user: FakeUser, name: str, options: dict[str, Any]) -> bool:
+        if (command := self.slash_commands.get(name)) is None:
+            return False
+
+        interaction = FakeInteraction(self.bot, channel, user, {"name": name, "options": options})
+        ctx = FakeApplicationContext(interaction)
+        kwargs = {option._parameter_name: options.get(option.name, option.default) for option in command.options}
+        await self.bot.dispatch("on_interaction", interaction)
+        try:
+            await command.callback(self.cog, ctx, **kwargs)
+        except MyError:
+            await ctx.respond("error", ephemeral=True)
+            raise
+        return True
+
+
+    async def component(self, channel: FakeChannel, user: FakeUser, custom_id: str, values: list[str]) -> bool:
+        if (cls := self.views.get(custom_id)) is None or (message := channel.find(custom_id)) is None:
+            return False
+
+        view = cls()
+        item = next(i for i in view.children if i.custom_id == custom_id)
+        if values:
+            item._selected_values = values
+
+        interaction = FakeInteraction(self.bot, channel, user, {"custom_id": custom_id, "values": values}, message)
+        await self.bot.dispatch("on_interaction", interaction)
+
+        # The same steps as View._scheduled_task of py-cord.
+        try:
+            if not await view.interaction_check(interaction):
+                await view.on_check_failure(interaction)
+            else:
+                await item.callback(interaction)
+        except Exception as error:
+            await view.on_error(error, item, interaction)
+            raise
+        return True
+
+
+    async def message(self, channel: FakeChannel, user: FakeUser, text: str) -> bool:
+        await self.bot.dispatch("on_message", FakeMessage(channel, user, text))
+        return True
+
+
+    async def feed(self, event: dict[str, Any]) -> bool:
+        """Replays one recorded event. Returns ``False`` if it is not handled by Gather."""
+
+        guild = self.bot.guild(event["g"])
+        channel = guild.channel(event["c"])
+        user = guild.member(event["u"])
+        kind = event["k"]
+
+        if kind == "command":
+            return await self.command(channel, user, event["text"])
+        if kind == "slash":
+            return await self.slash(channel, user, event["name"], event["options"])
+        if kind == "component":
+            return await self.component(channel, user, event["id"], event["values"])
+        if kind == "message":
+            return await self.message(channel, user, event["text"])
+        return False
+
+
+    async def close(self) -> None:
+        # Inputs collapsed by the channel throttle are still on their way.
+        await asyncio.gather(*self.cog._flushes.values())
+        self.cog.cog_unload()
+
+
+def _percentile(values: list[float], p: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[p-1] if len(values) > 1 else values[0]
+
+
+async def run(path: Path, speed: Optional[float]) -> dict[str, Any]:
+    """Replays a recording, waiting between events unless ``speed`` is ``None``.
+
+    Returns
+    -------
+    dict[str, Any]
+        The report of the replay.
+    """
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        bot = FakeBot(Path(data_dir))
+        replayer = Replayer(bot)
+        latencies: dict[str, list[float]] = {}
+        errors: Counter[str] = Counter()
+        skipped = 0
+        lag = 0.0
+        started = time.perf_counter()
+
+        with path.open(encoding="utf-8") as fp:
+            for line in fp:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+
+                if speed is not None:
+                    delay = event["t"] / speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    else:
+                        lag = max(lag, -delay)
+
+                begin = time.perf_counter()
+                try:
+                    handled = await replayer.feed(event)
+                except Exception as error:
+                    errors[type(error).__name__] += 1
+                    handled = True
+
+                if handled:
+                    latencies.setdefault(event["k"], []).append(time.perf_counter() - begin)
+                else:
+                    skipped += 1
+
+        await replayer.close()
+        elapsed = time.perf_counter() - started
+
+    events = sum(map(len, latencies.values()))
+    return {
+        "events": events,
+        "skipped": skipped,
+        "seconds": round(elapsed, 3),
+        "max_lag_ms": round(lag * 1000, 3),
+        "latency_ms": {
+            kind: {
+                "count": len(values),
+                "p50": round(_percentile(values, 50) * 1000, 3),
+                "p95": round(_percentile(values, 95) * 1000, 3),
+                "max": round(max(values) * 1000, 3),
+            }
+            for kind, values in sorted(latencies.items())
+        },
+        "rest": dict(sorted(bot.rest.items())),
+        "rest_per_event": round(sum(bot.rest.values()) / events, 3) if events else 0.0,
+        "errors": dict(errors.most_common()),
+    }
+
+
+def _print(report: dict[str, Any], speed: Optional[float]) -> None:
+    print(f"{report['events']} events in {report['seconds']:.1f} s at {'max' if speed is None else f'{speed:g}x'} speed ({report['skipped']} skipped)")
+    if speed is not None:
+        print(f"max lag behind the recording {report['max_lag_ms']:.1f} ms")
+
+    print(f"\n{'kind':<10}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for kind, s in report["latency_ms"].items():
+        print(f"{kind:<10}{s['count']:>8}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['max']:>10.2f}")
+
+    print(f"\nREST calls {sum(report['rest'].values())} ({report['rest_per_event']:.2f} per event)")
+    for route, count in report["rest"].items():
+        print(f"  {route:<18}{count:>8}")
+
+    if report["errors"]:
+        print("\nerrors")
+        for name, count in report["errors"].items():
+            print(f"  {name:<18}{count:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", type=Path)
+    parser.add_argument("--speed", default="max", help="1, 10, ... or max")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON, e.g. to diff two builds")
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    report = asyncio.run(run(args.recording, speed))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print(report, speed)
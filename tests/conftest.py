@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The bot is run from src, and its modules import each other from there.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
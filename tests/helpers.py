@@ -0,0 +1,31 @@
+import random
+
+from components.game import Game, Team, Player
+from components.rules import DEFAULT_RULES, ScoringRules
+
+
+NAMES = [f"player{i}" for i in range(12)]
+
+
+def ffa(names: list[str] = NAMES, rules: ScoringRules = DEFAULT_RULES) -> Game:
+    """Returns a free-for-all game without races, its players in the order given."""
+
+    return Game([Team([Player(name=name, tag=None, rules=rules)], None) for name in names], rules=rules)
+
+
+def play(game: Game, races: int, seed: int = 0) -> Game:
+    """Adds ``races`` races of shuffled placements to every player."""
+
+    rng = random.Random(seed)
+    names = list(game._players)
+    for _ in range(races):
+        ranks = list(range(1, len(names) + 1))
+        rng.shuffle(ranks)
+        for name, rank in zip(names, ranks):
+            game.add_rank(name, rank)
+    return game
+
+
+def finished(names: list[str] = NAMES, seed: int = 0) -> Game:
+    game = ffa(names)
+    return play(game, game.rules.race_count, seed)
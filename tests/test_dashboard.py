@@ -0,0 +1,55 @@
+import asyncio
+
+from aiohttp import ClientConnectionError, web
+from aiohttp.test_utils import TestClient, TestServer
+
+from components.dashboard import Dashboard
+from components.journal import JournalStore
+
+from tests.helpers import ffa
+
+
+def test_listens_on_loopback_by_default(tmp_path):
+    assert Dashboard(JournalStore(tmp_path)).host == "127.0.0.1"
+
+
+def test_viewers_gone_while_writing_are_released(tmp_path, monkeypatch):
+    journals = JournalStore(tmp_path)
+    journals[10].start(1, ffa())
+    dashboard = Dashboard(journals)
+
+    write = web.StreamResponse.write
+    async def gone(self, data):
+        if data.startswith(b"id:"):
+            raise ClientConnectionError("Cannot write to closing transport")
+        await write(self, data)
+    monkeypatch.setattr(web.StreamResponse, "write", gone)
+
+    async def main():
+        async with TestClient(TestServer(dashboard.app)) as client:
+            response = await client.get("/games/10/events")
+            assert response.status == 200
+            await response.read()
+        assert dashboard._feeds == {}
+
+    asyncio.run(main())
+
+
+def test_viewers_gone_before_the_stream_starts_leave_no_feed(tmp_path, monkeypatch):
+    journals = JournalStore(tmp_path)
+    journals[10].start(1, ffa())
+    dashboard = Dashboard(journals)
+
+    async def gone(self, request):
+        raise ConnectionResetError
+    monkeypatch.setattr(web.StreamResponse, "prepare", gone)
+
+    async def main():
+        async with TestClient(TestServer(dashboard.app)) as client:
+            try:
+                await (await client.get("/games/10/events")).read()
+            except ClientConnectionError:
+                pass
+        assert dashboard._feeds == {}
+
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+from components.expiry import TimerWheel, IdleTracker
+
+
+def test_fires_at_deadline():
+    wheel = TimerWheel(30)
+    wheel.advance(0)
+    wheel.schedule("a", 100)
+
+    assert wheel.advance(90) == []
+    assert wheel.advance(120) == ["a"]
+    assert "a" not in wheel
+
+
+def test_reschedule_later_moves_key():
+    wheel = TimerWheel(30)
+    wheel.advance(0)
+    wheel.schedule("a", 100)
+    wheel.schedule("a", 400)
+
+    assert wheel.advance(120) == []
+    assert wheel.advance(420) == ["a"]
+
+
+def test_cancel():
+    wheel = TimerWheel(30)
+    wheel.advance(0)
+    wheel.schedule("a", 100)
+    wheel.cancel("a")
+
+    assert wheel.advance(200) == []
+    assert len(wheel) == 0
+
+
+def test_overdue_before_first_advance():
+    now = 1_000_000.0
+    wheel = TimerWheel(30)
+    wheel.schedule("a", now - 600)
+    wheel.schedule("b", now - 10 * 3600)
+    wheel.schedule("c", now + 60)
+
+    assert sorted(wheel.advance(now)) == ["a", "b"]
+    assert wheel.advance(now + 90) == ["c"]
+
+
+def test_overdue_after_long_pause():
+    wheel = TimerWheel(30, slots=8)
+    wheel.advance(0)
+    wheel.schedule("a", 60)
+
+    assert wheel.advance(10_000) == ["a"]
+
+
+def test_restored_table_is_reminded_before_closing():
+    now = 1_000_000.0
+    idle = IdleTracker({"game": 3600}, remind_before=300, tick=30)
+    idle.touch(1, "game", now - 7200)
+
+    assert idle.advance(now) == [(1, "game", True)]
+    assert idle.advance(now + 30) == []
+    assert idle.advance(now + 330) == [(1, "game", False)]
+    assert len(idle) == 0
@@ -0,0 +1,78 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from components.export import export, parse_date, pa
+from components.stats import GameRecord
+
+
+def records(n: int) -> list[GameRecord]:
+    return [
+        GameRecord(
+            game_id=i,
+            guild_id=1,
+            channel_id=10,
+            finished_at=86400.0 * i,
+            format=1,
+            rows=[("あ", None, True, [1, 2], [15, 12]), ("b", "A", False, [2, 1], [12, 15])]
+        )
+        for i in range(n)
+    ]
+
+
+def test_csv_spans_chunks():
+    fp = io.BytesIO()
+    assert export(records(5), fp, "csv", chunk_size=2) == 5
+
+    rows = list(csv.reader(io.StringIO(fp.getvalue().decode())))
+    assert rows[0][:3] == ["game_id", "finished_at", "channel_id"]
+    assert len(rows) == 1 + 5 * 2
+    assert rows[1] == ["0", "1970-01-01T00:00:00+00:00", "10", "1", "あ", "", "True", "27", "1-2", "15-12"]
+    assert not fp.closed
+
+
+def test_jsonl_nests_players():
+    fp = io.BytesIO()
+    assert export(records(3), fp, "jsonl", chunk_size=2) == 3
+
+    lines = [json.loads(line) for line in fp.getvalue().decode().splitlines()]
+    assert [line["game_id"] for line in lines] == [0, 1, 2]
+    assert lines[1]["finished_at"] == "1970-01-02T00:00:00+00:00"
+    assert lines[0]["players"][1] == {"name": "b", "tag": "A", "won": False, "total": 27, "placements": [2, 1], "points": [12, 15]}
+
+
+def test_compressed():
+    plain, compressed = io.BytesIO(), io.BytesIO()
+    export(records(3), plain, "jsonl")
+    export(records(3), compressed, "jsonl", compress=True)
+
+    assert gzip.decompress(compressed.getvalue()) == plain.getvalue()
+
+
+def test_empty():
+    fp = io.BytesIO()
+    assert export([], fp, "csv") == 0
+    assert fp.getvalue().decode().strip().startswith("game_id")
+
+
+@pytest.mark.skipif(pa is None, reason="pyarrow is not installed")
+def test_parquet_row_groups():
+    import pyarrow.parquet as pq
+
+    fp = io.BytesIO()
+    assert export(records(5), fp, "parquet", chunk_size=2) == 5
+    fp.seek(0)
+    file = pq.ParquetFile(fp)
+    assert file.num_row_groups == 3
+    assert file.read().column("placements").to_pylist()[:2] == [[1, 2], [2, 1]]
+
+
+def test_parse_date():
+    assert parse_date(None) is None
+    assert parse_date("1970-01-02") == 86400
+    assert parse_date("1970-01-02", end=True) == 2 * 86400
+    with pytest.raises(ValueError):
+        parse_date("yesterday")
@@ -0,0 +1,95 @@
+import pytest
+
+from components.game import Game, Team, Player
+from errors import RankConflict, InvalidRaceNumber, AlreadyFinished
+
+from tests.helpers import NAMES, ffa, play
+
+
+def state(game):
+    return game.to_dict(), game._race_sums, game._occupancy, game._conflicts
+
+
+def test_ranks_update_points_and_occupancy():
+    game = ffa()
+    game.add_rank(NAMES[0], 1)
+    game.add_rank(NAMES[1], "2")
+
+    assert game.get_player(NAMES[0]).placements == [1]
+    assert game.get_player(NAMES[1]).total_point == game.rules.points[2]
+    assert game._occupancy[0] == 0b11
+    assert game.race_count == 1
+
+
+def test_loose_conflicts_are_kept_and_cleared():
+    game = ffa()
+    game.add_rank(NAMES[0], 1)
+    game.add_rank(NAMES[1], 1)
+    assert game.conflicts == [(1, 1)]
+
+    game.edit_rank(NAMES[1], 2)
+    assert game.conflicts == []
+    assert game._occupancy[0] == 0b11
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda game: game.add_rank(NAMES[1], 1),
+    lambda game: game.add_rank(NAMES[1], 1, 1),
+    lambda game: game.edit_rank(NAMES[2], 1, 0),
+])
+def test_strict_conflicts_roll_back(mutate):
+    game = ffa()
+    game.add_rank(NAMES[0], 1)
+    game.add_rank(NAMES[2], 3)
+    game.strict = True
+    before = state(game)
+
+    with pytest.raises(RankConflict):
+        mutate(game)
+    assert state(game) == before
+
+
+def test_insert_and_remove_shift_later_races():
+    game = ffa()
+    for rank in (1, 2, 3):
+        game.add_rank(NAMES[0], rank)
+    game.add_rank(NAMES[1], 4, 2)
+
+    game.add_rank(NAMES[0], 5, 2)
+    assert game.get_player(NAMES[0]).placements == [1, 5, 2, 3]
+    game.remove_rank(NAMES[0], 1)
+    assert game.get_player(NAMES[0]).placements == [1, 2, 3]
+    assert state(game)[1:] == state(Game.from_dict(game.to_dict()))[1:]
+
+
+def test_invalid_mutations():
+    game = ffa()
+    with pytest.raises(InvalidRaceNumber):
+        game.remove_rank(NAMES[0])
+    play(game, game.rules.race_count)
+    with pytest.raises(AlreadyFinished):
+        game.add_rank(NAMES[0], 1)
+    assert game.is_done
+
+
+def test_copy_is_independent():
+    game = play(ffa(), 3)
+    copy = game.copy()
+    game.remove_rank(NAMES[0])
+
+    assert len(copy.get_player(NAMES[0]).placements) == 3
+    assert state(copy)[1:] != state(game)[1:]
+
+
+def test_team_race_scores():
+    teams = [
+        Team([Player(name=f"{tag}{i}", tag=tag) for i in range(2)], tag)
+        for tag in "ABCDEF"
+    ]
+    game = Game(teams)
+    for rank, name in enumerate(["A0", "A1", "B0", "B1", "C0", "C1", "D0", "D1", "E0", "E1", "F0", "F1"], 1):
+        game.add_rank(name, rank)
+
+    points = game.rules.points
+    assert game.race_scores(teams[0]) == [points[1] + points[2]]
+    assert game.running_diffs() == [points[1] + points[2] - points[3] - points[4]]
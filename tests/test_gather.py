@@ -0,0 +1,261 @@
+import asyncio
+import time
+
+import pytest
+from discord import Permissions
+
+from cogs.gather import POOL_IDLE
+from components.table import FormatTable, GameTable, PlacementTable
+from components.view import GameView, PlacementView
+from components.utils import get_name
+from errors import ArchivedTable, NotFoundError, NotYourChange
+from tools.fake import FakeBot, FakeFollowup, FakeResponse
+from tools.replay import Replayer
+
+from tests.helpers import finished
+
+
+def run(tmp_path, scenario):
+    """Runs ``scenario`` with a Gather cog on a fake bot storing its data in ``tmp_path``."""
+
+    async def main():
+        replayer = Replayer(FakeBot(tmp_path))
+        try:
+            await scenario(replayer)
+        finally:
+            await replayer.close()
+
+    asyncio.run(main())
+
+
+def members(replayer, n=12):
+    guild = replayer.bot.guild(1)
+    return [guild.member(100 + i) for i in range(n)]
+
+
+async def fill(replayer, users):
+    """Gathers the players in channel 10 and returns the channel once the vote has opened."""
+
+    channel = replayer.bot.guild(1).channel(10)
+    await replayer.command(channel, users[0], "start")
+    for user in users:
+        await replayer.component(channel, user, "gather_join_button", [])
+    return channel
+
+
+def test_failed_start_can_be_retried(tmp_path, monkeypatch):
+
+    async def scenario(replayer):
+        users = members(replayer)
+        channel = await fill(replayer, users)
+        for user in users[:-1]:
+            await replayer.component(channel, user, "format_select", ["2"])
+
+        send = FakeFollowup.send
+        async def fail(self, *args, **kwargs):
+            raise RuntimeError("network")
+        monkeypatch.setattr(FakeFollowup, "send", fail)
+
+        with pytest.raises(RuntimeError):
+            await replayer.component(channel, users[-1], "format_select", ["2"])
+        table = replayer.cog._live_table(FormatTable, channel.find("format_start_button"))
+        assert not table.is_done
+        assert replayer.bot.journals[channel.id].game is None
+
+        monkeypatch.setattr(FakeFollowup, "send", send)
+        await replayer.component(channel, users[-1], "format_start_button", [])
+        assert replayer.bot.journals[channel.id].game.format == 2
+        # The vote is closed.
+        assert not await replayer.component(channel, users[0], "format_start_button", [])
+
+    run(tmp_path, scenario)
+
+
+def test_restored_tables_publish_nothing(tmp_path):
+
+    async def scenario(replayer):
+        published = []
+        replayer.bot.events.publish = published.append
+        channel = replayer.bot.guild(1).channel(10)
+        channel._post(embed=GameTable(finished(), is_done=True).embed)
+
+        table = await replayer.cog._fetch_game(channel, allow_archived=True)
+        assert table.is_done
+        assert replayer.bot.journals[channel.id].is_done
+        assert published == []
+
+        users = members(replayer)
+        channel = await fill(replayer, users)
+        for user in users:
+            await replayer.component(channel, user, "format_select", ["1"])
+        assert [type(event).__name__ for event in published] == ["GatherFilled", "FormatChosen"]
+
+    run(tmp_path, scenario)
+
+
+def test_pooled_players_are_mentioned_when_a_room_opens(tmp_path):
+
+    async def scenario(replayer):
+        users = members(replayer, 24)
+        channel = await fill(replayer, users[:12])
+        for user in users[12:]:
+            await replayer.command(channel, user, "can")
+
+        room = channel.find("format_select")
+        assert room.content == " ".join(f"<@{user.id}>" for user in users[12:])
+        assert len(replayer.cog._pool(channel.guild)) == 0
+        assert replayer.cog._pooled == {}
+
+    run(tmp_path, scenario)
+
+
+def test_joining_a_table_leaves_the_pool(tmp_path):
+
+    async def scenario(replayer):
+        users = members(replayer, 13)
+        await fill(replayer, users[:12])
+        channel = replayer.bot.guild(1).channel(10)
+        await replayer.command(channel, users[12], "can")
+        pool = replayer.cog._pool(channel.guild)
+        assert get_name(users[12]) in pool
+
+        other = replayer.bot.guild(1).channel(11)
+        await replayer.command(other, users[0], "start")
+        await replayer.command(other, users[12], "can")
+        assert get_name(users[12]) not in pool
+
+    run(tmp_path, scenario)
+
+
+def test_idle_pool_players_are_removed(tmp_path):
+
+    async def scenario(replayer):
+        users = members(replayer, 14)
+        channel = await fill(replayer, users[:12])
+        for user in users[12:]:
+            await replayer.command(channel, user, "can")
+
+        due = replayer.cog.idle.advance(time.time() + POOL_IDLE)
+        assert (channel.id, "pool", True) in due
+        await replayer.cog._expire(channel.id, "pool", True)
+        assert f"<@{users[12].id}>" in list(channel._messages.values())[-1].content
+
+        due = replayer.cog.idle.advance(time.time() + POOL_IDLE + 3600)
+        assert (channel.id, "pool", False) in due
+        await replayer.cog._expire(channel.id, "pool", False)
+        assert len(replayer.cog._pool(channel.guild)) == 0
+
+    run(tmp_path, scenario)
+
+
+def test_placements_are_confirmed_once(tmp_path, monkeypatch):
+    defer = FakeResponse.defer
+    async def slow_defer(self, **kwargs):
+        # Lets the other confirmation run meanwhile, as a real request would.
+        await asyncio.sleep(0)
+        await defer(self, **kwargs)
+    monkeypatch.setattr(FakeResponse, "defer", slow_defer)
+
+    async def scenario(replayer):
+        users = members(replayer)
+        channel = await fill(replayer, users)
+        for user in users:
+            await replayer.component(channel, user, "format_select", ["1"])
+        names = [get_name(user) for user in users]
+        channel._post(embed=PlacementTable(1, {name: i + 1 for i, name in enumerate(names)}, []).embed, view=PlacementView())
+        # The refreshes of the vote have used up the tokens of the channel.
+        replayer.cog.channel_throttle._buckets.clear()
+
+        results = await asyncio.gather(
+            replayer.component(channel, users[0], "placement_confirm_button", []),
+            replayer.component(channel, users[1], "placement_confirm_button", []),
+            return_exceptions=True
+        )
+        assert [type(r).__name__ for r in results] == ["bool", "ArchivedTable"]
+        game = replayer.bot.journals[channel.id].game
+        assert [game.get_player(name).placements for name in names[:2]] == [[1], [2]]
+        assert sum(e.type == "add" for e in replayer.bot.journals[channel.id].events) == 12
+
+    run(tmp_path, scenario)
+
+
+def test_only_the_actor_or_an_admin_can_undo(tmp_path):
+
+    async def scenario(replayer):
+        users = members(replayer)
+        channel = await fill(replayer, users)
+        for user in users:
+            await replayer.component(channel, user, "format_select", ["1"])
+        journal = replayer.bot.journals[channel.id]
+        journal.apply("add", users[0].id, name=get_name(users[0]), rank=1, race=None)
+        for user in users[:2]:
+            user.guild_permissions = Permissions.none()
+
+        with pytest.raises(NotYourChange):
+            await replayer.cog._undo(channel, users[1])
+        await replayer.cog._undo(channel, users[0])
+        with pytest.raises(NotYourChange):
+            await replayer.cog._undo(channel, users[1], redo=True)
+
+        # An admin may revert anyone's change.
+        await replayer.cog._undo(channel, users[2], redo=True)
+        await replayer.cog._undo(channel, users[2])
+        assert not journal.can_undo
+
+    run(tmp_path, scenario)
+
+
+def test_games_are_read_with_the_rules_they_started_with(tmp_path):
+
+    async def scenario(replayer):
+        users = members(replayer)
+        channel = await fill(replayer, users)
+        for user in users:
+            await replayer.component(channel, user, "format_select", ["1"])
+        journal = replayer.bot.journals[channel.id]
+        replayer.bot.settings.update(channel.guild.id, room_size=8, points=[15, 12, 10, 8, 6, 4, 2, 1], formats=[1, 2, 4])
+
+        assert replayer.cog._rules(channel) is journal.game.rules
+        # Read back from the message once the journal is stale.
+        table = await replayer.cog._fetch_game(channel, max_age=0)
+        assert table._game.rules.room_size == 12
+
+    run(tmp_path, scenario)
+
+
+def test_end_and_resume_only_act_on_the_current_table(tmp_path):
+
+    async def scenario(replayer):
+        users = members(replayer)
+        channel = await fill(replayer, users)
+        for user in users:
+            await replayer.component(channel, user, "format_select", ["1"])
+        journal = replayer.bot.journals[channel.id]
+
+        stale = channel._post(embed=GameTable(finished()).embed, view=GameView())
+        with pytest.raises(ArchivedTable):
+            await replayer.component(channel, users[0], "game_finish_button", [])
+        assert not journal.is_done
+
+        stale.deleted = True
+        await replayer.component(channel, users[0], "game_finish_button", [])
+        assert journal.is_done
+        await replayer.component(channel, users[0], "resume_button", [])
+        assert not journal.is_done
+
+    run(tmp_path, scenario)
+
+
+def test_members_the_index_has_not_seen_are_resolved_by_name(tmp_path):
+
+    async def scenario(replayer):
+        guild = replayer.bot.guild(1)
+        member = guild.member(100)
+        replayer.bot.names[guild.id].remove(member.id)
+
+        assert replayer.cog._resolve_member(guild, member.name) is member
+        assert replayer.cog._resolve_member(guild, member.mention) is member
+        with pytest.raises(NotFoundError):
+            replayer.cog._resolve_member(guild, "nobody")
+
+    run(tmp_path, scenario)
@@ -0,0 +1,143 @@
+import json
+
+from components import journal as journal_module
+from components.journal import GameJournal, JournalStore
+
+from tests.helpers import NAMES, ffa
+
+
+def placements(game):
+    return game.get_player(NAMES[0]).placements
+
+
+def test_mutations_are_replayed(tmp_path):
+    path = tmp_path / "1.jsonl"
+    journal = GameJournal(path)
+    journal.start(1, ffa(), message_id=5)
+    journal.apply("add", 1, name=NAMES[0], rank=1, race=None)
+    journal.apply("add", 1, name=NAMES[0], rank=2, race=None)
+    journal.apply("edit", 1, name=NAMES[0], rank=3, index=-1)
+    journal.apply("back", 1, name=NAMES[0], index=0)
+
+    replayed = GameJournal(path)
+    assert placements(replayed.game) == placements(journal.game) == [3]
+    assert replayed.message_id == 5
+    assert replayed.started_at == journal.started_at
+
+
+def test_undo_and_redo(tmp_path):
+    path = tmp_path / "1.jsonl"
+    journal = GameJournal(path)
+    journal.start(1, ffa())
+    for rank in (1, 2, 3):
+        journal.apply("add", 1, name=NAMES[0], rank=rank, race=None)
+
+    journal.undo(1)
+    journal.undo(1)
+    assert placements(journal.game) == [1]
+    journal.redo(1)
+    assert placements(journal.game) == [1, 2]
+
+    # A new mutation discards what was undone.
+    journal.apply("add", 1, name=NAMES[0], rank=4, race=None)
+    assert not journal.can_redo
+    assert placements(GameJournal(path).game) == [1, 2, 4]
+
+
+def test_undo_across_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "SNAPSHOT_INTERVAL", 4)
+    path = tmp_path / "1.jsonl"
+    journal = GameJournal(path)
+    journal.start(1, ffa())
+    for rank in range(1, 11):
+        journal.apply("add", 1, name=NAMES[0], rank=rank, race=None)
+
+    assert sorted(journal._snapshots) == [0, 4, 8]
+    for _ in range(7):
+        journal.undo(1)
+    assert placements(journal.game) == [1, 2, 3]
+    assert placements(GameJournal(path).game) == [1, 2, 3]
+
+
+def test_rejected_mutations_are_not_recorded(tmp_path):
+    path = tmp_path / "1.jsonl"
+    journal = GameJournal(path)
+    journal.start(1, ffa())
+    try:
+        journal.apply("back", 1, name=NAMES[0], index=-1)
+    except Exception:
+        pass
+
+    assert not journal.can_undo
+    assert [e.type for e in GameJournal(path).events] == ["start"]
+
+
+def test_start_archives_previous_game_but_keeps_its_gather(tmp_path):
+    store = JournalStore(tmp_path)
+    journal = store[1]
+    journal.start(1, ffa())
+    journal.set_done(1, True)
+    journal.record("gather", 1)
+    journal.record("join", 2)
+    journal.start(1, ffa())
+
+    assert len(list((tmp_path / "archive").iterdir())) == 1
+    assert [e.type for e in store[1].events] == ["gather", "join", "start"]
+    store.evict(1)
+    assert [e.type for e in store[1].events] == ["gather", "join", "start"]
+    assert not store[1].is_done
+
+
+def test_compaction_keeps_the_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal_module, "SNAPSHOT_INTERVAL", 4)
+    path = tmp_path / "1.jsonl"
+    journal = GameJournal(path)
+    journal.record("gather", 1)
+    journal.record("join", 2)
+    journal.record("gather", 1)
+    journal.record("join", 3)
+    journal.start(1, ffa(), message_id=5)
+    for rank in range(1, 4):
+        journal.apply("add", 1, name=NAMES[0], rank=rank, race=None)
+        journal.undo(1)
+        journal.redo(1)
+    journal.undo(1)
+    # The fourth mutation takes a snapshot, which compacts the journal.
+    for rank in range(4, 10):
+        journal.apply("add", 2, name=NAMES[0], rank=rank, race=None)
+    journal.undo(2)
+    journal.apply("add", 2, name=NAMES[0], rank=10, race=None)
+    journal.undo(2)
+
+    lines = path.read_text().splitlines()
+    types = [json.loads(line)["t"] for line in lines]
+    assert types.count("join") == 1
+    assert types.count("redo") == 0
+
+    replayed = GameJournal(path)
+    assert placements(replayed.game) == placements(journal.game) == [1, 2, 4, 5, 6, 7, 8]
+    assert replayed.started_at == journal.started_at
+    assert replayed.message_id == 5
+    assert replayed.undoable.actor == 2
+    assert replayed.redoable.data["rank"] == 10
+    for _ in range(7):
+        replayed.undo(1)
+    assert placements(replayed.game) == []
+
+
+def test_unreadable_journals_are_quarantined_where_first_read(tmp_path):
+    store = JournalStore(tmp_path)
+    store[1].start(1, ffa())
+    store.evict(1)
+    with (tmp_path / "1.jsonl").open("a") as fp:
+        fp.write('{"t": "add", "a": 1, "ts": 1.0, "na')
+
+    assert store[1].game is None
+    assert not (tmp_path / "1.jsonl").exists()
+
+    # Quarantined twice within a second, both are kept.
+    store[1].start(1, ffa())
+    store.evict(1)
+    (tmp_path / "1.jsonl").write_text("{")
+    assert store[1].game is None
+    assert len(list((tmp_path / "archive").iterdir())) == 2
@@ -0,0 +1,36 @@
+from components.pool import MatchmakingPool
+
+
+def test_room_takes_the_longest_waiting():
+    pool = MatchmakingPool(size=3)
+    for i in range(5):
+        assert pool.join(f"p{i}", i)
+    assert not pool.join("p0", 9)
+
+    assert pool.pop_room() == [("p0", 0), ("p1", 1), ("p2", 2)]
+    assert pool.pop_room() is None
+    assert pool.waiting() == [("p3", 3), ("p4", 4)]
+
+
+def test_leaving_skips_stale_entries():
+    pool = MatchmakingPool(size=2)
+    for name in ("a", "b", "c"):
+        pool.join(name, 1)
+    assert pool.leave("a")
+    assert not pool.leave("a")
+    # Rejoining goes to the back of the queue.
+    pool.join("a", 2)
+
+    assert len(pool) == 3
+    assert pool.pop_room() == [("b", 1), ("c", 1)]
+    assert "a" in pool
+
+
+def test_heap_is_compacted():
+    pool = MatchmakingPool(size=2)
+    for i in range(100):
+        pool.join("x", 1)
+        pool.leave("x")
+
+    assert len(pool._heap) <= pool.size + 1
+    assert pool.waiting() == []
@@ -0,0 +1,32 @@
+import asyncio
+import tracemalloc
+
+from components.profiler import MemoryTracer
+
+
+def test_diff_without_a_baseline():
+    # As with PYTHONTRACEMALLOC, tracing is already on when the tracer is first used.
+    tracemalloc.start()
+    try:
+        tracer = MemoryTracer()
+        assert tracer.is_running
+        report = asyncio.run(tracer.diff())
+        assert report.startswith("current=")
+        assert tracer.started_at is not None
+    finally:
+        tracemalloc.stop()
+
+
+def test_start_diff_and_stop():
+
+    async def main():
+        tracer = MemoryTracer()
+        await tracer.start()
+        kept = [bytearray(1024) for _ in range(100)]
+        report = await tracer.diff()
+        assert "test_profiler.py" in report
+        await tracer.stop()
+        return kept
+
+    asyncio.run(main())
+    assert not tracemalloc.is_tracing()
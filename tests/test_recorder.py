@@ -0,0 +1,26 @@
+from components.recorder import TrafficRecorder, pseudonym_name
+from tools.fake import FakeBot
+
+
+def test_names_with_spaces_are_pseudonymised(tmp_path):
+    guild = FakeBot(tmp_path).guild(1)
+    alice, bob, al = guild.member(100), guild.member(101), guild.member(102)
+    alice.name, bob.name, al.name = "Alice in Chains", "Bob", "Alice"
+    recorder = TrafficRecorder(tmp_path / "traffic.jsonl")
+
+    text = recorder.text(guild, "ffa Alice in Chains  Bob Alice <@123456789012345678>")
+    recorder.close()
+
+    words = text.split(" ")
+    assert "Chains" not in words and "Bob" not in words and "Alice" not in words
+    assert words[:3] == ["ffa", pseudonym_name(recorder.user(alice.id)), ""]
+    assert words[3:5] == [pseudonym_name(recorder.user(bob.id)), pseudonym_name(recorder.user(al.id))]
+    assert words[5] == f"<@{recorder.user(123456789012345678)}>"
+
+
+def test_bare_ids_are_pseudonymised(tmp_path):
+    recorder = TrafficRecorder(tmp_path / "traffic.jsonl")
+    text = recorder.text(None, "can 123456789012345678 <@!223456789012345678> 12")
+    recorder.close()
+
+    assert text == f"can {recorder.user(123456789012345678)} <@{recorder.user(223456789012345678)}> 12"
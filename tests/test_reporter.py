@@ -0,0 +1,53 @@
+import asyncio
+
+from discord import Embed
+
+from components.reporter import ErrorReporter
+
+
+def raise_error(n: int) -> BaseException:
+    try:
+        if n:
+            raise ValueError(n)
+        raise KeyError(n)
+    except Exception as error:
+        return error
+
+
+class Channel:
+
+    def __init__(self, fail: int = 0) -> None:
+        self.sent = []
+        self.fail = fail
+
+    async def send(self, content=None, **kwargs):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("rate limited")
+        self.sent.append(content or kwargs["embed"].title)
+
+
+def test_every_occurrence_is_logged_but_posted_once(tmp_path):
+    reporter = ErrorReporter(tmp_path / "errors.log")
+    for n in (1, 2, 3):
+        reporter.report(raise_error(n), Embed(title="ValueError"))
+    channel = Channel()
+    asyncio.run(reporter.flush(channel))
+    reporter.close()
+
+    log = (tmp_path / "errors.log").read_text(encoding="utf-8")
+    assert [f"ValueError: {n}" in log for n in (1, 2, 3)] == [True, True, True]
+    assert channel.sent == ["ValueError"]
+
+
+def test_failed_post_does_not_drop_the_others(tmp_path):
+    reporter = ErrorReporter(tmp_path / "errors.log", max_posts=1)
+    reporter.report(raise_error(1), Embed(title="ValueError"))
+    reporter.report(raise_error(1), Embed(title="ValueError"))
+    reporter.report(raise_error(0), Embed(title="KeyError"))
+    channel = Channel(fail=1)
+    asyncio.run(reporter.flush(channel))
+    reporter.close()
+
+    assert channel.sent == ["1 more distinct errors:\n`%s` KeyError x1" % ErrorReporter.fingerprint(raise_error(0))]
+    assert "could not be posted" in (tmp_path / "errors.log").read_text(encoding="utf-8")
@@ -0,0 +1,35 @@
+from components.responses import ResponseCache, build_help
+
+
+class Cog:
+    """The attributes of a cog that help pages read."""
+
+    def __init__(self, description: str, is_public: bool = True) -> None:
+        self.description = description
+        self.description_localizations = {"ja": description + "（日本語）"}
+        self.is_public = is_public
+
+    def walk_commands(self):
+        return iter(())
+
+
+def test_build_help_skips_private_cogs():
+    pages = build_help([Cog("Gather"), Cog("Admin", is_public=False)], "ja", "$")
+    assert [page.title for page in pages] == ["Gather（日本語）"]
+    assert build_help([Cog("Gather")], "en-US", "$")[0].title == "Gather"
+
+
+def test_cache_is_shared_until_cleared():
+    cache = ResponseCache()
+    cogs = [Cog("Gather")]
+    cache.build(cogs, "$")
+
+    first = cache.help(cogs, "ja", "$")
+    assert cache.help([], "ja", "$") is first
+    # Other prefixes and locales are built on first use.
+    assert cache.help([], "ja", "!") == ()
+    assert len(cache.help(cogs, "fr", "$")) == 1
+
+    cache.clear()
+    cogs.append(Cog("Stats"))
+    assert len(cache.help(cogs, "ja", "$")) == 2
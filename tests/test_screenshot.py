@@ -0,0 +1,36 @@
+from components.screenshot import match_rows
+
+from tests.helpers import NAMES
+
+
+def rows(lines):
+    """Rows as read from a result screen, 40 pixels apart."""
+
+    return [(rank, words, 100 + 40 * i) for i, (rank, words) in enumerate(lines)]
+
+
+def test_exact_names():
+    placements = match_rows(rows([(i + 1, [name, "15"]) for i, name in enumerate(NAMES)]), NAMES, 12)
+    assert placements == {name: i + 1 for i, name in enumerate(NAMES)}
+
+
+def test_noisy_names_and_missing_ranks():
+    names = ["Mario Kart", "Luigi", "Peach"]
+    lines = [(1, ["Luig1", "60"]), (None, ["MARIO", "KART", "45"]), (3, ["Peoch", "40"])]
+
+    assert match_rows(rows(lines), names, 12) == {"Luigi": 1, "Mario Kart": 2, "Peach": 3}
+
+
+def test_each_rank_and_name_is_used_once():
+    names = ["Luigi", "Luigi2"]
+    lines = [(1, ["Luigi"]), (2, ["Luigi"])]
+
+    placements = match_rows(rows(lines), names, 12)
+    assert sorted(placements.values()) == [1, 2]
+
+
+def test_unrelated_text_is_ignored():
+    lines = [(1, ["RESULTS"]), (2, ["zzzzzz"])]
+    assert match_rows(rows(lines), ["Luigi"], 12) == {}
+    # Ranks beyond the room are not assigned.
+    assert match_rows(rows([(13, ["Luigi"])]), ["Luigi"], 12) == {"Luigi": 1}
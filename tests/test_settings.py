@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from components.settings import DEFAULT, GuildSettings, SettingsStore
+from errors import InvalidSetting
+
+
+def test_room_size_round_trip(tmp_path):
+    store = SettingsStore(tmp_path / "settings.json")
+    small = store.update(1, room_size=8)
+    assert small.points == (15, 12, 10, 9, 8, 7, 6, 5)
+    assert small.formats == (1, 2, 4)
+
+    assert store.update(1, room_size=12) == DEFAULT
+    assert json.loads((tmp_path / "settings.json").read_text()) == {}
+
+
+def test_reset_room_size_restores_points_and_formats(tmp_path):
+    store = SettingsStore(tmp_path / "settings.json")
+    store.update(1, room_size=8, race_count=8)
+
+    settings = store.reset(1, "room_size")
+    assert (settings.room_size, settings.points, settings.formats) == (DEFAULT.room_size, DEFAULT.points, DEFAULT.formats)
+    assert settings.race_count == 8
+    assert SettingsStore(tmp_path / "settings.json").get(1) == settings
+
+
+def test_points_fit_the_stats_store():
+    with pytest.raises(InvalidSetting):
+        DEFAULT.replace(points=(70000,) + DEFAULT.points[1:])
+    assert DEFAULT.replace(points=(65535,) + DEFAULT.points[1:]).points[0] == 65535
+
+
+def test_parse():
+    assert GuildSettings.parse("formats", "FFA, 2v2") == (1, 2)
+    with pytest.raises(InvalidSetting):
+        GuildSettings.parse("room_size", "many")
@@ -0,0 +1,185 @@
+import asyncio
+import struct
+
+import pytest
+
+from components.stats import StatsStore, _GAME_V1
+
+from tests.helpers import NAMES, finished
+
+
+def games(store, guild_id=1):
+    return list(store.games(guild_id))
+
+
+def test_record_and_summary(tmp_path):
+    store = StatsStore(tmp_path)
+    game = finished()
+
+    assert store.record(1, 10, game, finished_at=1000.0, started_at=100.0)
+
+    player = game.get_player(NAMES[0])
+    summary = store.summary(1, NAMES[0])
+    assert summary.games == 1
+    assert summary.races == 12
+    assert summary.placement_sum == sum(player.placements)
+    assert summary.points_sum == player.total_point
+    assert store.summary(2, NAMES[0]) is None
+    assert sum(store.histogram(1, NAMES[0])) == 12
+
+
+def test_identical_record_is_skipped(tmp_path):
+    store = StatsStore(tmp_path)
+    game = finished()
+
+    assert store.record(1, 10, game, 1000.0, 100.0)
+    assert not store.record(1, 10, game.copy(), 1010.0, 100.0)
+    assert len(games(store)) == 1
+
+
+def test_correction_replaces_earlier_record(tmp_path):
+    store = StatsStore(tmp_path)
+    game = finished()
+    store.record(1, 10, game, 1000.0, 100.0)
+
+    # "back" and a different rank after the last race, an hour later.
+    name = NAMES[0]
+    old = game.get_player(name).placements[-1]
+    game.remove_rank(name)
+    game.add_rank(name, 12 if old != 12 else 1)
+    assert store.record(1, 10, game, 4600.0, 100.0)
+
+    [record] = games(store)
+    assert [row for row in record.rows if row[0] == name][0][3] == game.get_player(name).placements
+    assert store.summary(1, name).games == 1
+    assert store.summary(1, name).placement_sum == sum(game.get_player(name).placements)
+
+    # The replacement survives a reload.
+    reloaded = StatsStore(tmp_path)
+    assert len(games(reloaded)) == 1
+    assert reloaded.summary(1, name).placement_sum == sum(game.get_player(name).placements)
+
+
+def test_correction_of_older_game_rebuilds_indexes(tmp_path):
+    store = StatsStore(tmp_path)
+    first = finished(seed=1)
+    store.record(1, 10, first, 1000.0, 100.0)
+    store.record(1, 10, finished(seed=2), 5000.0, 4000.0)
+
+    first.edit_rank(NAMES[0], 12 if first.get_player(NAMES[0]).placements[-1] != 12 else 1)
+    store.record(1, 10, first, 9000.0, 100.0)
+
+    assert len(games(store)) == 2
+    assert store.summary(1, NAMES[0]).games == 2
+
+
+def test_same_lineup_without_start_within_window_is_replaced(tmp_path):
+    store = StatsStore(tmp_path)
+    store.record(1, 10, finished(seed=1), 1000.0)
+    store.record(1, 10, finished(seed=2), 1100.0)
+    store.record(1, 10, finished(seed=3), 1000.0 + 3600)
+
+    assert len(games(store)) == 2
+
+
+def test_games_of_different_starts_are_kept(tmp_path):
+    store = StatsStore(tmp_path)
+    store.record(1, 10, finished(seed=1), 1000.0, 100.0)
+    store.record(1, 10, finished(seed=2), 1100.0, 200.0)
+
+    assert len(games(store)) == 2
+
+
+def test_last_n_games(tmp_path):
+    store = StatsStore(tmp_path)
+    played = [finished(seed=i) for i in range(5)]
+    for i, game in enumerate(played):
+        store.record(1, 10, game, 1000.0 * (i + 1), 1000.0 * i + 1)
+
+    summary = store.summary(1, NAMES[0], last=2)
+    assert summary.games == 2
+    assert summary.points_sum == sum(g.get_player(NAMES[0]).total_point for g in played[-2:])
+
+
+def test_record_many_skips_duplicates_and_orders_by_finish(tmp_path):
+    store = StatsStore(tmp_path)
+    store.record(1, 10, finished(seed=9), 50_000.0, 49_000.0)
+    old = [(finished(seed=i), 1000.0 * (i + 1) * 10) for i in range(3)]
+
+    assert store.record_many(1, 10, old) == 3
+    assert store.record_many(1, 10, old) == 0
+    store.reindex()
+
+    assert [r.finished_at for r in games(store)] == [10_000.0, 20_000.0, 30_000.0, 50_000.0]
+    summary = store.summary(1, NAMES[0], last=1)
+    assert summary.points_sum == finished(seed=9).get_player(NAMES[0]).total_point
+
+
+def test_load_without_rows(tmp_path):
+    store = StatsStore(tmp_path)
+    store.record(1, 10, finished(), 1000.0, 100.0)
+    (tmp_path / "rows.bin").unlink()
+
+    store = StatsStore(tmp_path)
+    assert games(store) == []
+    assert store.record(1, 10, finished(), 2000.0, 200.0)
+    assert len(games(StatsStore(tmp_path))) == 1
+
+
+def test_load_with_truncated_rows(tmp_path):
+    store = StatsStore(tmp_path)
+    store.record(1, 10, finished(seed=1), 1000.0, 100.0)
+    store.record(1, 10, finished(seed=2), 2000.0, 200.0)
+    rows = tmp_path / "rows.bin"
+    rows.write_bytes(rows.read_bytes()[:-10])
+
+    assert len(games(StatsStore(tmp_path))) == 1
+
+
+def test_migrates_old_headers(tmp_path):
+    store = StatsStore(tmp_path)
+    store.record(1, 10, finished(), 1000.0, 100.0)
+    header = struct.unpack("<QQQdQBBdq", (tmp_path / "games.v2.bin").read_bytes())
+    (tmp_path / "games.v2.bin").unlink()
+    (tmp_path / "games.bin").write_bytes(_GAME_V1.pack(*header[:7]))
+
+    store = StatsStore(tmp_path)
+    assert len(games(store)) == 1
+    assert not (tmp_path / "games.bin").exists()
+    assert store.summary(1, NAMES[0]).games == 1
+
+
+def test_games_snapshot_survives_reindex(tmp_path):
+    store = StatsStore(tmp_path)
+    for i in range(3):
+        store.record(1, 10, finished(seed=i), 1000.0 * (i + 1), 100.0 * (i + 1))
+
+    it = store.games(1)
+    first = next(it)
+    store.reindex()
+    store.record(1, 10, finished(seed=5), 9000.0, 900.0)
+    assert [first.game_id, *(r.game_id for r in it)] == [0, 1, 2]
+
+
+def test_submit_runs_in_order(tmp_path):
+    store = StatsStore(tmp_path)
+
+    async def main():
+        await asyncio.gather(*(
+            store.submit(store.record, 1, 10, finished(seed=i), 1000.0 * (i + 1), float(i + 1))
+            for i in range(5)
+        ))
+
+    asyncio.run(main())
+    store.close()
+    assert [r.finished_at for r in games(store)] == [1000.0 * (i + 1) for i in range(5)]
+
+
+def test_backfill_skips_games_recorded_live(tmp_path):
+    store = StatsStore(tmp_path)
+    game = finished()
+    store.record(1, 10, game, finished_at=10_000.0, started_at=7_000.0)
+
+    # The table was posted when the game started and last edited when it ended.
+    assert store.record_many(1, 10, [(game.copy(), 10_001.0)]) == 0
+    assert len(games(store)) == 1
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import pytest
+
+from components.rules import DEFAULT_RULES, ScoringRules
+from components.table import GameTable
+from errors import RulesMismatch
+
+from tests.helpers import NAMES, ffa, play
+
+
+LONG = ScoringRules.get(12, 16)
+SMALL = ScoringRules.get(8, 12, (15, 12, 10, 8, 6, 4, 2, 1))
+
+
+def message(game):
+    return SimpleNamespace(embeds=[GameTable(game).embed])
+
+
+def test_tables_are_read_with_their_own_rules():
+    table = GameTable.from_message(message(play(ffa(rules=LONG), 14)), LONG)
+    assert table._game.rules is LONG
+    assert len(table._game.get_player(NAMES[0]).points) == 14
+
+
+def test_tables_of_other_rules_are_not_read():
+    # 14 races do not fit in the 12 races of the settings, nor of the default rules.
+    with pytest.raises(RulesMismatch):
+        GameTable.from_message(message(play(ffa(rules=LONG), 14)), DEFAULT_RULES)
+
+
+def test_tables_before_the_settings_changed_use_the_default_rules():
+    game = play(ffa(), 3)
+    table = GameTable.from_message(message(game), SMALL)
+    assert table._game.rules is DEFAULT_RULES
+    assert table._game.get_player(NAMES[0]).placements == game.get_player(NAMES[0]).placements
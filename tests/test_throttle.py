@@ -0,0 +1,38 @@
+from components.throttle import TokenBucket, Throttle
+
+
+def test_bucket_allows_burst_then_refills():
+    bucket = TokenBucket(3, 1.0, now=0.0)
+
+    assert [bucket.consume(0.0) for _ in range(4)] == [True, True, True, False]
+    assert bucket.retry_after(0.0) == 1.0
+    assert bucket.retry_after(0.5) == 0.5
+    assert bucket.consume(1.0)
+    assert not bucket.consume(1.0)
+
+
+def test_bucket_caps_at_capacity():
+    bucket = TokenBucket(2, 1.0, now=0.0)
+    bucket.consume(0.0)
+
+    assert bucket.consume(100.0, tokens=2)
+    assert not bucket.consume(100.0)
+
+
+def test_throttle_keys_are_independent():
+    throttle = Throttle(1, 0.001)
+
+    assert throttle.consume("a")
+    assert not throttle.consume("a")
+    assert throttle.consume("b")
+    assert throttle.retry_after("a") > 0
+
+
+def test_throttle_prunes_full_buckets():
+    throttle = Throttle(1, 1000.0)
+    throttle._prune_at = 4
+    for key in range(4):
+        throttle.consume(key)
+
+    throttle._prune(max(b.updated_at for b in throttle._buckets.values()) + 1.0)
+    assert throttle._buckets == {}
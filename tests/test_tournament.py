@@ -0,0 +1,112 @@
+import pytest
+
+from components.tournament import Tournament, TournamentStore
+from errors import InvalidAdvance, InvalidEntrantNum, IncompleteTeam, NotEnoughRooms, RoundInProgress, TournamentStarted
+
+
+def ffa_tournament(entrants: int, advance: int = 6) -> Tournament:
+    t = Tournament(1, 2, 1, advance)
+    for i in range(entrants):
+        t.register(f"p{i:02}")
+    return t
+
+
+def finish(t: Tournament, games: dict) -> None:
+    """Plays every room so that its entrants finish in seat order."""
+
+    for channel_id, game in games.items():
+        names = list(game._players)
+        for _ in range(game.rules.race_count):
+            for rank, name in enumerate(names, 1):
+                game.add_rank(name, rank)
+        t.update(channel_id, game, True)
+
+
+def test_seeding_snakes_through_rooms():
+    t = ffa_tournament(24)
+    seeds = {f"p{i:02}": 100 - i for i in range(24)}
+    games = t.start_round([10, 11, 12], seeds)
+
+    assert list(games) == [10, 11]
+    assert t.rooms[10].entrants[:4] == ["p00", "p03", "p04", "p07"]
+    assert t.rooms[11].entrants[:4] == ["p01", "p02", "p05", "p06"]
+
+
+def test_rounds_advance_to_a_final():
+    t = ffa_tournament(24)
+    games = t.start_round([10, 11], {})
+    with pytest.raises(RoundInProgress):
+        t.start_round([10, 11], {})
+
+    finish(t, games)
+    advancing = [e.name for e in t.advancing()]
+    assert len(advancing) == 12
+    assert set(advancing[:2]) == {room.ranking()[0] for room in t.rooms.values()}
+
+    games = t.start_round([10, 11], {})
+    assert list(games) == [10]
+    finish(t, games)
+    assert t.is_finished
+    assert t.standings[0].round == 2
+
+
+def test_final_room_may_be_partial():
+    t = ffa_tournament(24, advance=4)
+    assert t.bracket(24) == [2, 1]
+
+    finish(t, t.start_round([10, 11], {}))
+    games = t.start_round([10, 11], {})
+    assert list(games) == [10]
+    assert len(games[10]._players) == 8
+
+    finish(t, games)
+    assert t.is_finished
+
+
+def test_advance_without_a_final_is_rejected():
+    t = ffa_tournament(36, advance=5)
+    assert t.bracket(36) is None
+
+    with pytest.raises(InvalidAdvance) as e:
+        t.start_round([10, 11, 12], {})
+    assert e.value.localize("en-US").endswith("(Possible: 1, 2, 3, 4)")
+    assert t.round == 0
+
+
+def test_update_counts_only_the_room_game():
+    t = ffa_tournament(12)
+    games = t.start_round([10], {})
+    game = games[10]
+    name = next(iter(game._players))
+    game.add_rank(name, 1)
+
+    assert t.update(10, game, False, name)
+    assert not t.update(10, game, False, name)
+    assert t.entrants[name].points == game.rules.points[1]
+    assert not t.update(99, game, False)
+
+
+def test_invalid_rounds():
+    with pytest.raises(InvalidEntrantNum):
+        ffa_tournament(13).start_round([10, 11], {})
+    with pytest.raises(NotEnoughRooms):
+        ffa_tournament(24).start_round([10], {})
+
+    t = Tournament(1, 2, 2, 3)
+    for i in range(11):
+        t.register(f"p{i}", f"team{i // 2}")
+    with pytest.raises(IncompleteTeam):
+        t.start_round([10], {})
+
+
+def test_registration_closes_and_state_persists(tmp_path):
+    store = TournamentStore(tmp_path / "tournaments.json")
+    t = store.create(ffa_tournament(12))
+    t.start_round([10], {})
+    with pytest.raises(TournamentStarted):
+        t.register("late")
+    store.save(t)
+
+    loaded = TournamentStore(tmp_path / "tournaments.json").get(1)
+    assert loaded.round == 1
+    assert loaded.rooms[10].entrants == t.rooms[10].entrants